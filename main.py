@@ -1,12 +1,8 @@
 import cv2
 import time
 import os
-import threading
+from functools import partial
 from pathlib import Path
-import importlib.util
-import importlib
-
-import numpy as np
 
 # Intentos de importación robustos
 try:
@@ -15,43 +11,74 @@ except ImportError:
     def load_dotenv(*_args, **_kwargs):
         return False
 
-from ultralytics import YOLO  # type: ignore
-
 # --- NUEVOS MÓDULOS ---
 from modulos.audio_analysis import AudioMonitor
 from modulos.movement_analysis import MovementMonitor
-from modulos.health_monitor import HealthMonitor
+from modulos.occupancy import OCUPACION_POR_DEFECTO, OccupancyGrid
+from modulos.health_monitor import SALUD_POR_DEFECTO, HealthMonitor
+from modulos.stream_session import StreamSession
+from modulos.zones import load_configured_zones
+from modulos.metrics import MetricsRegistry, MetricsServer, stats_collector
+from modulos.preview_server import PreviewServer
+from modulos.multi_camera import CameraContext, MultiCameraMonitor, load_cameras
+from modulos.process_pipeline import ProcessPipeline
+from modulos.clip_recorder import CLIPS_POR_DEFECTO, ClipRecorder
+from modulos.analytics_store import ANALITICA_POR_DEFECTO, AnalyticsStore
 
 # 1. CARGA DE ENTORNO
 load_dotenv(dotenv_path=Path(__file__).with_name(".env"))
 
-# Intentamos cargar el módulo de BD
-try:
-    from modulos.base_datos import insertar_registro
-
-    DB_ACTIVA = True
-    print("✅ Base de Datos: CONECTADA")
-except Exception as e:
-    print(f"⚠️ Base de Datos: DESCONECTADA ({e})")
-    insertar_registro = None
-    DB_ACTIVA = False
-
-
-def guardar_async(*args):
-    """Ejecuta la inserción en BD en un hilo separado para no bloquear el video."""
-    if (not DB_ACTIVA) or (insertar_registro is None):
-        return
-
-    func = insertar_registro
+# Escritor de BD: se crea en `_iniciar_bd` (sólo en el proceso principal; los
+# procesos hijos del modo multi-proceso importan este archivo de nuevo, por eso
+# el detector y el pipeline, que cargan ultralytics/torch, se importan dentro
+# de las funciones que los usan).
+escritor_bd = None
+DB_ACTIVA = False
+# Historial local para reportes (tools/reporte_analitica.py), ANALITICA=0 lo desactiva
+analitica = None
+
+
+def _iniciar_bd():
+    """Los eventos se anotan primero en un respaldo local y se suben a Azure
+    cuando haya conexión (aunque sea más tarde). Aparte se abre la analítica
+    local, que `guardar_async` alimenta con los mismos eventos."""
+    global escritor_bd, DB_ACTIVA, analitica
+    if os.getenv("ANALITICA", "1") == "1":
+        try:
+            analitica = AnalyticsStore(os.getenv("ANALITICA_DB", str(ANALITICA_POR_DEFECTO)))
+        except Exception as e:
+            print(f"⚠️ Analítica local: DESACTIVADA ({e})")
+            analitica = None
 
-    def tarea():
+    try:
+        from modulos.base_datos import EscritorBitacora
+        from modulos.event_spool import EventSpool
+
+        spool_path = os.getenv("BITACORA_SPOOL", str(Path(__file__).with_name("datos") / "bitacora_spool.db"))
+        escritor_bd = EscritorBitacora(spool=EventSpool(spool_path))
+        DB_ACTIVA = True
+        print(f"✅ Base de Datos: ACTIVA (respaldo local en {spool_path})")
+    except Exception as e:
+        print(f"⚠️ Base de Datos: DESCONECTADA ({e})")
+        escritor_bd = None
+        DB_ACTIVA = False
+
+
+def guardar_async(*args, camara=""):
+    """Encola el evento para el escritor de BD (una conexión, inserciones por lote)
+    y lo anota en la analítica local con la cámara que lo generó."""
+    if analitica is not None:
         try:
-            func(*args)
+            analitica.append([(time.time(), *args)], camera=camara)
         except Exception as e:
-            print(f"   └── ❌ Error guardando en hilo: {e}")
+            # Los reportes locales no deben frenar el registro en Azure
+            print(f"⚠️ Error guardando analítica local: {e}")
 
-    t = threading.Thread(target=tarea, daemon=True)
-    t.start()
+    if (not DB_ACTIVA) or (escritor_bd is None):
+        return
+
+    if not escritor_bd.encolar(*args):
+        print("   └── ❌ Cola de BD llena, evento descartado")
 
 
 def _obtener_url_rtsp_tapo() -> str | None:
@@ -65,372 +92,486 @@ def _obtener_url_rtsp_tapo() -> str | None:
     return f"rtsp://{tapo_usuario}:{tapo_pass}@{tapo_ip}:554/stream2"
 
 
-def dibujar_hud(frame, accion, fps, audio_stats, move_status, mood, health_alerts):
-    """Dibuja una interfaz moderna sobre el video."""
-    alto, ancho = frame.shape[:2]
+def _registrar_camara(metrics, grabber, audio_mon, move_mon, health_mon, pipeline, camara=None):
+    """Colectores de métricas de una cámara (con etiqueta `camera` en multi-cámara)."""
+    etiquetas = {"camera": camara} if camara else None
+    for prefijo, get_stats, contadores in (
+        ("capture", grabber.get_stats, {"captured", "dropped", "reconnects"}),
+        ("scheduler", pipeline.scheduler.get_stats, {"frames", "inferences"}),
+        ("tracker", pipeline.tracker.get_stats, {"created", "matched"}),
+        ("audio", audio_mon.get_stats, {"chunks", "events"}),
+        ("movement", move_mon.get_stats, {"updates"}),
+        ("health", health_mon.get_stats, ()),
+    ):
+        metrics.add_collector(stats_collector(prefijo, get_stats, counters=contadores, labels=etiquetas))
+    if pipeline.roi is not None:
+        metrics.add_collector(stats_collector("roi", pipeline.roi.get_stats, counters={"roi_runs", "full_runs"}))
+    if pipeline.recorder is not None:
+        metrics.add_collector(
+            stats_collector("clips", pipeline.recorder.get_stats, counters={"clips", "errors"}, labels=etiquetas)
+        )
+
+
+def _iniciar_metricas(metrics):
+    """Colector de la BD y /metrics local (METRICS_PORT=0 lo desactiva)."""
+    if escritor_bd is not None:
+        metrics.add_collector(
+            stats_collector("db", escritor_bd.get_stats, counters={"escritos", "descartados", "lotes", "fallos"})
+        )
+
+    puerto = int(os.getenv("METRICS_PORT", "9108"))
+    if puerto <= 0:
+        return None
+    servidor = MetricsServer(metrics, host=os.getenv("METRICS_HOST", "127.0.0.1"), port=puerto)
+    try:
+        servidor.start()
+    except OSError as e:
+        print(f"⚠️ Métricas: no se pudo abrir el puerto {puerto} ({e})")
+        return None
+    print(f"📈 Métricas en http://{servidor.host}:{puerto}/metrics")
+    return servidor
+
 
-    # FPS
-    cv2.putText(
-        frame,
-        f"FPS: {int(fps)}",
-        (ancho - 120, 30),
-        cv2.FONT_HERSHEY_SIMPLEX,
-        0.6,
-        (0, 255, 0),
-        2,
+def _crear_grabador(subcarpeta=None):
+    """Clips de eventos desde los paquetes de la cámara (CLIPS=0 lo desactiva)."""
+    if os.getenv("CLIPS", "1") != "1":
+        return None
+    carpeta = Path(os.getenv("CLIPS_DIR", str(CLIPS_POR_DEFECTO)))
+    return ClipRecorder(
+        carpeta / subcarpeta if subcarpeta else carpeta,
+        pre_seconds=float(os.getenv("CLIP_PRE", "10")),
+        post_seconds=float(os.getenv("CLIP_POST", "20")),
     )
 
-    # ==========================
-    # PANEL DE ESTADO (Lateral)
-    # ==========================
-    y_start = 30
-    color_texto_info = (220, 220, 220)
-
-    # Audio Info
-    audio_str = f"Audio: {audio_stats['status']} ({audio_stats['rms']:.3f})"
-    cv2.putText(frame, audio_str, (10, y_start), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color_texto_info, 1)
-
-    # Movimiento Info
-    move_str = f"Activ: {move_status}"
-    cv2.putText(frame, move_str, (10, y_start + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color_texto_info, 1)
-
-    # Estado de Ánimo (Grande)
-    color_mood = (0, 255, 0) # Verde (Normal)
-    if mood == "Desesperado":
-        color_mood = (0, 0, 255) # Rojo
-    elif mood == "Estresado":
-        color_mood = (0, 165, 255) # Naranja
-    elif mood == "Comodo":
-        color_mood = (255, 255, 0) # Cyan/Amarillo
-
-    cv2.putText(frame, f"Estado: {mood.upper()}", (10, y_start + 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color_mood, 2)
-
-    # Alertas de Salud
-    if health_alerts:
-        y_alert = y_start + 100
-        for alert in health_alerts:
-            cv2.putText(frame, alert, (10, y_alert), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-            y_alert += 25
-
-    # ==========================
-    # BARRA SUPERIOR (Acción)
-    # ==========================
-    if accion:
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (ancho, 60), (0, 0, 0), -1)
-        alpha = 0.4
-        cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
-
-        texto = f"!! {accion.upper()} !!"
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        scale = 1.0
-        thickness = 2
-        (text_w, _text_h), _ = cv2.getTextSize(texto, font, scale, thickness)
-        text_x = (ancho - text_w) // 2
-
-        color_texto = (0, 255, 255)
-        if "Alimentacion" in accion:
-            color_texto = (0, 0, 255)
-        elif "Hidratacion" in accion:
-            color_texto = (255, 0, 0)
-
-        cv2.putText(frame, texto, (text_x, 40), font, scale, color_texto, thickness)
 
+def _crear_monitor_salud(camara=None):
+    """HealthMonitor con su estado y resúmenes en SALUD_DB (uno por cámara)."""
+    ruta = Path(os.getenv("SALUD_DB", str(SALUD_POR_DEFECTO)))
+    if camara:
+        ruta = ruta.with_name(f"{ruta.stem}_{camara}{ruta.suffix}")
+    try:
+        return HealthMonitor(store_path=ruta)
+    except Exception as e:
+        print(f"⚠️ Salud: sin almacén local ({e}), el estado se pierde al reiniciar")
+        return HealthMonitor()
+
+
+def _cargar_modelo(pesos):
+    """Un único detector para todo el proceso; None si no se pudo cargar."""
+    from modulos.inference_backends import load_detector
 
-def iniciar_monitoreo():
     print("🧠 Cargando IA...")
+    # MONITOR_BACKEND: auto (INT8 publicado > OpenVINO > ONNX Runtime > PyTorch),
+    # openvino_int8, openvino, onnx o torch
+    backend_pedido = os.getenv("MONITOR_BACKEND", "auto")
     try:
-        model = YOLO("best.pt")
-    except Exception:
-        print("❌ ERROR: No se encuentra 'best.pt'")
-        return
+        model, backend = load_detector(pesos, backend_pedido)
+    except Exception as e:
+        print(f"❌ ERROR: No se pudo cargar '{pesos}' ({e})")
+        return None, None
+    print(f"🧠 Modelo listo (backend: {backend})")
+    return model, backend
+
+
+def _iniciar_preview(metrics):
+    """Vista previa MJPEG del modo sin ventana (PREVIEW_PORT=0 la desactiva)."""
+    puerto = int(os.getenv("PREVIEW_PORT", "8090"))
+    if puerto <= 0:
+        return None
+    preview = PreviewServer(
+        host=os.getenv("PREVIEW_HOST", "127.0.0.1"),
+        port=puerto,
+        max_fps=float(os.getenv("PREVIEW_FPS", "5")),
+    )
+    try:
+        preview.start()
+    except OSError as e:
+        print(f"⚠️ Vista previa: no se pudo abrir el puerto {puerto} ({e})")
+        return None
+    metrics.add_collector(stats_collector("preview", preview.get_stats, counters={"encoded"}))
+    print(f"📺 Vista previa en http://{preview.host}:{puerto}/")
+    return preview
+
 
-    # Tracker config
-    TRACKER_CONFIG = "botsort.yaml"
+def iniciar_monitoreo():
+    from modulos.pipeline import MonitorPipeline
+
+    PESOS = "best.pt"
+    model, backend = _cargar_modelo(PESOS)
+    if model is None:
+        return
 
     url_tapo = _obtener_url_rtsp_tapo()
     if not url_tapo:
         return
 
     # --- INICIALIZAR MÓDULOS INTELIGENTES ---
+    # El audio no abre su propia conexión: lo alimenta la sesión RTSP compartida
     print("🎧 Iniciando Monitor de Audio...")
-    audio_mon = AudioMonitor(url_tapo)
-    audio_mon.start()
+    audio_mon = AudioMonitor(guardar=guardar_async)
 
     print("🐾 Iniciando Monitor de Movimiento...")
-    move_mon = MovementMonitor()
+    # Mapa de ocupación por hora/día (datos/ocupacion/AAAA-MM-DD/HH.npy)
+    move_mon = MovementMonitor(occupancy=OccupancyGrid(os.getenv("OCUPACION_DIR", str(OCUPACION_POR_DEFECTO))))
 
     print("❤️ Iniciando Monitor de Salud...")
-    health_mon = HealthMonitor()
+    health_mon = _crear_monitor_salud()
     # -----------------------------------------
 
-    print("🎥 Conectando cámara...")
-    cap = cv2.VideoCapture(url_tapo)
-
-    AREA_MINIMA = 1200
-    AREA_MAXIMA = 85000
-    CONF_NINFA = 0.20
-    CONF_PLATOS = 0.35
-
-    HOLD_ACCION_SEGUNDOS = 3.0
-    MIN_DURACION_PARA_GUARDAR = 2.0
+    # Clips de cada INICIO de acción / alerta de salud (datos/clips/AAAA-MM-DD/)
+    recorder = _crear_grabador()
 
-    memoria_cajas = []
-    accion_estable = ""
-    accion_ultima_vez_vista = 0.0
-    accion_inicio_ts = 0.0
-    accion_inicio_logueado = False
-    conf_accion_ultima = 0.0
+    print("🎥 Conectando cámara...")
+    grabber = StreamSession(url_tapo, audio_monitor=audio_mon, recorder=recorder)
+    grabber.start()
+
+    # Zonas fijas de comedero/bebedero (tools/configurar_zonas.py). Sin ellas
+    # se usan las cajas de platos cacheadas.
+    zonas = load_configured_zones()
+
+    # Tiempos por etapa del bucle y estado de los monitores, para Prometheus
+    metrics = MetricsRegistry()
+
+    # Modo opcional MONITOR_ROI=1: inferir sólo sobre recortes con movimiento.
+    # MONITOR_TRACKER: auto (BoT-SORT si está `lap`), botsort o iou
+    pipeline = MonitorPipeline(
+        model,
+        backend=backend,
+        weights=PESOS,
+        audio_mon=audio_mon,
+        move_mon=move_mon,
+        health_mon=health_mon,
+        guardar=guardar_async,
+        zonas=zonas,
+        use_roi=os.getenv("MONITOR_ROI", "0") == "1",
+        metrics=metrics,
+        recorder=recorder,
+        tracker=os.getenv("MONITOR_TRACKER", "auto"),
+        analytics=analitica,
+    )
+    _registrar_camara(metrics, grabber, audio_mon, move_mon, health_mon, pipeline)
+    servidor_metricas = _iniciar_metricas(metrics)
 
-    frame_count = 0
-    SKIP_FRAMES = 3
+    # MONITOR_HEADLESS=1: sin ventana (servidores). El HUD sólo se dibuja
+    # cuando alguien mira la vista previa MJPEG, a PREVIEW_FPS como máximo.
+    headless = os.getenv("MONITOR_HEADLESS", "0") == "1"
+    preview = _iniciar_preview(metrics) if headless else None
 
     prev_time = time.time()
     fps = 0.0
 
-    # Tracking BoT-SORT
-    importlib.invalidate_caches()
-    tracking_activo = importlib.util.find_spec("lap") is not None
-    aviso_tracking_fallido = False
-    aviso_tracking_reactivado = False
-    model_det = model
+    if escritor_bd is not None:
+        escritor_bd.start()
 
     print("🦅 MONITOR PRO ACTIVADO: Sistema Multimodal 🦅")
 
     try:
         while True:
-            ret, frame = cap.read()
+            # El hilo de captura reconecta solo; aquí sólo esperamos un frame nuevo
+            with metrics.time("captura"):
+                ret, frame = grabber.read()
             if not ret:
-                print("⚠️ Señal perdida. Reconectando...")
-                time.sleep(2)
-                cap.open(url_tapo)
                 continue
 
             ahora_frame = time.time()
             fps = 1 / (ahora_frame - prev_time) if (ahora_frame - prev_time) > 0 else 0
             prev_time = ahora_frame
 
-            # =========================================================
-            #  IA - Cada X frames
-            # =========================================================
-            frame_count += 1
-            if frame_count % SKIP_FRAMES == 0:
-                try:
-                    if tracking_activo:
-                        results = model.track(
-                            frame,
-                            persist=True,
-                            verbose=False,
-                            conf=0.15,
-                            iou=0.5,
-                            tracker=TRACKER_CONFIG,
-                        )
-                    else:
-                        results = model_det(frame, verbose=False, conf=0.15, iou=0.5)
-                except Exception as e:
-                    if not aviso_tracking_fallido:
-                        print(f"⚠️ Fallo en tracker, usando modo simple: {e}")
-                        aviso_tracking_fallido = True
-                    tracking_activo = False
-
-                    try:
-                        model.predictor = None
-                    except Exception:
-                        pass
-
-                    if model_det is model:
-                        try:
-                            model_det = YOLO("best.pt")
-                        except Exception:
-                            model_det = model
-
-                    results = model_det(frame, verbose=False, conf=0.15, iou=0.5)
-
-                if not tracking_activo:
-                    importlib.invalidate_caches()
-                    if importlib.util.find_spec("lap") is not None:
-                        tracking_activo = True
-                        if not aviso_tracking_reactivado:
-                            print("✅ 'lap' detectado. Reactivando tracking BoT-SORT...")
-                            aviso_tracking_reactivado = True
-
-                temp_comida = []
-                temp_agua = []
-                temp_ninfa = []
-                memoria_cajas = []
-                accion_detectada_hoy = ""
-                max_conf_frame = 0.0
-
-                for r in results:
-                    boxes = getattr(r, "boxes", None)
-                    if boxes is None:
-                        continue
-                    for box in boxes:
-                        cls_id = int(box.cls[0])
-                        nombre = model.names[cls_id]
-                        coords = list(map(int, box.xyxy[0]))
-                        conf = float(box.conf[0])
-
-                        track_id = None
-                        try:
-                            if box.id is not None:
-                                track_id = int(box.id[0])
-                        except Exception:
-                            track_id = None
-
-                        ancho = coords[2] - coords[0]
-                        alto = coords[3] - coords[1]
-                        area = ancho * alto
-
-                        if area < AREA_MINIMA or area > AREA_MAXIMA:
-                            continue
-
-                        color = (0, 255, 0)
-                        if nombre == "ninfa":
-                            if conf < CONF_NINFA:
-                                continue
-                            temp_ninfa.append(coords)
-                            max_conf_frame = max(max_conf_frame, conf)
-
-                            # --- UPDATE MOVIMIENTO ---
-                            cx = (coords[0] + coords[2]) // 2
-                            cy = (coords[1] + coords[3]) // 2
-                            if track_id is not None:
-                                move_mon.update(track_id, cx, cy)
-                            # -------------------------
-
-                        else:
-                            if conf < CONF_PLATOS:
-                                continue
-                            if nombre == "comedero":
-                                temp_comida.append(coords)
-                                color = (0, 0, 255)
-                            elif nombre == "bebedero":
-                                temp_agua.append(coords)
-                                color = (255, 0, 0)
-
-                        memoria_cajas.append((coords, nombre, color, area, track_id))
-
-                for nx1, ny1, nx2, ny2 in temp_ninfa:
-                    cx, cy = (nx1 + nx2) // 2, (ny1 + ny2) // 2
-                    for x1, y1, x2, y2 in temp_comida:
-                        if (x1 < cx < x2) and (y1 < cy < y2):
-                            accion_detectada_hoy = "Alimentacion"
-                    for x1, y1, x2, y2 in temp_agua:
-                        if (x1 < cx < x2) and (y1 < cy < y2):
-                            accion_detectada_hoy = "Hidratacion"
-
-                if accion_detectada_hoy:
-                    accion_ultima_vez_vista = ahora_frame
-                    conf_accion_ultima = max_conf_frame
-
-                    if accion_estable != accion_detectada_hoy:
-                        if accion_estable and accion_inicio_logueado:
-                            duracion = max(0.0, ahora_frame - accion_inicio_ts)
-                            if duracion >= MIN_DURACION_PARA_GUARDAR:
-                                print(f"🔀 CAMBIO ACCIÓN: {accion_estable} -> {accion_detectada_hoy}")
-                                guardar_async(
-                                    "Accion",
-                                    accion_estable,
-                                    float(duracion),
-                                    "Fin",
-                                    float(conf_accion_ultima),
-                                    "Cambio",
-                                )
-
-                        accion_estable = accion_detectada_hoy
-                        accion_inicio_ts = ahora_frame
-                        accion_inicio_logueado = False
-
-            # =========================================================
-            #  LÓGICA DE ESTADO (Continuo)
-            # =========================================================
-
-            # 1) Expiración (FIN)
-            if accion_estable and (ahora_frame - accion_ultima_vez_vista) > HOLD_ACCION_SEGUNDOS:
-                accion_prev = accion_estable
-                accion_estable = ""
-
-                duracion = max(0.0, accion_ultima_vez_vista - accion_inicio_ts)
-                if accion_inicio_logueado and duracion >= MIN_DURACION_PARA_GUARDAR:
-                    print(f"⏹️ FIN ACCIÓN: {accion_prev} ({duracion:.1f}s)")
-                    guardar_async(
-                        "Accion",
-                        accion_prev,
-                        float(duracion),
-                        "Fin",
-                        float(conf_accion_ultima),
-                        f"Duracion={duracion:.1f}s | TapoMovil",
-                    )
-
-                accion_inicio_logueado = False
-                accion_inicio_ts = 0.0
-
-            # 2) Confirmación (INICIO válido)
-            if accion_estable and (not accion_inicio_logueado) and accion_inicio_ts:
-                if (ahora_frame - accion_inicio_ts) >= MIN_DURACION_PARA_GUARDAR:
-                    print(f"▶️ INICIO ACCIÓN: {accion_estable}")
-
-                    # --- Registrar Salud ---
-                    health_mon.register_action(accion_estable)
-                    # -----------------------
-
-                    guardar_async(
-                        "Accion",
-                        accion_estable,
-                        1.0,
-                        "Inicio",
-                        float(conf_accion_ultima),
-                        f"Min={MIN_DURACION_PARA_GUARDAR:.0f}s | TapoMovil",
-                    )
-                    accion_inicio_logueado = True
-
-            # =========================================================
-            #  DETERMINAR ESTADOS (MOOD/HEALTH)
-            # =========================================================
-            audio_stats = audio_mon.get_status()
-            move_status, move_val = move_mon.get_global_activity()
-            health_alerts = health_mon.check_health()
-
-            # Lógica de Estado de Ánimo (Mood)
-            mood = "Normal"
-            is_screaming = audio_stats["status"] == "Gritando"
-            is_high_activity = "Alta" in move_status or "Muy Activo" in move_status
-
-            # Prioridad de Estados
-            if len(health_alerts) > 0 and is_screaming:
-                mood = "Desesperado"
-                # Podríamos guardar log aquí si cambia el estado
-            elif is_screaming and is_high_activity:
-                mood = "Estresado"
-            elif move_status == "Tranquilo" and audio_stats["status"] in ["Sonidos", "Silencio"]:
-                mood = "Comodo"
-
-            # =========================================================
-            #  DIBUJO
-            # =========================================================
-            for coords, nombre, color, area, track_id in memoria_cajas:
-                x1, y1, x2, y2 = coords
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-
-                etiqueta = nombre
-                if track_id is not None:
-                    etiqueta += f" #{track_id}"
-                cv2.putText(frame, etiqueta, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-
-            dibujar_hud(frame, accion_estable, fps, audio_stats, move_status, mood, health_alerts)
-
-            cv2.imshow("Monitor Ninfas Pro", frame)
-            if cv2.waitKey(1) & 0xFF == ord("q"):
+            if headless:
+                pipeline.process(frame, ahora_frame, stream_ts=grabber.last_stream_ts, draw=False)
+                if preview is not None and preview.wants_frame(ahora_frame):
+                    with metrics.time("hud"):
+                        pipeline.draw(frame, fps)
+                    with metrics.time("preview"):
+                        preview.publish(frame, ahora_frame)
+                continue
+
+            pipeline.process(frame, ahora_frame, stream_ts=grabber.last_stream_ts, fps=fps)
+
+            with metrics.time("display"):
+                cv2.imshow("Monitor Ninfas Pro", frame)
+                tecla = cv2.waitKey(1) & 0xFF
+            if tecla == ord("q"):
                 break
 
+    except KeyboardInterrupt:
+        # En modo sin ventana se detiene con Ctrl+C (o SIGINT del servicio)
+        pass
+
     finally:
         # Cerrar todo limpiamente
         print("🛑 Deteniendo monitores...")
+        if preview is not None:
+            preview.stop()
+        if servidor_metricas is not None:
+            servidor_metricas.stop()
         audio_mon.stop()
-        cap.release()
-        cv2.destroyAllWindows()
+        grabber.stop()
+        move_mon.close()
+        health_mon.close()
+        if escritor_bd is not None:
+            escritor_bd.stop()
+            pendientes = escritor_bd.get_stats()["pendientes"]
+            if pendientes:
+                print(f"💾 {pendientes} eventos quedan en el respaldo local para el próximo arranque")
+        stats = grabber.get_stats()
+        print(
+            f"📊 Captura: {stats['captured']} frames, {stats['dropped']} descartados, "
+            f"latencia máx {stats['max_frame_age'] * 1000:.0f} ms"
+        )
+        stats = pipeline.scheduler.get_stats()
+        print(f"📊 IA: {stats['inferences']} inferencias en {stats['frames']} frames")
+        if not headless:
+            cv2.destroyAllWindows()
+
+
+def iniciar_multicamara(ruta_camaras):
+    """Modo multi-cámara (CAMARAS=config/camaras.json): un detector, un lote por paso."""
+    from modulos.pipeline import MonitorPipeline
+
+    try:
+        camaras = load_cameras(ruta_camaras)
+    except Exception as e:
+        print(f"❌ ERROR: No se pudo leer la lista de cámaras '{ruta_camaras}' ({e})")
+        return
+    if not camaras:
+        print("❌ La lista de cámaras está vacía")
+        return
+
+    PESOS = "best.pt"
+    model, backend = _cargar_modelo(PESOS)
+    if model is None:
+        return
+
+    metrics = MetricsRegistry()
+    ocupacion_dir = Path(os.getenv("OCUPACION_DIR", str(OCUPACION_POR_DEFECTO)))
+    contextos = []
+    for cam in camaras:
+        nombre = cam["nombre"]
+        print(f"🎥 [{nombre}] Preparando cámara...")
+        # Cada jaula tiene su propio audio, movimiento, salud, zonas y estado de acciones
+        guardar = partial(guardar_async, camara=nombre)
+        audio_mon = AudioMonitor(guardar=guardar, source_note=nombre)
+        move_mon = MovementMonitor(occupancy=OccupancyGrid(ocupacion_dir / nombre))
+        health_mon = _crear_monitor_salud(nombre)
+        recorder = _crear_grabador(nombre)
+        grabber = StreamSession(cam["url"], audio_monitor=audio_mon, recorder=recorder)
+        zonas = load_configured_zones(cam["zonas"]) if cam["zonas"] else None
+
+        pipeline = MonitorPipeline(
+            model,
+            backend=backend,
+            weights=PESOS,
+            audio_mon=audio_mon,
+            move_mon=move_mon,
+            health_mon=health_mon,
+            guardar=guardar,
+            zonas=zonas,
+            source_note=nombre,
+            metrics=metrics,
+            camera=nombre,
+            recorder=recorder,
+            # Los lotes multi-cámara no pasan por BoT-SORT
+            tracker="iou",
+            analytics=analitica,
+        )
+        _registrar_camara(metrics, grabber, audio_mon, move_mon, health_mon, pipeline, camara=nombre)
+        contexto = CameraContext(nombre, grabber, pipeline, audio_mon)
+        metrics.add_collector(
+            stats_collector("camera", contexto.get_stats, counters={"deferred"}, labels={"camera": nombre})
+        )
+        contextos.append(contexto)
+
+    # Los modelos exportados tienen batch fijo: esos infieren cámara por cámara
+    monitor = MultiCameraMonitor(
+        model,
+        contextos,
+        batched=(backend == "torch"),
+        max_batch=int(os.getenv("MAX_LOTE_CAMARAS", "4")),
+        metrics=metrics,
+    )
+    servidor_metricas = _iniciar_metricas(metrics)
+    headless = os.getenv("MONITOR_HEADLESS", "0") == "1"
+
+    monitor.start()
+    if escritor_bd is not None:
+        escritor_bd.start()
+
+    print(f"🦅 MONITOR MULTI-CÁMARA ACTIVADO: {len(contextos)} cámaras 🦅")
+
+    try:
+        while True:
+            procesados = monitor.step(draw=not headless)
+            if headless:
+                continue
+            for cam, frame in procesados:
+                cv2.imshow(f"Monitor Ninfas Pro - {cam.nombre}", frame)
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        print("🛑 Deteniendo monitores...")
+        if servidor_metricas is not None:
+            servidor_metricas.stop()
+        monitor.stop()
+        if escritor_bd is not None:
+            escritor_bd.stop()
+        for cam in contextos:
+            stats = cam.pipeline.scheduler.get_stats()
+            print(
+                f"📊 [{cam.nombre}] IA: {stats['inferences']} inferencias en {stats['frames']} frames, "
+                f"{cam.deferred} postergadas"
+            )
+        print(f"📊 Lotes de inferencia: {monitor.batches}")
+        if not headless:
+            cv2.destroyAllWindows()
+
+
+def iniciar_monitoreo_procesos():
+    """Modo multi-proceso: captura, INFER_WORKERS workers de inferencia y audio
+    en procesos propios; los frames viajan por memoria compartida."""
+    from modulos.pipeline import MonitorPipeline
+
+    url_tapo = _obtener_url_rtsp_tapo()
+    if not url_tapo:
+        return
+
+    PESOS = "best.pt"
+    procesos = ProcessPipeline(
+        url_tapo,
+        PESOS,
+        backend=os.getenv("MONITOR_BACKEND", "auto"),
+        workers=int(os.getenv("INFER_WORKERS", "2")),
+        # Tamaño del anillo de frames compartido: por defecto sale de CAMARA_FPS x INFER_LATENCIA
+        slots=int(os.getenv("ANILLO_SLOTS", "0")) or None,
+        fps=float(os.getenv("CAMARA_FPS", "15")),
+        expected_latency=float(os.getenv("INFER_LATENCIA", "1.0")),
+    )
+    procesos.guardar = guardar_async
+    print(
+        f"🧩 Iniciando {procesos.workers} procesos de inferencia, captura y audio "
+        f"(anillo de {procesos.slots} frames)..."
+    )
+    try:
+        nombres_clase = procesos.start()
+    except Exception as e:
+        print(f"❌ ERROR: No se pudieron iniciar los procesos ({e})")
+        procesos.stop()
+        return
+    print("🧠 Modelo listo en los workers")
+
+    move_mon = MovementMonitor(occupancy=OccupancyGrid(os.getenv("OCUPACION_DIR", str(OCUPACION_POR_DEFECTO))))
+    health_mon = _crear_monitor_salud()
+    metrics = MetricsRegistry()
+    pipeline = MonitorPipeline(
+        ProcessPipeline.model_stub(nombres_clase),
+        weights=PESOS,
+        audio_mon=procesos.audio_status,
+        move_mon=move_mon,
+        health_mon=health_mon,
+        guardar=guardar_async,
+        zonas=load_configured_zones(),
+        metrics=metrics,
+        # Las detecciones de los workers no pasan por BoT-SORT
+        tracker="iou",
+        analytics=analitica,
+    )
+    procesos.pipeline = pipeline
+
+    for prefijo, get_stats, contadores in (
+        (
+            "processes",
+            procesos.get_stats,
+            {"frames", "dropped", "overwritten", "lost", "stale", "timed_out", "respawned"},
+        ),
+        ("scheduler", pipeline.scheduler.get_stats, {"frames", "inferences"}),
+        ("tracker", pipeline.tracker.get_stats, {"created", "matched"}),
+        ("audio", procesos.audio_status.get_stats, {"chunks", "events"}),
+        ("movement", move_mon.get_stats, {"updates"}),
+        ("health", health_mon.get_stats, ()),
+    ):
+        metrics.add_collector(stats_collector(prefijo, get_stats, counters=contadores))
+    servidor_metricas = _iniciar_metricas(metrics)
+
+    headless = os.getenv("MONITOR_HEADLESS", "0") == "1"
+    preview = _iniciar_preview(metrics) if headless else None
+
+    if escritor_bd is not None:
+        escritor_bd.start()
+
+    print("🦅 MONITOR PRO ACTIVADO: modo multi-proceso 🦅")
+
+    prev_time = time.time()
+    fps = 0.0
+    try:
+        while True:
+            with metrics.time("captura"):
+                atendido = procesos.step()
+            if atendido is None:
+                continue
+            _desc, frame = atendido
+
+            ahora_frame = time.time()
+            fps = 1 / (ahora_frame - prev_time) if (ahora_frame - prev_time) > 0 else 0
+            prev_time = ahora_frame
+
+            # `step` ya devuelve una copia validada del frame: se dibuja encima
+            if headless:
+                if preview is not None and preview.wants_frame(ahora_frame):
+                    with metrics.time("hud"):
+                        pipeline.draw(frame, fps)
+                    with metrics.time("preview"):
+                        preview.publish(frame, ahora_frame)
+                continue
+
+            with metrics.time("hud"):
+                pipeline.draw(frame, fps)
+            with metrics.time("display"):
+                cv2.imshow("Monitor Ninfas Pro", frame)
+                tecla = cv2.waitKey(1) & 0xFF
+            if tecla == ord("q"):
+                break
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        print("🛑 Deteniendo procesos...")
+        if preview is not None:
+            preview.stop()
+        if servidor_metricas is not None:
+            servidor_metricas.stop()
+        procesos.stop()
+        move_mon.close()
+        health_mon.close()
+        if escritor_bd is not None:
+            escritor_bd.stop()
+        stats = procesos.get_stats()
+        print(
+            f"📊 Procesos: {stats['frames']} frames, {stats['dropped']} descartados, "
+            f"{stats['lost']} inferencias perdidas"
+        )
+        stats = pipeline.scheduler.get_stats()
+        print(f"📊 IA: {stats['inferences']} inferencias en {stats['frames']} frames")
+        if not headless:
+            cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
-    iniciar_monitoreo()
\ No newline at end of file
+    _iniciar_bd()
+    # Con CAMARAS (lista de cámaras en JSON) se usa el modo multi-cámara;
+    # con MONITOR_PROCESOS=1, captura/inferencia/audio en procesos separados.
+    # La analítica guarda eventos y muestras de ánimo por cámara.
+    try:
+        if os.getenv("CAMARAS"):
+            iniciar_multicamara(os.getenv("CAMARAS"))
+        elif os.getenv("MONITOR_PROCESOS", "0") == "1":
+            iniciar_monitoreo_procesos()
+        else:
+            iniciar_monitoreo()
+    finally:
+        if analitica is not None:
+            analitica.close()
\ No newline at end of file
@@ -0,0 +1,97 @@
+class ActionStateMachine:
+    """Estado de la acción en curso (Alimentacion / Hidratacion).
+
+    Una acción vista en la inferencia se "confirma" (INICIO) si dura al menos
+    `min_duration` segundos, y termina (FIN) cuando pasan `hold_seconds` sin
+    volver a verla. `observe` se llama en los frames con inferencia y `tick`
+    en todos; ambos devuelven los eventos a registrar como tuplas
+    (tipo, accion, registro), donde `registro` son los argumentos de
+    insertar_registro y tipo es "inicio", "fin" o "cambio".
+    """
+
+    def __init__(self, hold_seconds=3.0, min_duration=2.0, source_note="TapoMovil"):
+        self.hold_seconds = hold_seconds
+        self.min_duration = min_duration
+        self.source_note = source_note
+
+        self.accion_estable = ""
+        self.ultima_vez_vista = 0.0
+        self.inicio_ts = 0.0
+        self.inicio_logueado = False
+        self.conf_ultima = 0.0
+
+    def observe(self, accion, conf, now):
+        """Incorpora la acción detectada en un frame con inferencia."""
+        eventos = []
+        if not accion:
+            return eventos
+
+        self.ultima_vez_vista = now
+        self.conf_ultima = conf
+
+        if self.accion_estable != accion:
+            if self.accion_estable and self.inicio_logueado:
+                duracion = max(0.0, now - self.inicio_ts)
+                if duracion >= self.min_duration:
+                    eventos.append(
+                        (
+                            "cambio",
+                            self.accion_estable,
+                            ("Accion", self.accion_estable, float(duracion), "Fin", float(self.conf_ultima), "Cambio"),
+                        )
+                    )
+
+            self.accion_estable = accion
+            self.inicio_ts = now
+            self.inicio_logueado = False
+        return eventos
+
+    def tick(self, now):
+        """Expiración (FIN) y confirmación (INICIO), en cada frame."""
+        eventos = []
+
+        # 1) Expiración (FIN)
+        if self.accion_estable and (now - self.ultima_vez_vista) > self.hold_seconds:
+            accion_prev = self.accion_estable
+            self.accion_estable = ""
+
+            duracion = max(0.0, self.ultima_vez_vista - self.inicio_ts)
+            if self.inicio_logueado and duracion >= self.min_duration:
+                eventos.append(
+                    (
+                        "fin",
+                        accion_prev,
+                        (
+                            "Accion",
+                            accion_prev,
+                            float(duracion),
+                            "Fin",
+                            float(self.conf_ultima),
+                            f"Duracion={duracion:.1f}s | {self.source_note}",
+                        ),
+                    )
+                )
+
+            self.inicio_logueado = False
+            self.inicio_ts = 0.0
+
+        # 2) Confirmación (INICIO válido)
+        if self.accion_estable and (not self.inicio_logueado) and self.inicio_ts:
+            if (now - self.inicio_ts) >= self.min_duration:
+                eventos.append(
+                    (
+                        "inicio",
+                        self.accion_estable,
+                        (
+                            "Accion",
+                            self.accion_estable,
+                            1.0,
+                            "Inicio",
+                            float(self.conf_ultima),
+                            f"Min={self.min_duration:.0f}s | {self.source_note}",
+                        ),
+                    )
+                )
+                self.inicio_logueado = True
+
+        return eventos
@@ -0,0 +1,258 @@
+import contextlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+ANALITICA_POR_DEFECTO = Path(__file__).resolve().parent.parent / "datos" / "analitica.db"
+
+# Resúmenes materializados: se actualizan con cada inserción (upsert), los
+# reportes nunca recorren las tablas de eventos
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS particiones (
+    nombre TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    mes TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resumen_eventos_dia (
+    dia TEXT NOT NULL,
+    camara TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    accion TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    eventos INTEGER NOT NULL DEFAULT 0,
+    valor_total REAL NOT NULL DEFAULT 0,
+    valor_max REAL NOT NULL DEFAULT 0,
+    confianza_total REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, camara, categoria, accion, estado)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resumen_animo_dia (
+    dia TEXT NOT NULL,
+    camara TEXT NOT NULL,
+    animo TEXT NOT NULL,
+    segundos REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, camara, animo)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resumen_actividad_dia (
+    dia TEXT NOT NULL,
+    camara TEXT NOT NULL,
+    muestras INTEGER NOT NULL DEFAULT 0,
+    actividad_total REAL NOT NULL DEFAULT 0,
+    actividad_max REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, camara)
+) WITHOUT ROWID;
+"""
+
+
+def _dia(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+
+
+class AnalyticsStore:
+    """Historial local de eventos para reportes sin consultar Azure.
+
+    Recibe los mismos eventos que BitacoraAves (ts, categoria, accion, valor,
+    estado, confianza, notas) y muestras periódicas de ánimo/actividad, cada
+    uno con la cámara que lo generó ("" en el modo de una cámara). Los datos
+    crudos van a tablas por mes (`eventos_AAAA_MM`, `muestras_AAAA_MM`)
+    indexadas por ts, así borrar o exportar un mes es tirar una tabla. En la
+    misma transacción se actualizan los resúmenes diarios por cámara, que son
+    lo único que leen los reportes (`daily`, `weekly`).
+    """
+
+    def __init__(self, path=ANALITICA_POR_DEFECTO):
+        self.path = str(path)
+        carpeta = os.path.dirname(self.path)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(ESQUEMA)
+        self.conn.commit()
+        self._cargar_particiones()
+
+    def _cargar_particiones(self):
+        self.particiones = {nombre for (nombre,) in self.conn.execute("SELECT nombre FROM particiones")}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # =========================================================
+    #  PARTICIONES
+    # =========================================================
+    def _particion(self, tipo, ts):
+        mes = datetime.fromtimestamp(ts).strftime("%Y_%m")
+        nombre = f"{tipo}_{mes}"
+        if nombre in self.particiones:
+            return nombre
+        if tipo == "eventos":
+            columnas = (
+                "ts REAL NOT NULL, camara TEXT NOT NULL, categoria TEXT, accion TEXT, "
+                "valor REAL, estado TEXT, confianza REAL, notas TEXT"
+            )
+        else:
+            columnas = "ts REAL NOT NULL, camara TEXT NOT NULL, animo TEXT, actividad REAL, segundos REAL"
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {nombre} ({columnas})")
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {nombre}_ts ON {nombre} (ts)")
+        self.conn.execute(
+            "INSERT OR IGNORE INTO particiones (nombre, tipo, mes) VALUES (?, ?, ?)", (nombre, tipo, mes)
+        )
+        self.particiones.add(nombre)
+        return nombre
+
+    # =========================================================
+    #  ESCRITURA
+    # =========================================================
+    @contextlib.contextmanager
+    def _transaccion(self):
+        try:
+            with self.conn:
+                yield
+        except Exception:
+            # sqlite3 confirma solo los CREATE TABLE/INDEX (no abren transacción),
+            # pero el rollback deshace el INSERT en `particiones`: se recarga el
+            # caché desde la tabla para volver a anotar esa partición la próxima vez
+            self._cargar_particiones()
+            raise
+
+    def append(self, events, camera=""):
+        """Agrega eventos (ts, categoria, accion, valor, estado, confianza, notas) de `camera` en una transacción."""
+        if not events:
+            return
+        with self.lock, self._transaccion():
+            por_particion = {}
+            for evento in events:
+                por_particion.setdefault(self._particion("eventos", evento[0]), []).append(
+                    (evento[0], camera) + tuple(evento[1:])
+                )
+            for nombre, filas in por_particion.items():
+                self.conn.executemany(
+                    f"INSERT INTO {nombre} (ts, camara, categoria, accion, valor, estado, confianza, notas) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    filas,
+                )
+            self.conn.executemany(
+                "INSERT INTO resumen_eventos_dia "
+                "(dia, camara, categoria, accion, estado, eventos, valor_total, valor_max, confianza_total) "
+                "VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT (dia, camara, categoria, accion, estado) DO UPDATE SET "
+                "eventos = eventos + 1, "
+                "valor_total = valor_total + excluded.valor_total, "
+                "valor_max = MAX(valor_max, excluded.valor_max), "
+                "confianza_total = confianza_total + excluded.confianza_total",
+                [
+                    (
+                        _dia(ts),
+                        camera,
+                        categoria or "",
+                        accion or "",
+                        estado or "",
+                        valor or 0.0,
+                        valor or 0.0,
+                        confianza or 0.0,
+                    )
+                    for ts, categoria, accion, valor, estado, confianza, _notas in events
+                ],
+            )
+
+    def add_sample(self, ts, mood, activity, seconds, camera=""):
+        """Muestra de ánimo/actividad de `camera` que representa los `seconds` previos a `ts`."""
+        dia = _dia(ts)
+        with self.lock, self._transaccion():
+            nombre = self._particion("muestras", ts)
+            self.conn.execute(
+                f"INSERT INTO {nombre} (ts, camara, animo, actividad, segundos) VALUES (?, ?, ?, ?, ?)",
+                (ts, camera, mood, activity, seconds),
+            )
+            self.conn.execute(
+                "INSERT INTO resumen_animo_dia (dia, camara, animo, segundos) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (dia, camara, animo) DO UPDATE SET segundos = segundos + excluded.segundos",
+                (dia, camera, mood, seconds),
+            )
+            self.conn.execute(
+                "INSERT INTO resumen_actividad_dia (dia, camara, muestras, actividad_total, actividad_max) "
+                "VALUES (?, ?, 1, ?, ?) "
+                "ON CONFLICT (dia, camara) DO UPDATE SET "
+                "muestras = muestras + 1, "
+                "actividad_total = actividad_total + excluded.actividad_total, "
+                "actividad_max = MAX(actividad_max, excluded.actividad_max)",
+                (dia, camera, activity, activity),
+            )
+
+    # =========================================================
+    #  REPORTES
+    # =========================================================
+    def daily(self, since, until, camera=None):
+        """Reporte por día entre `since` y `until` ("AAAA-MM-DD", inclusivos).
+
+        Sin `camera` suma todas las cámaras.
+        """
+        return self._reporte("dia", since, until, camera)
+
+    def weekly(self, since, until, camera=None):
+        """Igual que `daily` pero agrupado por semana de lunes a domingo ("AAAA-Www")."""
+        return self._reporte("strftime('%Y-W%W', dia)", since, until, camera)
+
+    def cameras(self):
+        """Cámaras con datos ("" es la cámara del modo de una sola cámara)."""
+        with self.lock:
+            filas = self.conn.execute(
+                "SELECT camara FROM resumen_eventos_dia UNION SELECT camara FROM resumen_animo_dia ORDER BY 1"
+            ).fetchall()
+        return [camara for (camara,) in filas]
+
+    def _reporte(self, periodo, since, until, camera=None):
+        filtro = "dia BETWEEN ? AND ?"
+        parametros = (since, until)
+        if camera is not None:
+            filtro += " AND camara = ?"
+            parametros += (camera,)
+        with self.lock:
+            acciones = self.conn.execute(
+                f"SELECT {periodo}, accion, SUM(eventos), SUM(valor_total), MAX(valor_max) "
+                f"FROM resumen_eventos_dia WHERE {filtro} "
+                "AND categoria = 'Accion' AND estado = 'Fin' GROUP BY 1, 2",
+                parametros,
+            ).fetchall()
+            otros = self.conn.execute(
+                f"SELECT {periodo}, categoria, accion, SUM(eventos) "
+                f"FROM resumen_eventos_dia WHERE {filtro} "
+                "AND ((categoria = 'Audio' AND estado = 'Fin') OR categoria = 'Salud') GROUP BY 1, 2, 3",
+                parametros,
+            ).fetchall()
+            animos = self.conn.execute(
+                f"SELECT {periodo}, animo, SUM(segundos) FROM resumen_animo_dia "
+                f"WHERE {filtro} GROUP BY 1, 2",
+                parametros,
+            ).fetchall()
+            actividad = self.conn.execute(
+                f"SELECT {periodo}, SUM(muestras), SUM(actividad_total), MAX(actividad_max) "
+                f"FROM resumen_actividad_dia WHERE {filtro} GROUP BY 1",
+                parametros,
+            ).fetchall()
+
+        reporte = {}
+
+        def fila(clave):
+            return reporte.setdefault(
+                clave, {"acciones": {}, "audio": {}, "salud": {}, "animo": {}, "actividad": None}
+            )
+
+        for clave, accion, eventos, total, maximo in acciones:
+            fila(clave)["acciones"][accion] = {"sesiones": eventos, "segundos": total, "max_segundos": maximo}
+        for clave, categoria, accion, eventos in otros:
+            fila(clave)["audio" if categoria == "Audio" else "salud"][accion] = eventos
+        for clave, animo, segundos in animos:
+            fila(clave)["animo"][animo] = segundos
+        for clave, muestras, total, maximo in actividad:
+            fila(clave)["actividad"] = {"media": total / muestras if muestras else 0.0, "max": maximo}
+        return dict(sorted(reporte.items()))
+
+    def get_stats(self):
+        with self.lock:
+            return {"partitions": len(self.particiones)}
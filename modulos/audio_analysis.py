@@ -2,16 +2,38 @@ import av
 import numpy as np
 import threading
 import time
+from collections import deque
+
+from modulos.audio_events import AudioEventDetector
+from modulos.spectral import SpectralAnalyzer
+
+SAMPLE_RATE = 16000
 
 class AudioMonitor:
-    def __init__(self, rtsp_url):
+    def __init__(self, rtsp_url=None, history_seconds=5.0, guardar=None, source_note="TapoMovil"):
+        # Si rtsp_url es None el audio llega desde una sesión compartida (feed)
         self.url = rtsp_url
         self.running = False
         self.thread = None
         self.latest_status = "Silencio"
         self.latest_rms = 0.0
         self.latest_freq = 0.0
+        self.latest_centroid = 0.0
+        self.latest_bands = None
+        self.latest_ts = None
         self.lock = threading.Lock()
+        self.resampler = None
+        self.chunks_analyzed = 0
+        # Ventanas de 64 ms cada 32 ms, sin importar el tamaño de los paquetes
+        self.analyzer = SpectralAnalyzer(sample_rate=SAMPLE_RATE, frame_size=1024, hop=512)
+        self.hop_seconds = self.analyzer.hop / float(SAMPLE_RATE)
+
+        # Gritos/ruidos detectados hop a hop; `guardar` recibe sus registros (BD)
+        self.guardar = guardar
+
+        # Historial corto (ts del stream, status, rms, freq) para alinear con video
+        self.history_seconds = history_seconds
+        self.history = deque()
 
         # Configuración de umbrales
         # Estos valores necesitan calibración en el entorno real
@@ -19,8 +41,15 @@ class AudioMonitor:
         self.RMS_THRESHOLD_CONTENT = 0.02 # Volumen medio/bajo
         self.FREQ_THRESHOLD_HIGH = 1500 # Hz, umbral para chillidos agudos
 
+        self.events = AudioEventDetector(
+            rms_on=self.RMS_THRESHOLD_SCREAM,
+            rms_off=self.RMS_THRESHOLD_SCREAM * 0.7,
+            freq_high=self.FREQ_THRESHOLD_HIGH,
+            source_note=source_note,
+        )
+
     def start(self):
-        if self.running:
+        if self.running or self.url is None:
             return
         self.running = True
         self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
@@ -31,14 +60,75 @@ class AudioMonitor:
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=2)
 
-    def get_status(self):
+    def get_status(self, at=None):
+        """Estado de audio actual, o el vigente en el instante `at` del stream.
+
+        `at` usa el mismo reloj que los frames de video de la sesión compartida,
+        así el estado de ánimo combina audio y video del mismo momento.
+        """
         with self.lock:
+            if at is not None and self.history:
+                for ts, status, rms, freq, centroid in reversed(self.history):
+                    if ts <= at:
+                        return {"status": status, "rms": rms, "freq": freq, "centroid": centroid, "ts": ts}
             return {
                 "status": self.latest_status,
                 "rms": self.latest_rms,
-                "freq": self.latest_freq
+                "freq": self.latest_freq,
+                "centroid": self.latest_centroid,
+                "ts": self.latest_ts,
             }
 
+    def get_stats(self):
+        with self.lock:
+            return {
+                "chunks": self.chunks_analyzed,
+                "rms": self.latest_rms,
+                "freq": self.latest_freq,
+                "centroid": self.latest_centroid,
+                "screaming": self.latest_status == "Gritando",
+                "events": self.events.count,
+            }
+
+    def get_events(self, since=None):
+        """Eventos de audio terminados (inicio, fin, evento, pico_rms, centroide).
+
+        Los tiempos están en el reloj del stream; `since` filtra por fin.
+        """
+        with self.lock:
+            eventos = list(self.events.history)
+        if since is not None:
+            eventos = [e for e in eventos if e[1] >= since]
+        return eventos
+
+    def reset_stream(self):
+        """Descarta el estado del decoder al (re)abrir el stream."""
+        self.resampler = None
+        self.analyzer.reset()
+        with self.lock:
+            self.history.clear()
+            # El reloj del stream vuelve a empezar: el evento en curso se descarta
+            self.events.reset()
+
+    def feed(self, frame):
+        """Procesa un frame de audio decodificado por una sesión externa."""
+        if self.resampler is None:
+            # Resampler para estandarizar a mono, 16kHz
+            self.resampler = av.AudioResampler(format='flt', layout='mono', rate=SAMPLE_RATE)
+
+        ts = frame.time
+        for out_frame in self.resampler.resample(frame):
+            # Mono empaquetado llega como (1, N): lo aplanamos a N muestras
+            self.feed_samples(out_frame.to_ndarray().reshape(-1), ts)
+            ts = None
+
+    def feed_samples(self, samples, ts=None):
+        """Procesa muestras mono float32 a 16 kHz (`ts` = reloj del stream de la primera)."""
+        # El analizador acumula y devuelve los hops completos
+        features = self.analyzer.push(samples, ts)
+        if features is not None:
+            self._update_status(features)
+
     def _monitor_loop(self):
         print(f"🎤 Iniciando monitoreo de audio en hilo secundario...")
         while self.running:
@@ -55,21 +145,14 @@ class AudioMonitor:
                     continue
 
                 stream = container.streams.audio[0]
-
-                # Resampler para estandarizar a mono, 16kHz
-                resampler = av.AudioResampler(format='flt', layout='mono', rate=16000)
+                self.reset_stream()
 
                 for frame in container.decode(stream):
                     if not self.running:
                         break
 
                     # Procesar frame
-                    out_frames = resampler.resample(frame)
-
-                    for out_frame in out_frames:
-                        audio_data = out_frame.to_ndarray()
-                        # Procesar en chunks
-                        self._analyze_chunk(audio_data)
+                    self.feed(frame)
 
             except Exception as e:
                 # print(f"⚠️ Error audio loop: {e}. Reintentando en 5s...")
@@ -82,39 +165,52 @@ class AudioMonitor:
                     except:
                         pass
 
-    def _analyze_chunk(self, data):
-        if len(data) == 0:
-            return
-
-        # Calcular RMS (Volumen)
-        rms = np.sqrt(np.mean(data**2))
-
-        # Calcular Frecuencia Dominante (FFT)
-        freq = 0.0
-        if rms > 0.001:
-            # Hanning window para suavizar bordes
-            windowed = data * np.hanning(len(data))
-            w = np.fft.fft(windowed)
-            freqs = np.fft.fftfreq(len(w))
-            idx = np.argmax(np.abs(w))
-            freq = freqs[idx] * 16000 # Tasa de muestreo
-            freq = abs(freq)
-
-        status = "Silencio"
-
+    def _classify(self, rms, freq):
+        """Estado de cada hop (vectorizado sobre los hops de un push)."""
         # Lógica heurística simple
-        if rms > self.RMS_THRESHOLD_SCREAM:
-            if freq > self.FREQ_THRESHOLD_HIGH:
-                status = "Gritando" # Agudo y fuerte
-            else:
-                status = "Ruido Fuerte"
-        elif rms > self.RMS_THRESHOLD_CONTENT:
-            # Si el volumen es moderado
-            status = "Sonidos"
-            # Aquí podríamos diferenciar "Contento" si tuviéramos más métricas
-            # Por ahora asumimos que sonidos suaves son positivos o neutros
+        fuerte = rms > self.RMS_THRESHOLD_SCREAM
+        return np.select(
+            [fuerte & (freq > self.FREQ_THRESHOLD_HIGH), fuerte, rms > self.RMS_THRESHOLD_CONTENT],
+            # Agudo y fuerte / fuerte / volumen moderado (neutro o positivo)
+            ["Gritando", "Ruido Fuerte", "Sonidos"],
+            default="Silencio",
+        )
+
+    def _update_status(self, features):
+        estados = self._classify(features.rms, features.peak_freq).tolist()
+        rms = features.rms.tolist()
+        freqs = features.peak_freq.tolist()
+        centroids = features.centroid.tolist()
+        tss = [None if np.isnan(t) else t for t in features.ts.tolist()]
+
+        ahora = time.time()
+        if tss[-1] is not None:
+            det_ts, offset = tss, ahora - tss[-1]
+        else:
+            # Sin reloj del stream: hops espaciados hacia atrás desde ahora
+            n = len(tss)
+            det_ts, offset = [ahora - (n - 1 - i) * self.hop_seconds for i in range(n)], 0.0
 
         with self.lock:
-            self.latest_rms = float(rms)
-            self.latest_freq = float(freq)
-            self.latest_status = status
+            registros = self.events.process(det_ts, rms, freqs, centroids, self.hop_seconds, offset)
+            self.latest_rms = rms[-1]
+            self.latest_freq = freqs[-1]
+            self.latest_centroid = centroids[-1]
+            self.latest_bands = features.bands[-1]
+            self.latest_status = estados[-1]
+            self.latest_ts = tss[-1]
+            self.chunks_analyzed += len(estados)
+
+            for entrada in zip(tss, estados, rms, freqs, centroids):
+                if entrada[0] is not None:
+                    self.history.append(entrada)
+            while self.history and self.history[-1][0] - self.history[0][0] > self.history_seconds:
+                self.history.popleft()
+
+        for tipo, evento, registro in registros:
+            if tipo == "inicio":
+                print(f"🔊 INICIO AUDIO: {evento}")
+            else:
+                print(f"🔇 FIN AUDIO: {evento} ({registro[2]:.1f}s)")
+            if self.guardar is not None:
+                self.guardar(*registro)
@@ -0,0 +1,130 @@
+import time
+from collections import deque
+from datetime import datetime
+
+
+class AudioEventDetector:
+    """Eventos de audio (gritos y ruidos fuertes) con histéresis y antirrebote.
+
+    Recibe cada hop del analizador espectral, así que no se pierden sonidos
+    cortos entre frames de video. Un evento empieza cuando el RMS supera
+    `rms_on` durante al menos `min_on` segundos, y termina cuando pasan
+    `hold_off` segundos por debajo de `rms_off` (< `rms_on`), de modo que un
+    chillido entrecortado es un único evento. Es "Grito" si la mayoría de sus
+    hops son agudos (frecuencia dominante > `freq_high`) y si no "Ruido Fuerte".
+
+    `process` devuelve, como ActionStateMachine, tuplas (tipo, evento,
+    registro) con tipo "inicio" o "fin" y `registro` en el formato de
+    insertar_registro. Los eventos terminados quedan en `history` (acotado),
+    con timestamps del reloj del stream exactos al hop.
+    """
+
+    def __init__(
+        self,
+        rms_on=0.2,
+        rms_off=0.14,
+        freq_high=1500,
+        min_on=0.1,
+        hold_off=0.4,
+        max_history=500,
+        source_note="TapoMovil",
+    ):
+        self.rms_on = rms_on
+        self.rms_off = rms_off
+        self.freq_high = freq_high
+        self.min_on = min_on
+        self.hold_off = hold_off
+        self.source_note = source_note
+
+        # (inicio, fin, evento, pico_rms, centroide_medio) en reloj del stream
+        self.history = deque(maxlen=max_history)
+        self.count = 0
+
+        # inactivo / pendiente (supera rms_on, aún no min_on) / activo
+        self.reset()
+
+    def reset(self):
+        self.estado = "inactivo"
+        self._reset_evento()
+
+    def _reset_evento(self):
+        self.inicio = None
+        self.ultimo_fuerte = None
+        self.pico_rms = 0.0
+        self.hops = 0
+        self.hops_agudos = 0
+        self.suma_centroide = 0.0
+
+    def _acumular(self, ts, rms, freq, centroid):
+        self.ultimo_fuerte = ts
+        self.pico_rms = max(self.pico_rms, rms)
+        self.hops += 1
+        self.hops_agudos += freq > self.freq_high
+        self.suma_centroide += centroid
+
+    @property
+    def evento(self):
+        return "Grito" if self.hops_agudos * 2 > self.hops else "Ruido Fuerte"
+
+    @staticmethod
+    def _hora(ts_pared):
+        return datetime.fromtimestamp(ts_pared).strftime("%H:%M:%S.%f")[:-3]
+
+    def process(self, tss, rms, freqs, centroids, hop_seconds, wall_offset=None):
+        """Procesa los hops de un push (listas paralelas, ts = fin de cada ventana).
+
+        `wall_offset` convierte el reloj del stream a hora de pared para las notas.
+        """
+        if wall_offset is None and tss:
+            wall_offset = time.time() - tss[-1]
+
+        eventos = []
+        for ts, r, f, c in zip(tss, rms, freqs, centroids):
+            if self.estado == "inactivo":
+                if r >= self.rms_on:
+                    self.estado = "pendiente"
+                    # El sonido empezó al principio de este hop
+                    self.inicio = ts - hop_seconds
+                    self._acumular(ts, r, f, c)
+                continue
+
+            if r >= self.rms_off:
+                self._acumular(ts, r, f, c)
+            elif self.estado == "pendiente":
+                # Antirrebote: demasiado corto para ser un evento
+                self.estado = "inactivo"
+                self._reset_evento()
+                continue
+
+            if self.estado == "pendiente" and (ts - self.inicio) >= self.min_on:
+                self.estado = "activo"
+                eventos.append(self._registro_inicio(wall_offset))
+            elif self.estado == "activo" and r < self.rms_off and (ts - self.ultimo_fuerte) >= self.hold_off:
+                eventos.append(self._registro_fin(wall_offset))
+                self.estado = "inactivo"
+                self._reset_evento()
+        return eventos
+
+    def _registro_inicio(self, wall_offset):
+        notas = f"Hora={self._hora(self.inicio + wall_offset)} | {self.source_note}"
+        return (
+            "inicio",
+            self.evento,
+            ("Audio", self.evento, 1.0, "Inicio", float(min(self.pico_rms, 1.0)), notas),
+        )
+
+    def _registro_fin(self, wall_offset):
+        duracion = max(0.0, self.ultimo_fuerte - self.inicio)
+        centroide = self.suma_centroide / self.hops if self.hops else 0.0
+        evento = self.evento
+        self.history.append((self.inicio, self.ultimo_fuerte, evento, self.pico_rms, centroide))
+        self.count += 1
+        notas = (
+            f"Duracion={duracion:.2f}s | Pico={self.pico_rms:.3f} | Centroide={centroide:.0f}Hz | "
+            f"Hora={self._hora(self.inicio + wall_offset)} | {self.source_note}"
+        )
+        return (
+            "fin",
+            evento,
+            ("Audio", evento, float(duracion), "Fin", float(min(self.pico_rms, 1.0)), notas),
+        )
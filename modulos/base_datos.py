@@ -1,6 +1,20 @@
 import os
+import queue
+import threading
+import time
+from datetime import datetime
 
-import pyodbc
+try:
+    import pyodbc  # type: ignore
+except ImportError:
+    # Sin driver los eventos igual quedan en el respaldo local (EventSpool)
+    pyodbc = None
+
+QUERY_INSERTAR = """
+    INSERT INTO BitacoraAves
+    (Categoria, Accion, Valor_Numerico, Estado_Observado, Confianza_IA, Notas)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
 
 
 def _cargar_config_azure() -> dict:
@@ -35,6 +49,10 @@ def _cargar_config_azure() -> dict:
 
 def obtener_conexion():
     """Crea y devuelve la conexión a Azure"""
+    if pyodbc is None:
+        print("❌ pyodbc no está instalado: no se puede conectar a Azure.")
+        return None
+
     config = _cargar_config_azure()
     if not config:
         print(
@@ -65,12 +83,7 @@ def insertar_registro(categoria, accion, valor, estado, confianza, notas=""):
 
     try:
         cursor = conn.cursor()
-        query = """
-            INSERT INTO BitacoraAves 
-            (Categoria, Accion, Valor_Numerico, Estado_Observado, Confianza_IA, Notas)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """
-        cursor.execute(query, (categoria, accion, valor, estado, confianza, notas))
+        cursor.execute(QUERY_INSERTAR, (categoria, accion, valor, estado, confianza, notas))
         conn.commit()
         print(f"☁️ [AZURE] Registro guardado: {accion}")
         return True
@@ -78,4 +91,251 @@ def insertar_registro(categoria, accion, valor, estado, confianza, notas=""):
         print(f"⚠️ Error al insertar: {e}")
         return False
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+class EscritorBitacora:
+    """Escritor de larga vida para BitacoraAves.
+
+    Mantiene una sola conexión abierta, recibe eventos por una cola acotada y
+    los inserta con `executemany` en lotes, cuando se junta `tam_lote` o pasa
+    `intervalo_flush` segundos. `conectar` es cualquier función que devuelva
+    una conexión DB-API con parámetros `?` (pyodbc o sqlite3 para pruebas).
+
+    Con `spool` (un EventSpool) cada evento se anota en disco dentro de
+    `encolar`, antes de volver, y lo que se sube a Azure sale siempre del
+    respaldo: si la BD se cae o el proceso muere, los eventos ya están en
+    disco y se reenvían en lotes de `tam_replay` al volver. La cola sólo
+    guarda los eventos cuyo anotado falló, para que el hilo los reintente.
+    """
+
+    def __init__(
+        self,
+        conectar=obtener_conexion,
+        tam_lote=50,
+        intervalo_flush=2.0,
+        max_cola=1000,
+        spool=None,
+        tam_replay=500,
+    ):
+        self.conectar = conectar
+        self.spool = spool
+        self.tam_replay = tam_replay
+        self.proximo_intento = 0.0
+        self.proxima_purga = 0.0
+        self.tam_lote = tam_lote
+        self.intervalo_flush = intervalo_flush
+        self.cola = queue.Queue(maxsize=max_cola)
+        self.conn = None
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+
+        # Lote que falló y se reintenta antes de tomar eventos nuevos
+        self.pendientes = []
+        self.espera_reintento = 0.0
+        # Eventos sin subir que quedaron en el respaldo al detenerse (`stop`)
+        self.pendientes_al_cerrar = None
+
+        # Métricas
+        self.escritos = 0
+        self.descartados = 0
+        self.lotes = 0
+        self.fallos = 0
+        self.ultimo_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """Detiene el hilo intentando vaciar lo que quede en la cola."""
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+        if self.thread and self.thread.is_alive():
+            # Sigue dentro de un flush: cerrarle la conexión la rompería a mitad de uso
+            print("⚠️ El escritor de BD no terminó a tiempo, su conexión queda abierta")
+            return
+        self._cerrar_conexion()
+        if self.spool is not None:
+            self.pendientes_al_cerrar = self.spool.count_pending()
+            # Al cerrar la última conexión SQLite vuelca el WAL a la base
+            self.spool.close()
+
+    def encolar(self, categoria, accion, valor, estado, confianza, notas=""):
+        """Agrega un evento sin esperar a la BD. Devuelve False si se descartó.
+
+        Con respaldo local el evento ya está en disco cuando vuelve.
+        """
+        evento = (time.time(), categoria, accion, valor, estado, confianza, notas)
+        if self.spool is not None:
+            try:
+                self.spool.append([evento])
+                return True
+            except Exception as e:
+                # Se deja en la cola: el hilo vuelve a intentar anotarlo
+                print(f"❌ Error escribiendo respaldo local: {e}")
+        try:
+            self.cola.put_nowait(evento)
+            return True
+        except queue.Full:
+            with self.lock:
+                self.descartados += 1
+            return False
+
+    def get_stats(self):
+        if self.pendientes_al_cerrar is not None:
+            pendientes = self.pendientes_al_cerrar
+        elif self.spool is not None:
+            pendientes = self.spool.count_pending()
+        else:
+            pendientes = len(self.pendientes)
+        with self.lock:
+            return {
+                "cola": self.cola.qsize(),
+                "pendientes": pendientes,
+                "escritos": self.escritos,
+                "descartados": self.descartados,
+                "lotes": self.lotes,
+                "fallos": self.fallos,
+                "ultimo_flush_ms": self.ultimo_flush_ms,
+                "max_flush_ms": self.max_flush_ms,
+            }
+
+    def _loop(self):
+        if self.spool is not None:
+            self._loop_spool()
+            return
+
+        while self.running or not self.cola.empty() or self.pendientes:
+            lote = self.pendientes or self._juntar_lote()
+            if not lote:
+                continue
+
+            if self._flush([evento[1:] for evento in lote]):
+                self.pendientes = []
+                self.espera_reintento = 0.0
+                continue
+
+            self.pendientes = lote
+            if not self.running:
+                # Apagando y la BD no responde: no vale la pena esperar más
+                break
+            # Backoff exponencial para no martillar Azure mientras está caído
+            self.espera_reintento = min(max(self.espera_reintento * 2, 1.0), 30.0)
+            time.sleep(self.espera_reintento)
+
+    def _loop_spool(self):
+        while True:
+            # En la cola sólo está lo que `encolar` no pudo anotar; la espera
+            # de `_juntar_lote` marca además el ritmo de los reenvíos
+            lote = self.pendientes + self._juntar_lote()
+            if lote:
+                try:
+                    self.spool.append(lote)
+                    self.pendientes = []
+                except Exception as e:
+                    # Se reintenta en la próxima vuelta junto con lo nuevo
+                    print(f"❌ Error escribiendo respaldo local: {e}")
+                    self.pendientes = lote
+
+            ahora = time.time()
+            if ahora >= self.proximo_intento:
+                self._replay()
+
+            if ahora >= self.proxima_purga:
+                # Lo ya subido no necesita quedarse para siempre en disco
+                self.proxima_purga = ahora + 3600
+                try:
+                    self.spool.prune()
+                except Exception as e:
+                    print(f"⚠️ Error purgando respaldo local: {e}")
+
+            if not self.running and self.cola.empty():
+                break
+
+    def _replay(self, max_lotes=20):
+        """Sube lo pendiente del respaldo. Acotado para volver a drenar la cola."""
+        for _ in range(max_lotes):
+            filas = self.spool.pending(self.tam_replay)
+            if not filas:
+                break
+
+            ahora = time.time()
+            lote = [self._fila_para_azure(fila, ahora) for fila in filas]
+            if not self._flush(lote):
+                # Backoff exponencial: los eventos siguen seguros en disco
+                self.espera_reintento = min(max(self.espera_reintento * 2, 1.0), 30.0)
+                self.proximo_intento = ahora + self.espera_reintento
+                return
+
+            self.spool.mark_sent(filas[-1][0])
+            self.espera_reintento = 0.0
+
+    @staticmethod
+    def _fila_para_azure(fila, ahora, retraso_max=60.0):
+        _id, ts, categoria, accion, valor, estado, confianza, notas = fila
+        if ahora - ts > retraso_max:
+            # BitacoraAves fecha el registro al insertarlo: si llega tarde
+            # (reenvío tras un corte) dejamos constancia de la hora real
+            hora = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+            notas = f"{notas} | Registrado={hora}" if notas else f"Registrado={hora}"
+        return (categoria, accion, valor, estado, confianza, notas)
+
+    def _juntar_lote(self):
+        lote = []
+        limite = time.time() + self.intervalo_flush
+        while len(lote) < self.tam_lote:
+            restante = limite - time.time()
+            if restante <= 0 or (not self.running and self.cola.empty()):
+                break
+            try:
+                lote.append(self.cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _flush(self, lote):
+        inicio = time.perf_counter()
+        if self.conn is None:
+            self.conn = self.conectar()
+            if self.conn is None:
+                with self.lock:
+                    self.fallos += 1
+                return False
+
+        try:
+            cursor = self.conn.cursor()
+            if hasattr(cursor, "fast_executemany"):
+                cursor.fast_executemany = True
+            cursor.executemany(QUERY_INSERTAR, lote)
+            self.conn.commit()
+        except Exception as e:
+            print(f"⚠️ Error al insertar lote ({len(lote)} eventos): {e}")
+            # La conexión puede haber quedado inválida: se recrea en el próximo intento
+            self._cerrar_conexion()
+            with self.lock:
+                self.fallos += 1
+            return False
+
+        ms = (time.perf_counter() - inicio) * 1000
+        with self.lock:
+            self.escritos += len(lote)
+            self.lotes += 1
+            self.ultimo_flush_ms = ms
+            self.max_flush_ms = max(self.max_flush_ms, ms)
+        print(f"☁️ [AZURE] Lote guardado: {len(lote)} eventos ({ms:.0f} ms)")
+        return True
+
+    def _cerrar_conexion(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
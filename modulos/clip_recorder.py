@@ -0,0 +1,259 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import av
+
+CLIPS_POR_DEFECTO = Path(__file__).resolve().parent.parent / "datos" / "clips"
+
+# Códecs de audio que el contenedor MP4 acepta tal cual (el A-law/µ-law de las
+# Tapo no: esos clips quedan sólo con video)
+AUDIO_MP4 = {"aac", "mp3", "opus"}
+
+
+class ClipRecorder:
+    """Clips de los eventos armados con los paquetes comprimidos de la cámara.
+
+    La sesión RTSP le pasa cada paquete ya codificado (`add_packet`) y se
+    guardan los últimos `pre_seconds` en un buffer circular que siempre
+    empieza en un keyframe: son unos pocos MB por minuto, en lugar de los
+    cientos que ocuparían frames decodificados. Con `trigger` el buffer y los
+    `post_seconds` siguientes se remultiplexan a un MP4 con PyAV, sin
+    decodificar ni recodificar. Si llega otro evento mientras se graba, el
+    mismo clip se extiende.
+
+    La escritura ocurre en el hilo de captura (el remux casi no cuesta CPU);
+    `trigger` sólo deja el pedido y devuelve la ruta que tendrá el clip.
+    """
+
+    def __init__(self, directory=CLIPS_POR_DEFECTO, pre_seconds=10.0, post_seconds=20.0, max_buffer_mb=64):
+        self.directory = Path(directory)
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_buffer_bytes = int(max_buffer_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+
+        # Buffer de pre-grabación: (n, ts, paquete) y posiciones de los keyframes de video
+        self.buffer = deque()
+        self.keyframes = deque()
+        self.buffer_bytes = 0
+        self.n = 0
+
+        self.video = None
+        self.audio = None
+        self.ultimo_ts = None
+
+        # Pedido pendiente (lo deja `trigger`, lo abre el hilo de captura)
+        self.ruta_pendiente = None
+        self.hasta = None
+        self.ruta_actual = None
+
+        # Clip en curso (sólo lo toca el hilo de captura)
+        self.salida = None
+        self.mapa = {}
+        self.offsets = {}
+        self.t0 = None
+
+        self.clips = 0
+        self.errores = 0
+
+    # =========================================================
+    #  LADO DE LA SESIÓN (hilo de captura)
+    # =========================================================
+    def open_stream(self, video, audio=None):
+        """Nueva conexión: el buffer anterior no sirve (otros timestamps/parámetros)."""
+        self.close_stream()
+        self.video = video
+        self.audio = audio if audio is not None and audio.codec_context.name in AUDIO_MP4 else None
+
+    def close_stream(self):
+        """Cierra el clip en curso antes de que se cierre el contenedor de entrada."""
+        self._cerrar()
+        with self.lock:
+            self.buffer.clear()
+            self.keyframes.clear()
+            self.buffer_bytes = 0
+            self.ultimo_ts = None
+            self.hasta = None
+            self.ruta_pendiente = None
+            self.ruta_actual = None
+        self.video = None
+        self.audio = None
+
+    def add_packet(self, packet):
+        if packet.stream is not self.video and packet.stream is not self.audio:
+            return
+        dts = packet.dts if packet.dts is not None else packet.pts
+        if dts is None or packet.size == 0:
+            return
+        ts = float(dts * packet.time_base)
+        clave = packet.stream is self.video and packet.is_keyframe
+
+        with self.lock:
+            self.ultimo_ts = ts
+            self.n += 1
+            self.buffer.append((self.n, ts, packet))
+            self.buffer_bytes += packet.size
+            if clave:
+                self.keyframes.append((self.n, ts))
+            self._recortar()
+
+            ruta = self.ruta_pendiente
+            self.ruta_pendiente = None
+            pendientes = list(self.buffer) if ruta is not None else None
+
+        if ruta is not None:
+            self._abrir(ruta, [p for _n, _ts, p in pendientes])
+        elif self.salida is not None:
+            self._escribir(packet)
+
+        if self.salida is not None:
+            # La decisión se toma bajo el lock para no perder un `trigger` que extienda el clip
+            with self.lock:
+                terminar = self.hasta is None or ts >= self.hasta
+                if terminar:
+                    self.ruta_actual = None
+                    self.hasta = None
+            if terminar:
+                self._cerrar()
+
+    def _recortar(self):
+        # Se descarta hasta el keyframe más nuevo que todavía cubre pre_seconds,
+        # así el buffer siempre arranca decodificable
+        while len(self.keyframes) >= 2 and self.ultimo_ts - self.keyframes[1][1] >= self.pre_seconds:
+            self.keyframes.popleft()
+            self._descartar_hasta(self.keyframes[0][0])
+
+        # Tope de memoria (p. ej. un GOP larguísimo): se corta aunque quede a mitad de GOP
+        while self.buffer_bytes > self.max_buffer_bytes and len(self.buffer) > 1:
+            _n, _ts, paquete = self.buffer.popleft()
+            self.buffer_bytes -= paquete.size
+            while self.keyframes and self.keyframes[0][0] < self.buffer[0][0]:
+                self.keyframes.popleft()
+
+    def _descartar_hasta(self, n):
+        while self.buffer and self.buffer[0][0] < n:
+            _n, _ts, paquete = self.buffer.popleft()
+            self.buffer_bytes -= paquete.size
+
+    # =========================================================
+    #  REMUX
+    # =========================================================
+    def _abrir(self, ruta, paquetes):
+        try:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            self.salida = av.open(str(ruta), "w", format="mp4")
+            self.mapa = {self.video: self.salida.add_stream_from_template(self.video)}
+            if self.audio is not None:
+                self.mapa[self.audio] = self.salida.add_stream_from_template(self.audio)
+        except Exception as e:
+            self._fallo(ruta, e)
+            return
+        self.offsets = {}
+        self.t0 = None
+        print(f"🎬 Grabando clip: {ruta.name}")
+        for paquete in paquetes:
+            if self.salida is None:
+                break
+            self._escribir(paquete)
+
+    def _escribir(self, paquete):
+        salida = self.mapa.get(paquete.stream)
+        if salida is None or paquete.dts is None:
+            return
+
+        # El clip empieza en el primer keyframe de video; el audio anterior se descarta
+        if self.t0 is None:
+            if paquete.stream is not self.video or not paquete.is_keyframe:
+                return
+            self.t0 = float(paquete.dts * paquete.time_base)
+        offset = self.offsets.get(paquete.stream)
+        if offset is None:
+            offset = self.offsets[paquete.stream] = round(self.t0 / paquete.time_base)
+        if paquete.dts < offset:
+            return
+
+        # El paquete sigue en el buffer (lo decodifica la sesión y puede ir
+        # al pre-roll del próximo clip) y `mux` le cambia el time_base: se
+        # multiplexa una copia
+        copia = av.Packet(bytes(paquete))
+        copia.stream = salida
+        copia.time_base = paquete.time_base
+        copia.dts = paquete.dts - offset
+        copia.pts = paquete.pts - offset if paquete.pts is not None else None
+        if paquete.duration is not None:
+            copia.duration = paquete.duration
+        copia.is_keyframe = paquete.is_keyframe
+        try:
+            self.salida.mux(copia)
+        except Exception as e:
+            self._fallo(self.ruta_actual, e)
+
+    def _cerrar(self):
+        if self.salida is None:
+            return
+        try:
+            self.salida.close()
+            self.clips += 1
+        except Exception as e:
+            print(f"⚠️ Error cerrando clip: {e}")
+            self.errores += 1
+        self.salida = None
+        self.mapa = {}
+
+    def _fallo(self, ruta, error):
+        print(f"⚠️ No se pudo grabar el clip {ruta}: {error}")
+        self.errores += 1
+        if self.salida is not None:
+            try:
+                self.salida.close()
+            except Exception:
+                pass
+        self.salida = None
+        self.mapa = {}
+        with self.lock:
+            self.ruta_actual = None
+            self.hasta = None
+
+    # =========================================================
+    #  LADO DEL PIPELINE
+    # =========================================================
+    def trigger(self, evento, now=None):
+        """Pide un clip para `evento`; devuelve su ruta (o None sin stream).
+
+        Si ya hay uno grabándose, se extiende y se devuelve esa misma ruta.
+        """
+        with self.lock:
+            if self.ultimo_ts is None:
+                return None
+            self.hasta = self.ultimo_ts + self.post_seconds
+            if self.ruta_actual is None:
+                momento = datetime.fromtimestamp(now if now is not None else time.time())
+                nombre = f"{momento:%H%M%S}_{_nombre_archivo(evento)}.mp4"
+                self.ruta_actual = self.directory / f"{momento:%Y-%m-%d}" / nombre
+                self.ruta_pendiente = self.ruta_actual
+            return self.ruta_actual
+
+    def get_stats(self):
+        with self.lock:
+            segundos = self.buffer[-1][1] - self.buffer[0][1] if self.buffer else 0.0
+            return {
+                "clips": self.clips,
+                "errors": self.errores,
+                "recording": self.ruta_actual is not None,
+                "buffer_packets": len(self.buffer),
+                "buffer_bytes": self.buffer_bytes,
+                "buffer_seconds": segundos,
+            }
+
+
+def _nombre_archivo(texto):
+    return "".join(c if c.isalnum() else "_" for c in str(texto)).strip("_") or "evento"
+
+
+def relative_clip_path(ruta, base=CLIPS_POR_DEFECTO.parent.parent):
+    """Ruta del clip para las notas de BitacoraAves (relativa al proyecto si está dentro)."""
+    ruta = Path(ruta)
+    return str(ruta.relative_to(base)) if ruta.is_relative_to(base) else str(ruta)
@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class Detections:
+    """Detecciones de un frame como arrays NumPy contiguos.
+
+    Se extraen de los `results` de YOLO con una sola copia por resultado
+    (`boxes.data`) en lugar de leer `box.cls[0]`, `box.xyxy[0]`, ... caja por
+    caja. Los filtros se aplican con máscaras sobre todas las cajas a la vez.
+    """
+
+    __slots__ = ("xyxy", "conf", "cls", "ids", "area", "centers")
+
+    def __init__(self, xyxy, conf, cls, ids):
+        # Coordenadas enteras (truncadas como el int() de antes)
+        self.xyxy = np.ascontiguousarray(xyxy, dtype=np.int32).reshape(-1, 4)
+        self.conf = np.ascontiguousarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.ascontiguousarray(cls, dtype=np.int32).reshape(-1)
+        # -1 = sin ID de tracking
+        self.ids = np.ascontiguousarray(ids, dtype=np.int64).reshape(-1)
+
+        anchos = self.xyxy[:, 2] - self.xyxy[:, 0]
+        altos = self.xyxy[:, 3] - self.xyxy[:, 1]
+        self.area = anchos * altos
+        self.centers = np.stack(
+            ((self.xyxy[:, 0] + self.xyxy[:, 2]) // 2, (self.xyxy[:, 1] + self.xyxy[:, 3]) // 2),
+            axis=1,
+        )
+
+    def __len__(self):
+        return len(self.conf)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty((0, 4)), np.empty(0), np.empty(0), np.empty(0))
+
+    @classmethod
+    def from_results(cls, results):
+        partes = []
+        for r in results:
+            boxes = getattr(r, "boxes", None)
+            if boxes is None or len(boxes) == 0:
+                continue
+            data = boxes.data
+            if hasattr(data, "cpu"):
+                data = data.cpu().numpy()
+            partes.append(np.asarray(data, dtype=np.float32))
+
+        if not partes:
+            return cls.empty()
+
+        data = np.concatenate(partes, axis=0) if len(partes) > 1 else partes[0]
+        # boxes.data: x1, y1, x2, y2, [id,] conf, cls (el id sólo si hay tracking)
+        if data.shape[1] == 7:
+            ids = data[:, 4]
+        else:
+            ids = np.full(len(data), -1)
+        return cls(data[:, :4], data[:, -2], data[:, -1], ids)
+
+    @classmethod
+    def concat(cls, parts):
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(
+            np.concatenate([p.xyxy for p in parts]),
+            np.concatenate([p.conf for p in parts]),
+            np.concatenate([p.cls for p in parts]),
+            np.concatenate([p.ids for p in parts]),
+        )
+
+    def select(self, mask):
+        sel = Detections.__new__(Detections)
+        for nombre in self.__slots__:
+            setattr(sel, nombre, getattr(self, nombre)[mask])
+        return sel
+
+    def offset(self, dx, dy):
+        """Copia con las cajas desplazadas (de coordenadas de un recorte al frame)."""
+        return Detections(self.xyxy + np.array([dx, dy, dx, dy], dtype=np.int32), self.conf, self.cls, self.ids)
+
+    def filter(self, area_min, area_max, class_thresholds):
+        """Descarta cajas fuera de la ventana de área o bajo el umbral de su clase.
+
+        `class_thresholds` es un array indexado por id de clase (ver
+        `class_thresholds`).
+        """
+        mask = (self.area >= area_min) & (self.area <= area_max)
+        mask &= self.conf >= class_thresholds[self.cls]
+        return self.select(mask)
+
+
+def class_thresholds(names, per_class, default):
+    """Array de umbrales de confianza indexado por id de clase.
+
+    `names` es `model.names` (dict id -> nombre o lista); `per_class` mapea
+    nombre -> umbral y las clases que no aparecen usan `default`.
+    """
+    if isinstance(names, dict):
+        items = names.items()
+    else:
+        items = enumerate(names)
+    items = list(items)
+
+    umbrales = np.full(max((i for i, _ in items), default=-1) + 1, default, dtype=np.float32)
+    for i, nombre in items:
+        umbrales[i] = per_class.get(nombre, default)
+    return umbrales
+
+
+def class_id(names, nombre):
+    """Id de la clase `nombre` en `model.names`, o -1 si el modelo no la tiene."""
+    items = names.items() if isinstance(names, dict) else enumerate(names)
+    for i, n in items:
+        if n == nombre:
+            return i
+    return -1
+
+
+def box_iou(a, b):
+    """Matriz IoU (len(a) x len(b)) entre dos arrays de cajas xyxy."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class EventSpool:
+    """Bitácora local (SQLite en modo WAL) donde se anota cada evento primero.
+
+    Los eventos no se modifican: sólo avanza un cursor `enviado_hasta` a
+    medida que se suben a Azure, y `prune` borra los ya subidos más viejos que
+    unos días. Con `synchronous=FULL` cada transacción confirmada sobrevive a
+    un corte de luz o a que el proceso muera.
+    """
+
+    def __init__(self, path="datos/bitacora_spool.db"):
+        self.path = path
+        carpeta = os.path.dirname(path)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS eventos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                categoria TEXT,
+                accion TEXT,
+                valor REAL,
+                estado TEXT,
+                confianza REAL,
+                notas TEXT
+            );
+            CREATE TABLE IF NOT EXISTS estado (
+                clave TEXT PRIMARY KEY,
+                valor INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO estado (clave, valor) VALUES ('enviado_hasta', 0);
+            """
+        )
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def append(self, events):
+        """Anota varios eventos (ts, categoria, accion, valor, estado, confianza,
+        notas) en una sola transacción."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO eventos (ts, categoria, accion, valor, estado, confianza, notas) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                events,
+            )
+
+    def pending(self, limit=500):
+        """Eventos aún no subidos, en orden: lista de (id, ts, *fila)."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT id, ts, categoria, accion, valor, estado, confianza, notas FROM eventos "
+                "WHERE id > (SELECT valor FROM estado WHERE clave = 'enviado_hasta') "
+                "ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+    def mark_sent(self, last_id):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE estado SET valor = ? WHERE clave = 'enviado_hasta' AND valor < ?",
+                (last_id, last_id),
+            )
+
+    def count_pending(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM eventos "
+                "WHERE id > (SELECT valor FROM estado WHERE clave = 'enviado_hasta')"
+            ).fetchone()[0]
+
+    def prune(self, max_age_days=30):
+        """Borra eventos ya subidos más viejos que `max_age_days`."""
+        limite = time.time() - max_age_days * 86400
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM eventos WHERE ts < ? "
+                "AND id <= (SELECT valor FROM estado WHERE clave = 'enviado_hasta')",
+                (limite,),
+            )
@@ -0,0 +1,129 @@
+import threading
+import time
+
+import cv2
+
+
+class FrameGrabber:
+    """Lee la cámara en un hilo propio y entrega siempre el frame más reciente.
+
+    El bucle de procesamiento nunca espera al buffer RTSP: si la inferencia es
+    lenta, los frames intermedios se descartan en lugar de acumularse.
+    """
+
+    def __init__(self, source, reconnect_delay=2.0):
+        self.source = source
+        self.reconnect_delay = reconnect_delay
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+        self.new_frame = threading.Condition(self.lock)
+
+        # Último frame publicado por el hilo de captura
+        self.latest_frame = None
+        self.latest_ts = 0.0
+        self.latest_stream_ts = None
+        self.latest_seq = 0
+        self.consumed_seq = 0
+
+        # Contadores
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.reconnects = 0
+        self.last_frame_age = 0.0
+        self.max_frame_age = 0.0
+        # Timestamp (reloj del stream) del último frame entregado por read()
+        self.last_stream_ts = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        with self.lock:
+            self.new_frame.notify_all()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2)
+
+    def read(self, timeout=1.0):
+        """Devuelve (ret, frame) con el frame más nuevo que aún no se entregó.
+
+        Bloquea hasta `timeout` segundos si no hay un frame nuevo. El frame
+        devuelto pertenece al llamador (el hilo de captura no lo reutiliza).
+        """
+        deadline = time.time() + timeout
+        with self.lock:
+            while self.running and self.latest_seq == self.consumed_seq:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False, None
+                self.new_frame.wait(remaining)
+
+            if self.latest_seq == self.consumed_seq:
+                return False, None
+
+            # Todo lo publicado entre la última lectura y ésta se perdió
+            self.frames_dropped += self.latest_seq - self.consumed_seq - 1
+            self.consumed_seq = self.latest_seq
+
+            age = time.time() - self.latest_ts
+            self.last_frame_age = age
+            self.max_frame_age = max(self.max_frame_age, age)
+
+            frame = self.latest_frame
+            self.latest_frame = None
+            self.last_stream_ts = self.latest_stream_ts
+
+        # La conversión se hace fuera del lock y sólo para frames consumidos
+        return True, self._convert(frame)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "captured": self.frames_captured,
+                "dropped": self.frames_dropped,
+                "reconnects": self.reconnects,
+                "frame_age": self.last_frame_age,
+                "max_frame_age": self.max_frame_age,
+            }
+
+    def _convert(self, frame):
+        """Convierte el frame publicado a ndarray BGR (identidad para OpenCV)."""
+        return frame
+
+    def _publish(self, frame, ts=None, stream_ts=None):
+        with self.lock:
+            self.latest_frame = frame
+            self.latest_ts = ts if ts is not None else time.time()
+            self.latest_stream_ts = stream_ts
+            self.latest_seq += 1
+            self.frames_captured += 1
+            self.new_frame.notify()
+
+    def _capture_loop(self):
+        cap = None
+        try:
+            while self.running:
+                if cap is None or not cap.isOpened():
+                    cap = cv2.VideoCapture(self.source)
+                    # Buffer interno mínimo: la cola la manejamos nosotros
+                    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+                ret, frame = cap.read()
+                if not ret:
+                    print("⚠️ Señal perdida. Reconectando...")
+                    cap.release()
+                    cap = None
+                    with self.lock:
+                        self.reconnects += 1
+                    time.sleep(self.reconnect_delay)
+                    continue
+
+                self._publish(frame)
+        finally:
+            if cap is not None:
+                cap.release()
@@ -1,32 +1,189 @@
+import os
+import sqlite3
+import threading
 import time
+from datetime import datetime
+from pathlib import Path
+
+SALUD_POR_DEFECTO = Path(__file__).resolve().parent.parent / "datos" / "salud.db"
+
+# Acciones que cuentan para la salud (tipo guardado -> texto de la acción)
+TIPOS = ("Alimentacion", "Hidratacion")
+
+
+def _tipo(action):
+    for tipo in TIPOS:
+        if tipo in action:
+            return tipo
+    return None
+
 
 class HealthMonitor:
-    def __init__(self):
+    """Tiempo sin comer/beber, con estado y resúmenes persistentes.
+
+    Con `store_path` (SQLite en modo WAL) la última vez que se vio cada acción
+    sobrevive a un reinicio, así que las alertas no se silencian 4 horas al
+    arrancar. Cada evento actualiza además, en la misma transacción, los
+    resúmenes por hora y por día (cantidad, duración total y hueco más largo
+    desde la anterior, sin contar el tiempo con el monitor apagado): los paneles y reportes leen esas filas
+    (`get_rollups`) en lugar de recorrer la bitácora. Sin `store_path` todo
+    queda en memoria, como antes.
+    """
+
+    def __init__(self, store_path=None):
         # Timestamps de última vez visto
         # Inicializamos en 'ahora' para evitar alertas falsas al arrancar el sistema
-        self.last_eating = time.time()
-        self.last_drinking = time.time()
+        ahora = time.time()
+        self.last_eating = ahora
+        self.last_drinking = ahora
+        # Desde cuándo se observa: el tiempo con el monitor apagado no cuenta como hueco
+        self.observando_desde = ahora
 
         # Configuración de umbrales (en segundos)
         # Ejemplo: 4 horas = 4 * 3600 = 14400
         self.THRESHOLD_EATING = 14400
         self.THRESHOLD_DRINKING = 14400
 
-    def register_action(self, action):
-        """Actualiza los timestamps según la acción detectada."""
+        # Resumen del día en curso (para get_stats sin consultar la BD)
+        self.dia = None
+        self.hoy = {tipo: {"eventos": 0, "duracion": 0.0, "max_gap": 0.0} for tipo in TIPOS}
+
+        self.lock = threading.Lock()
+        self.conn = None
+        if store_path is not None:
+            self._abrir(store_path, ahora)
+        self._cargar_hoy(ahora)
+
+    # =========================================================
+    #  ALMACÉN LOCAL
+    # =========================================================
+    def _abrir(self, store_path, ahora):
+        carpeta = os.path.dirname(str(store_path))
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(store_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS ultima_vez (
+                tipo TEXT PRIMARY KEY,
+                ts REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS resumen_hora (
+                hora TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                eventos INTEGER NOT NULL DEFAULT 0,
+                duracion REAL NOT NULL DEFAULT 0,
+                max_gap REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (hora, tipo)
+            );
+            CREATE TABLE IF NOT EXISTS resumen_dia (
+                dia TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                eventos INTEGER NOT NULL DEFAULT 0,
+                duracion REAL NOT NULL DEFAULT 0,
+                max_gap REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (dia, tipo)
+            );
+            """
+        )
+        # Primer arranque: se toma "ahora" como última vez (igual que sin almacén)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO ultima_vez (tipo, ts) VALUES (?, ?)", [(tipo, ahora) for tipo in TIPOS]
+            )
+        ultima = dict(self.conn.execute("SELECT tipo, ts FROM ultima_vez"))
+        self.last_eating = ultima["Alimentacion"]
+        self.last_drinking = ultima["Hidratacion"]
+
+    def _cargar_hoy(self, now):
+        self.dia = datetime.fromtimestamp(now).strftime("%Y-%m-%d")
+        self.hoy = {tipo: {"eventos": 0, "duracion": 0.0, "max_gap": 0.0} for tipo in TIPOS}
+        if self.conn is None:
+            return
+        filas = self.conn.execute(
+            "SELECT tipo, eventos, duracion, max_gap FROM resumen_dia WHERE dia = ?", (self.dia,)
+        ).fetchall()
+        for tipo, eventos, duracion, max_gap in filas:
+            if tipo in self.hoy:
+                self.hoy[tipo] = {"eventos": eventos, "duracion": duracion, "max_gap": max_gap}
+
+    def _acumular(self, tipo, now, eventos=0, duracion=0.0, gap=0.0, ultima=None):
+        momento = datetime.fromtimestamp(now)
+        dia = momento.strftime("%Y-%m-%d")
+        if dia != self.dia:
+            self._cargar_hoy(now)
+        hoy = self.hoy[tipo]
+        hoy["eventos"] += eventos
+        hoy["duracion"] += duracion
+        hoy["max_gap"] = max(hoy["max_gap"], gap)
+
+        if self.conn is None:
+            return
+        fila = (tipo, eventos, duracion, gap)
+        # Estado y resúmenes en una sola transacción: un corte no los desincroniza
+        try:
+            with self.conn:
+                for tabla, columna, clave in (
+                    ("resumen_hora", "hora", momento.strftime("%Y-%m-%d %H")),
+                    ("resumen_dia", "dia", dia),
+                ):
+                    self.conn.execute(
+                        f"INSERT INTO {tabla} ({columna}, tipo, eventos, duracion, max_gap) VALUES (?, ?, ?, ?, ?) "
+                        f"ON CONFLICT ({columna}, tipo) DO UPDATE SET "
+                        "eventos = eventos + excluded.eventos, "
+                        "duracion = duracion + excluded.duracion, "
+                        "max_gap = MAX(max_gap, excluded.max_gap)",
+                        (clave,) + fila,
+                    )
+                if ultima is not None:
+                    self.conn.execute("UPDATE ultima_vez SET ts = ? WHERE tipo = ?", (ultima, tipo))
+        except sqlite3.Error as e:
+            # La salud en memoria sigue funcionando aunque el disco falle
+            print(f"⚠️ Error guardando resumen de salud: {e}")
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    # =========================================================
+    #  EVENTOS
+    # =========================================================
+    def register_action(self, action, now=None):
+        """Actualiza los timestamps según la acción detectada (INICIO)."""
         if not action:
             return
+        tipo = _tipo(action)
+        if tipo is None:
+            return
 
-        now = time.time()
-        if "Alimentacion" in action:
-            self.last_eating = now
-        elif "Hidratacion" in action:
-            self.last_drinking = now
+        now = now if now is not None else time.time()
+        with self.lock:
+            anterior = self.last_eating if tipo == "Alimentacion" else self.last_drinking
+            if tipo == "Alimentacion":
+                self.last_eating = now
+            else:
+                self.last_drinking = now
+            # Tras un reinicio, el hueco se mide desde que se volvió a observar
+            gap = now - max(anterior, self.observando_desde)
+            self._acumular(tipo, now, eventos=1, gap=max(0.0, gap), ultima=now)
 
-    def check_health(self):
+    def register_end(self, action, duration, now=None):
+        """Suma la duración de una acción terminada (FIN o cambio de acción)."""
+        tipo = _tipo(action) if action else None
+        if tipo is None:
+            return
+        now = now if now is not None else time.time()
+        with self.lock:
+            self._acumular(tipo, now, duracion=float(duration))
+
+    def check_health(self, now=None):
         """Retorna una lista de alertas si se exceden los tiempos."""
         alerts = []
-        now = time.time()
+        now = now if now is not None else time.time()
 
         elapsed_eating = now - self.last_eating
         elapsed_drinking = now - self.last_drinking
@@ -41,9 +198,48 @@ class HealthMonitor:
 
         return alerts
 
+    # =========================================================
+    #  CONSULTAS
+    # =========================================================
+    def get_rollups(self, period="day", since=None, until=None):
+        """Resúmenes precalculados: lista de dicts ordenada por período.
+
+        `period` es "day" o "hour"; `since`/`until` son claves del período
+        ("2024-05-01" o "2024-05-01 08"), inclusivas.
+        """
+        tabla, columna = ("resumen_hora", "hora") if period == "hour" else ("resumen_dia", "dia")
+        if self.conn is None:
+            if period == "hour":
+                return []
+            return [{"periodo": self.dia, "tipo": tipo, **datos} for tipo, datos in self.hoy.items()]
+
+        consulta = f"SELECT {columna}, tipo, eventos, duracion, max_gap FROM {tabla} WHERE 1 = 1"
+        parametros = []
+        if since is not None:
+            consulta += f" AND {columna} >= ?"
+            parametros.append(since)
+        if until is not None:
+            consulta += f" AND {columna} <= ?"
+            parametros.append(until)
+        consulta += f" ORDER BY {columna}, tipo"
+        with self.lock:
+            filas = self.conn.execute(consulta, parametros).fetchall()
+        return [
+            {"periodo": periodo, "tipo": tipo, "eventos": eventos, "duracion": duracion, "max_gap": max_gap}
+            for periodo, tipo, eventos, duracion, max_gap in filas
+        ]
+
     def get_stats(self):
         now = time.time()
-        return {
-            "eating_sec": now - self.last_eating,
-            "drinking_sec": now - self.last_drinking
-        }
+        with self.lock:
+            if datetime.fromtimestamp(now).strftime("%Y-%m-%d") != self.dia:
+                self._cargar_hoy(now)
+            comer, beber = self.hoy["Alimentacion"], self.hoy["Hidratacion"]
+            return {
+                "eating_sec": now - self.last_eating,
+                "drinking_sec": now - self.last_drinking,
+                "eating_today": comer["eventos"],
+                "drinking_today": beber["eventos"],
+                "eating_today_sec": comer["duracion"],
+                "drinking_today_sec": beber["duracion"],
+            }
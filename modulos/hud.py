@@ -0,0 +1,94 @@
+import cv2
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+ALTO_BARRA = 60
+ALPHA_BARRA = 0.4
+COLOR_TEXTO_INFO = (220, 220, 220)
+
+
+def _color_animo(mood):
+    if mood == "Desesperado":
+        return (0, 0, 255)  # Rojo
+    if mood == "Estresado":
+        return (0, 165, 255)  # Naranja
+    if mood == "Comodo":
+        return (255, 255, 0)  # Cyan/Amarillo
+    return (0, 255, 0)  # Verde (Normal)
+
+
+def _color_accion(accion):
+    if "Alimentacion" in accion:
+        return (0, 0, 255)
+    if "Hidratacion" in accion:
+        return (255, 0, 0)
+    return (0, 255, 255)
+
+
+class HudRenderer:
+    """Dibuja el HUD rearmando su contenido sólo cuando cambia el estado.
+
+    Los textos, posiciones y colores (y el centrado de la acción) se calculan
+    cuando cambia lo que se muestra: acción, ánimo, alertas, FPS redondeado,
+    etc. En cada frame sólo se rasterizan esos textos y, si hay acción, se
+    oscurece en el lugar la franja superior en vez de copiar y mezclar el
+    frame entero.
+    """
+
+    def __init__(self):
+        self._clave = None
+        self._antes = ()
+        self._accion = ()
+
+    def _armar(self, ancho, accion, fps, audio_str, move_str, mood, health_alerts):
+        # Mismo orden que el HUD original: panel, barra (que atenúa lo que
+        # quedó debajo) y el texto de la acción encima
+        y_start = 30
+        antes = [
+            (f"FPS: {fps}", (ancho - 120, 30), 0.6, (0, 255, 0), 2),
+            (audio_str, (10, y_start), 0.5, COLOR_TEXTO_INFO, 1),
+            (move_str, (10, y_start + 25), 0.5, COLOR_TEXTO_INFO, 1),
+            (f"Estado: {mood.upper()}", (10, y_start + 60), 0.7, _color_animo(mood), 2),
+        ]
+        y_alert = y_start + 100
+        for alert in health_alerts:
+            antes.append((alert, (10, y_alert), 0.6, (0, 0, 255), 2))
+            y_alert += 25
+
+        textos_accion = ()
+        if accion:
+            texto = f"!! {accion.upper()} !!"
+            (text_w, _text_h), _ = cv2.getTextSize(texto, FONT, 1.0, 2)
+            textos_accion = ((texto, ((ancho - text_w) // 2, 40), 1.0, _color_accion(accion), 2),)
+        self._antes = tuple(antes)
+        self._accion = textos_accion
+
+    def draw(self, frame, accion, fps, audio_stats, move_status, mood, health_alerts):
+        alto, ancho = frame.shape[:2]
+        audio_str = f"Audio: {audio_stats['status']} ({audio_stats['rms']:.3f})"
+        clave = (ancho, accion, int(fps), audio_str, move_status, mood, tuple(health_alerts))
+        if clave != self._clave:
+            self._armar(ancho, accion, int(fps), audio_str, f"Activ: {move_status}", mood, health_alerts)
+            self._clave = clave
+
+        for texto, org, scale, color, thickness in self._antes:
+            cv2.putText(frame, texto, org, FONT, scale, color, thickness)
+        if self._accion:
+            # Equivale a addWeighted con un rectángulo negro, sólo en la franja
+            franja = frame[: min(ALTO_BARRA + 1, alto)]
+            cv2.convertScaleAbs(franja, dst=franja, alpha=1 - ALPHA_BARRA)
+            for texto, org, scale, color, thickness in self._accion:
+                cv2.putText(frame, texto, org, FONT, scale, color, thickness)
+
+
+def dibujar_cajas(frame, detecciones, nombres_clase, colores_clase):
+    """Dibuja las cajas detectadas/cacheadas con su clase e ID de tracking."""
+    for (x1, y1, x2, y2), cls_id, track_id in zip(
+        detecciones.xyxy.tolist(), detecciones.cls.tolist(), detecciones.ids.tolist()
+    ):
+        color = colores_clase.get(cls_id, (0, 255, 0))
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+
+        etiqueta = nombres_clase[cls_id]
+        if track_id >= 0:
+            etiqueta += f" #{track_id}"
+        cv2.putText(frame, etiqueta, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
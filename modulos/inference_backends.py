@@ -0,0 +1,90 @@
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+from ultralytics import YOLO  # type: ignore
+
+# Orden de preferencia en CPU x86 cuando backend="auto". El INT8 sólo existe
+# si tools/cuantizar_modelo.py lo publicó tras pasar el control de precisión.
+BACKENDS_AUTO = ("openvino_int8", "openvino", "onnx", "torch")
+
+# Paquete de runtime que necesita cada backend exportado
+_RUNTIME = {"openvino_int8": "openvino", "openvino": "openvino", "onnx": "onnxruntime"}
+
+
+def int8_artifact(weights):
+    """Ruta del modelo INT8 publicado para `weights`."""
+    weights = Path(weights)
+    return weights.with_name(f"{weights.stem}_int8_openvino_model")
+
+
+def _artefacto(weights, backend):
+    """Ruta donde ultralytics deja el modelo exportado, junto a los pesos."""
+    weights = Path(weights)
+    if backend == "openvino_int8":
+        return int8_artifact(weights)
+    if backend == "openvino":
+        return weights.with_name(f"{weights.stem}_openvino_model")
+    if backend == "onnx":
+        return weights.with_suffix(".onnx")
+    return weights
+
+
+def _desactualizado(artefacto, weights):
+    if not artefacto.exists():
+        return True
+    # Si se re-entrenó best.pt, el artefacto exportado ya no sirve
+    return artefacto.stat().st_mtime < Path(weights).stat().st_mtime
+
+
+def export_model(weights, backend, imgsz=640, force=False):
+    """Exporta `weights` a `backend` una sola vez y devuelve la ruta cacheada."""
+    artefacto = _artefacto(weights, backend)
+    if backend == "torch" or (not force and not _desactualizado(artefacto, weights)):
+        return artefacto
+    if backend == "openvino_int8":
+        # La cuantización necesita calibrar y validar: no se hace al arrancar
+        raise FileNotFoundError(f"{artefacto} no publicado o desactualizado (ver tools/cuantizar_modelo.py)")
+
+    print(f"📦 Exportando {weights} a {backend} (sólo la primera vez)...")
+    ruta = YOLO(str(weights)).export(format=backend, imgsz=imgsz)
+    return Path(ruta) if ruta else artefacto
+
+
+def warm_up(model, imgsz=640, runs=2):
+    """Corre el modelo sobre frames vacíos para que la primera inferencia real
+    no pague la inicialización del runtime."""
+    dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    for _ in range(runs):
+        model(dummy, verbose=False)
+
+
+def load_detector(weights="best.pt", backend="auto", imgsz=640, warmup=True):
+    """Carga el detector con el runtime más rápido disponible.
+
+    `backend` puede ser "auto", "openvino_int8", "openvino", "onnx" o "torch".
+    Si el backend pedido no está instalado o falla al exportar/cargar, se
+    prueba el siguiente y siempre se termina en PyTorch. Devuelve
+    (modelo, backend).
+    """
+    candidatos = BACKENDS_AUTO if backend == "auto" else (backend, "torch")
+
+    ultimo_error = None
+    for nombre in dict.fromkeys(candidatos):
+        runtime = _RUNTIME.get(nombre)
+        if runtime and importlib.util.find_spec(runtime) is None:
+            continue
+        try:
+            if nombre == "openvino_int8" and backend == "auto" and _desactualizado(int8_artifact(weights), weights):
+                # Sin INT8 publicado, "auto" sigue en silencio con el siguiente
+                continue
+            ruta = export_model(weights, nombre, imgsz=imgsz)
+            model = YOLO(str(ruta), task="detect")
+            if warmup:
+                warm_up(model, imgsz=imgsz)
+            return model, nombre
+        except Exception as e:
+            ultimo_error = e
+            print(f"⚠️ Backend {nombre} no disponible ({e}), probando el siguiente...")
+
+    raise RuntimeError(f"No se pudo cargar el modelo {weights}: {ultimo_error}")
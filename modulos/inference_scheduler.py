@@ -0,0 +1,110 @@
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class InferenceScheduler:
+    """Decide en cada frame si vale la pena correr YOLO.
+
+    Reemplaza el `SKIP_FRAMES` fijo: sobre una versión reducida en grises del
+    frame calcula qué fracción de píxeles cambió desde la última inferencia.
+    Se infiere cuando hay movimiento, pero nunca más seguido que `min_interval`
+    ni dejando pasar más de `max_idle` segundos sin mirar (o `active_max_idle`
+    mientras hay una acción en curso, para no cortarla por falta de datos).
+    """
+
+    def __init__(
+        self,
+        motion_threshold=0.003,
+        min_interval=0.1,
+        max_idle=5.0,
+        active_max_idle=1.0,
+        work_width=160,
+        pixel_threshold=25,
+        rate_window=10.0,
+    ):
+        self.motion_threshold = motion_threshold
+        self.min_interval = min_interval
+        self.max_idle = max_idle
+        self.active_max_idle = active_max_idle
+        self.work_width = work_width
+        self.pixel_threshold = pixel_threshold
+        self.rate_window = rate_window
+
+        self.reference = None
+        self.pending_reference = None
+        self.motion_mask = None
+        self.motion_score = 0.0
+        self.last_inference = float("-inf")
+        self.inference_times = deque()
+        self.frames = 0
+        self.inferences = 0
+
+    def _preparar(self, frame):
+        alto, ancho = frame.shape[:2]
+        escala = self.work_width / float(ancho)
+        pequeno = cv2.resize(frame, (self.work_width, max(1, int(alto * escala))), interpolation=cv2.INTER_AREA)
+        gris = cv2.cvtColor(pequeno, cv2.COLOR_BGR2GRAY) if pequeno.ndim == 3 else pequeno
+        # Un blur leve evita que el ruido del sensor cuente como movimiento
+        return cv2.GaussianBlur(gris, (5, 5), 0)
+
+    def should_infer(self, frame, now=None, active=False, commit=True):
+        """True si hay que correr YOLO sobre este frame.
+
+        Con `commit=False` sólo se consulta: la inferencia se descuenta recién
+        al llamar `commit(now)` (p. ej. cuando el lote multi-cámara la incluye).
+        """
+        now = now if now is not None else time.time()
+        self.frames += 1
+
+        gris = self._preparar(frame)
+        if self.reference is None or self.reference.shape != gris.shape:
+            self.reference = gris
+            self.motion_mask = np.ones_like(gris, dtype=np.uint8)
+            self.motion_score = 1.0
+        else:
+            # Cambio acumulado desde la última inferencia (no sólo entre frames
+            # consecutivos), así los movimientos lentos igual terminan contando
+            diff = cv2.absdiff(gris, self.reference)
+            _, self.motion_mask = cv2.threshold(diff, self.pixel_threshold, 1, cv2.THRESH_BINARY)
+            self.motion_score = float(np.count_nonzero(self.motion_mask)) / self.motion_mask.size
+
+        desde_ultima = now - self.last_inference
+        if desde_ultima < self.min_interval:
+            return False
+
+        max_idle = self.active_max_idle if active else self.max_idle
+        if self.motion_score < self.motion_threshold and desde_ultima < max_idle:
+            return False
+
+        self.pending_reference = gris
+        if commit:
+            self.commit(now)
+        return True
+
+    def commit(self, now=None):
+        """Registra la inferencia aprobada por el último `should_infer`."""
+        now = now if now is not None else time.time()
+        if self.pending_reference is not None:
+            self.reference = self.pending_reference
+            self.pending_reference = None
+        self.last_inference = now
+        self.inferences += 1
+        self.inference_times.append(now)
+
+    def inference_rate(self, now=None):
+        """Inferencias por segundo en la ventana reciente."""
+        now = now if now is not None else time.time()
+        while self.inference_times and now - self.inference_times[0] > self.rate_window:
+            self.inference_times.popleft()
+        return len(self.inference_times) / self.rate_window
+
+    def get_stats(self, now=None):
+        return {
+            "frames": self.frames,
+            "inferences": self.inferences,
+            "rate": self.inference_rate(now),
+            "motion": self.motion_score,
+        }
@@ -0,0 +1,207 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Límites (segundos) de los buckets del histograma por etapa
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _StageStats:
+    __slots__ = ("buckets", "count", "total", "ring", "ring_pos", "ring_len")
+
+    def __init__(self, window):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        # Ventana rodante de las últimas `window` muestras para los cuantiles
+        self.ring = np.zeros(window, dtype=np.float64)
+        self.ring_pos = 0
+        self.ring_len = 0
+
+
+class StageTimer:
+    """Context manager barato: `with metrics.time("inferencia"): ...`."""
+
+    __slots__ = ("metrics", "stage", "camera", "t0")
+
+    def __init__(self, metrics, stage, camera=None):
+        self.metrics = metrics
+        self.stage = stage
+        self.camera = camera
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.t0, self.camera)
+        return False
+
+
+class MetricsRegistry:
+    """Tiempos por etapa y métricas de los monitores en formato Prometheus.
+
+    En el camino caliente sólo se hace `observe` (un bisect y unas sumas bajo
+    un lock). Los contadores de AudioMonitor, MovementMonitor, el escritor de
+    BD, etc. se leen recién al momento del scrape mediante colectores.
+    """
+
+    def __init__(self, prefix="ninfas", window=1024):
+        self.prefix = prefix
+        self.window = window
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.collectors = []
+
+    def time(self, stage, camera=None):
+        return StageTimer(self, stage, camera)
+
+    def observe(self, stage, seconds, camera=None):
+        clave = (stage, camera or "")
+        with self.lock:
+            st = self.stages.get(clave)
+            if st is None:
+                st = self.stages[clave] = _StageStats(self.window)
+            st.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+            st.count += 1
+            st.total += seconds
+            st.ring[st.ring_pos] = seconds
+            st.ring_pos = (st.ring_pos + 1) % self.window
+            st.ring_len = min(st.ring_len + 1, self.window)
+
+    def add_collector(self, fn):
+        """Registra `fn() -> [(nombre, tipo, ayuda, valor[, etiquetas]), ...]`, leído en cada scrape.
+
+        `tipo` es "gauge" o "counter"; `nombre` va sin el prefijo (a los
+        counter se les agrega el sufijo `_total` que espera Prometheus) y
+        `etiquetas` es un dict opcional (p. ej. {"camera": "jaula1"}).
+        """
+        self.collectors.append(fn)
+
+    def stage_quantiles(self):
+        """{(etapa, cámara): {q: segundos}} sobre la ventana reciente."""
+        with self.lock:
+            muestras = {clave: st.ring[: st.ring_len].copy() for clave, st in self.stages.items()}
+        return {
+            clave: dict(zip(QUANTILES, np.quantile(m, QUANTILES))) if len(m) else {}
+            for clave, m in muestras.items()
+        }
+
+    def render(self):
+        """Texto de exposición de Prometheus (versión 0.0.4)."""
+        p = self.prefix
+        lineas = [
+            f"# HELP {p}_stage_seconds Duración de cada etapa del bucle principal.",
+            f"# TYPE {p}_stage_seconds histogram",
+        ]
+        with self.lock:
+            snapshot = {
+                clave: (list(st.buckets), st.count, st.total) for clave, st in sorted(self.stages.items())
+            }
+        for (nombre, camara), (buckets, count, total) in snapshot.items():
+            etiquetas = _etiquetas({"stage": nombre, "camera": camara})
+            acumulado = 0
+            for limite, n in zip(BUCKETS, buckets):
+                acumulado += n
+                lineas.append(f'{p}_stage_seconds_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'{p}_stage_seconds_bucket{{{etiquetas},le="+Inf"}} {count}')
+            lineas.append(f"{p}_stage_seconds_sum{{{etiquetas}}} {total:.6f}")
+            lineas.append(f"{p}_stage_seconds_count{{{etiquetas}}} {count}")
+
+        lineas.append(f"# HELP {p}_stage_recent_seconds Cuantiles de las últimas {self.window} muestras por etapa.")
+        lineas.append(f"# TYPE {p}_stage_recent_seconds gauge")
+        for (nombre, camara), cuantiles in sorted(self.stage_quantiles().items()):
+            etiquetas = _etiquetas({"stage": nombre, "camera": camara})
+            for q, valor in cuantiles.items():
+                lineas.append(f'{p}_stage_recent_seconds{{{etiquetas},quantile="{q}"}} {valor:.6f}')
+
+        # Las muestras de una misma métrica (p. ej. una por cámara) van juntas
+        familias = {}
+        for fn in self.collectors:
+            try:
+                metricas = list(fn())
+            except Exception as e:
+                lineas.append(f"# colector con error: {e}")
+                continue
+            for nombre, tipo, ayuda, valor, *resto in metricas:
+                if tipo == "counter" and not nombre.endswith("_total"):
+                    nombre += "_total"
+                etiquetas = _etiquetas(resto[0]) if resto else ""
+                muestra = f"{p}_{nombre}{{{etiquetas}}}" if etiquetas else f"{p}_{nombre}"
+                familia = familias.setdefault(nombre, (tipo, ayuda, []))
+                familia[2].append(f"{muestra} {float(valor):g}")
+        for nombre, (tipo, ayuda, muestras) in familias.items():
+            lineas.append(f"# HELP {p}_{nombre} {ayuda}")
+            lineas.append(f"# TYPE {p}_{nombre} {tipo}")
+            lineas.extend(muestras)
+
+        return "\n".join(lineas) + "\n"
+
+
+def _etiquetas(labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels.items() if v)
+
+
+def stats_collector(prefix, get_stats, counters=(), help_text="", labels=None):
+    """Colector a partir de un `get_stats()` que devuelve un dict.
+
+    Cada valor numérico se expone como `<prefix>_<clave>`; las claves en
+    `counters` como counter y el resto como gauge. Se ignoran los no numéricos.
+    `labels` se agrega a cada muestra (p. ej. la cámara en modo multi-cámara).
+    """
+
+    def _collect():
+        for clave, valor in get_stats().items():
+            if isinstance(valor, bool):
+                valor = int(valor)
+            if not isinstance(valor, (int, float)):
+                continue
+            tipo = "counter" if clave in counters else "gauge"
+            yield f"{prefix}_{clave}", tipo, help_text or f"{prefix}: {clave}", valor, labels or {}
+
+    return _collect
+
+
+class MetricsServer:
+    """Servidor HTTP local que expone `/metrics` en un hilo aparte."""
+
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                cuerpo = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *_args):
+                # Sin log por request: Prometheus scrapea cada pocos segundos
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
@@ -0,0 +1,144 @@
+import time
+
+import cv2
+import numpy as np
+
+from modulos.detections import Detections, box_iou
+
+
+class MotionRoiDetector:
+    """Inferencia sólo sobre recortes donde hay movimiento (modo opcional).
+
+    A partir de la máscara de movimiento del InferenceScheduler arma unos
+    pocos recortes con margen, corre el detector sobre ellos en un solo lote
+    y devuelve las cajas en coordenadas del frame completo. Como YOLO escala
+    cada recorte a su `imgsz`, las aves pequeñas se ven con más resolución.
+    Cada `full_frame_every` segundos (o si el movimiento cubre demasiado) se
+    vuelve al frame completo.
+    """
+
+    def __init__(
+        self,
+        full_frame_every=10.0,
+        pad=0.25,
+        min_tile=320,
+        max_tiles=3,
+        max_coverage=0.5,
+        min_blob=4,
+        batched=True,
+    ):
+        self.full_frame_every = full_frame_every
+        self.batched = batched
+        self.pad = pad
+        self.min_tile = min_tile
+        self.max_tiles = max_tiles
+        self.max_coverage = max_coverage
+        self.min_blob = min_blob
+        self.last_full_frame = float("-inf")
+        self.roi_runs = 0
+        self.full_runs = 0
+
+    def plan(self, frame_shape, motion_mask, now=None, keep_boxes=None):
+        """Lista de recortes (x1, y1, x2, y2) o None si toca el frame completo.
+
+        `keep_boxes` son cajas que deben seguir cubiertas aunque no se muevan
+        (las ninfas vistas en la inferencia anterior, p. ej. comiendo quietas).
+        """
+        now = now if now is not None else time.time()
+        if now - self.last_full_frame >= self.full_frame_every or motion_mask is None:
+            return self._full(now)
+
+        alto, ancho = frame_shape[:2]
+        rects = self._regiones_movimiento(motion_mask, ancho, alto)
+        if keep_boxes is not None and len(keep_boxes):
+            rects.extend(np.asarray(keep_boxes, dtype=np.float32).tolist())
+        if not rects:
+            return self._full(now)
+
+        tiles = _fusionar([self._expandir(r, ancho, alto) for r in rects])
+        if len(tiles) > self.max_tiles:
+            return self._full(now)
+
+        cubierto = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in tiles)
+        if cubierto > self.max_coverage * ancho * alto:
+            return self._full(now)
+
+        self.roi_runs += 1
+        return tiles
+
+    def detect(self, model, frame, tiles, **kwargs):
+        """Corre `model` sobre los recortes (en lote) y une las detecciones."""
+        recortes = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        if self.batched:
+            results = model(recortes, **kwargs)
+        else:
+            results = [r for recorte in recortes for r in model(recorte, **kwargs)]
+
+        partes = []
+        for (x1, y1, _x2, _y2), r in zip(tiles, results):
+            partes.append(Detections.from_results([r]).offset(x1, y1))
+        return _nms_entre_recortes(Detections.concat(partes))
+
+    def get_stats(self):
+        return {"roi_runs": self.roi_runs, "full_runs": self.full_runs}
+
+    def _full(self, now):
+        self.last_full_frame = now
+        self.full_runs += 1
+        return None
+
+    def _regiones_movimiento(self, motion_mask, ancho, alto):
+        mask = cv2.dilate(motion_mask, np.ones((3, 3), np.uint8), iterations=2)
+        n, _labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        sx = ancho / float(mask.shape[1])
+        sy = alto / float(mask.shape[0])
+        rects = []
+        for x, y, w, h, area in stats[1:n]:
+            if area < self.min_blob:
+                continue
+            rects.append([x * sx, y * sy, (x + w) * sx, (y + h) * sy])
+        return rects
+
+    def _expandir(self, rect, ancho, alto):
+        x1, y1, x2, y2 = rect
+        w, h = x2 - x1, y2 - y1
+        lado_w = max(w * (1 + 2 * self.pad), self.min_tile)
+        lado_h = max(h * (1 + 2 * self.pad), self.min_tile)
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        nx1 = int(max(0, min(cx - lado_w / 2, ancho - lado_w)))
+        ny1 = int(max(0, min(cy - lado_h / 2, alto - lado_h)))
+        return [nx1, ny1, int(min(ancho, nx1 + lado_w)), int(min(alto, ny1 + lado_h))]
+
+
+def _fusionar(rects):
+    """Une recortes que se superponen hasta que no quede ninguno solapado."""
+    rects = [list(r) for r in rects]
+    cambio = True
+    while cambio and len(rects) > 1:
+        cambio = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    rects[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del rects[j]
+                    cambio = True
+                    break
+            if cambio:
+                break
+    return [tuple(r) for r in rects]
+
+
+def _nms_entre_recortes(dets, iou_max=0.6):
+    """Quita duplicados de una misma ave vista en el borde de dos recortes."""
+    if len(dets) < 2:
+        return dets
+    orden = np.argsort(-dets.conf)
+    iou = box_iou(dets.xyxy[orden], dets.xyxy[orden])
+    misma_clase = dets.cls[orden][:, None] == dets.cls[orden][None, :]
+    solapa = np.triu((iou > iou_max) & misma_clase, k=1)
+    keep = np.ones(len(orden), dtype=bool)
+    for i in range(len(orden)):
+        if keep[i]:
+            keep[np.flatnonzero(solapa[i])] = False
+    return dets.select(np.sort(orden[keep]))
@@ -1,62 +1,160 @@
-import numpy as np
-from collections import deque
+import math
 import time
 
+import numpy as np
+
+
+class _TrackRing:
+    """Historial de posiciones de un track en un buffer circular de NumPy.
+
+    Guarda, para cada punto, la distancia al punto anterior; el recorrido
+    total se mantiene como suma corrida (se suma al entrar un punto y se resta
+    al expirar), así que consultarlo es O(1) y la memoria queda acotada.
+    """
+
+    __slots__ = ("ts", "xy", "seg", "head", "count", "path")
+
+    def __init__(self, capacity):
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.xy = np.zeros((capacity, 2), dtype=np.float64)
+        self.seg = np.zeros(capacity, dtype=np.float64)
+        self.head = 0  # índice del punto más viejo
+        self.count = 0
+        self.path = 0.0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self.ts)
+
+    @property
+    def last_ts(self):
+        return self.ts[(self.head + self.count - 1) % self.capacity]
+
+    @property
+    def last_xy(self):
+        return self.xy[(self.head + self.count - 1) % self.capacity]
+
+    def append(self, ts, x, y):
+        if self.count == self.capacity:
+            self._pop_oldest()
+
+        idx = (self.head + self.count) % self.capacity
+        if self.count:
+            prev = (idx - 1) % self.capacity
+            dist = math.hypot(x - self.xy[prev, 0], y - self.xy[prev, 1])
+        else:
+            dist = 0.0
+        self.ts[idx] = ts
+        self.xy[idx] = (x, y)
+        self.seg[idx] = dist
+        self.path += dist
+        self.count += 1
+
+    def expire(self, cutoff):
+        while self.count and self.ts[self.head] < cutoff:
+            self._pop_oldest()
+
+    def _pop_oldest(self):
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+        if self.count:
+            # El nuevo primer punto deja de tener segmento previo
+            self.path -= float(self.seg[self.head])
+            self.seg[self.head] = 0.0
+        if self.count <= 1:
+            # Sin segmentos: se descarta el error de redondeo acumulado
+            self.path = 0.0
+
+
 class MovementMonitor:
-    def __init__(self, history_seconds=60):
+    def __init__(self, history_seconds=60, max_points=1024, occupancy=None):
         self.history_seconds = history_seconds
-        # track_id -> deque of (timestamp, x, y)
+        # Puntos por track como máximo (a 10 inferencias/s sobran para 60 s)
+        self.max_points = max_points
+        # track_id -> _TrackRing de (timestamp, x, y)
         self.tracks = {}
         self.last_cleanup = time.time()
+        self.updates = 0
+        # OccupancyGrid opcional: mapa de ocupación/permanencia persistente
+        self.occupancy = occupancy
 
         # Umbrales (en píxeles acumulados por minuto)
         # Ajustar según la resolución de la cámara y distancia al objetivo.
         self.HIGH_ACTIVITY_THRESHOLD = 500.0
         self.LOW_ACTIVITY_THRESHOLD = 50.0
 
-    def update(self, track_id, center_x, center_y):
+    def update(self, track_id, center_x, center_y, now=None):
         """Registra la posición actual de un pájaro."""
-        now = time.time()
-        if track_id not in self.tracks:
-            self.tracks[track_id] = deque()
+        now = now if now is not None else time.time()
+        track = self.tracks.get(track_id)
+        if track is None:
+            track = self.tracks[track_id] = _TrackRing(self.max_points)
 
-        self.tracks[track_id].append((now, center_x, center_y))
+        track.expire(now - self.history_seconds)
+        track.append(now, center_x, center_y)
+        self.updates += 1
 
-        # Limpieza periódica (cada 5 seg) para no iterar en cada frame
+        # Limpieza periódica (cada 5 seg) de los tracks que ya no se actualizan
         if now - self.last_cleanup > 5.0:
             self._cleanup_old_tracks(now)
             self.last_cleanup = now
 
+    def update_batch(self, track_ids, centers, now=None, frame_size=None):
+        """Registra las posiciones de todas las ninfas de un frame.
+
+        `centers` es un array N x 2; con `frame_size` (ancho, alto) además se
+        acumulan en el mapa de ocupación. El tiempo desde la posición anterior
+        de cada track se le acredita a esa posición (donde estuvo el ave), no
+        a la nueva.
+        """
+        now = now if now is not None else time.time()
+        dwell = np.zeros(len(track_ids), dtype=np.float64)
+        previas = np.array(centers, dtype=np.float64, copy=True).reshape(-1, 2)
+        for i, (track_id, (cx, cy)) in enumerate(zip(track_ids, centers.tolist())):
+            track = self.tracks.get(track_id)
+            if track is not None and track.count:
+                dwell[i] = now - track.last_ts
+                previas[i] = track.last_xy
+            self.update(track_id, cx, cy, now)
+
+        if self.occupancy is not None and frame_size is not None:
+            self.occupancy.add(centers, dwell, frame_size, now, previous=previas)
+
+    def close(self):
+        """Guarda lo acumulado en el mapa de ocupación."""
+        if self.occupancy is not None:
+            self.occupancy.save()
+
     def _cleanup_old_tracks(self, now):
         cutoff = now - self.history_seconds
-        # Limpiar puntos viejos dentro de cada track
         for tid in list(self.tracks.keys()):
-            dq = self.tracks[tid]
-            while dq and dq[0][0] < cutoff:
-                dq.popleft()
-            # Si el track está vacío o muy viejo (el pájaro se fue), se borra
-            if not dq:
-                del self.tracks[tid]
-            elif (now - dq[-1][0]) > self.history_seconds:
-                # Si el último punto visto es muy viejo, borrar todo el track
+            track = self.tracks[tid]
+            track.expire(cutoff)
+            # Si el track quedó vacío (el pájaro se fue), se borra
+            if not track.count:
                 del self.tracks[tid]
 
+    def get_stats(self):
+        return {
+            "tracks": len(self.tracks),
+            "points": sum(t.count for t in self.tracks.values()),
+            "updates": self.updates,
+        }
+
     def get_activity_level(self, track_id):
         """Calcula nivel de actividad para un ID específico."""
         if track_id not in self.tracks:
             return "Desconocido", 0.0
 
-        dq = self.tracks[track_id]
-        if len(dq) < 2:
+        track = self.tracks[track_id]
+        if len(track) < 2:
             return "Sedentario", 0.0
 
-        total_dist = 0.0
-        # Calcular distancia euclidiana acumulada
-        for i in range(1, len(dq)):
-            _, x1, y1 = dq[i-1]
-            _, x2, y2 = dq[i]
-            dist = np.sqrt((x2-x1)**2 + (y2-y1)**2)
-            total_dist += dist
+        # Distancia euclidiana acumulada, mantenida al insertar/expirar
+        total_dist = track.path
 
         if total_dist > self.HIGH_ACTIVITY_THRESHOLD:
             return "Muy Activo", total_dist
@@ -0,0 +1,151 @@
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Grilla normalizada: independiente de la resolución que entregue la cámara
+GRID_W = 64
+GRID_H = 36
+
+# Capa 0: observaciones por celda; capa 1: segundos de permanencia
+OBSERVACIONES = 0
+PERMANENCIA = 1
+
+OCUPACION_POR_DEFECTO = Path(__file__).resolve().parent.parent / "datos" / "ocupacion"
+
+
+def _inicio_hora(ts):
+    t = time.localtime(ts)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, 0, 0, 0, 0, -1))
+
+
+def _inicio_dia(ts):
+    t = time.localtime(ts)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0, 0, 0, -1))
+
+
+def _celdas(posiciones, frame_size):
+    ancho, alto = frame_size
+    posiciones = np.asarray(posiciones, dtype=np.float64)
+    gx = np.clip((posiciones[:, 0] * GRID_W / ancho).astype(np.intp), 0, GRID_W - 1)
+    gy = np.clip((posiciones[:, 1] * GRID_H / alto).astype(np.intp), 0, GRID_H - 1)
+    return gy, gx
+
+
+class OccupancyGrid:
+    """Mapa de ocupación y permanencia de las ninfas, con acumulados por hora y día.
+
+    Cada posición suma una observación en su celda de una grilla GRID_W x
+    GRID_H, y los segundos desde la posición anterior del mismo track se
+    suman en la celda de esa posición anterior (donde el ave estuvo ese
+    tiempo), con `np.add.at` por frame. Las grillas de la hora y del día en
+    curso se guardan cada `save_every` segundos como `.npy` (float32, 2 x
+    GRID_H x GRID_W) en `directorio/AAAA-MM-DD/HH.npy` y `dia.npy`; al
+    reiniciar se retoman, así que sólo se pierde lo último sin guardar.
+    `load_period` las lee (ver tools/mapa_ocupacion.py).
+    """
+
+    def __init__(self, directory=OCUPACION_POR_DEFECTO, save_every=300.0, max_gap=10.0):
+        self.directory = Path(directory)
+        self.save_every = save_every
+        # Un hueco mayor (el ave no se detectó) no se cuenta como permanencia
+        self.max_gap = max_gap
+
+        self.hour = np.zeros((2, GRID_H, GRID_W), dtype=np.float32)
+        self.day = np.zeros((2, GRID_H, GRID_W), dtype=np.float32)
+        self.hour_start = self.hour_end = None
+        self.day_start = self.day_end = None
+        self.last_save = None
+        self.dirty = False
+
+    def _ruta(self, inicio, nombre):
+        return self.directory / time.strftime("%Y-%m-%d", time.localtime(inicio)) / nombre
+
+    def _ruta_hora(self, inicio):
+        return self._ruta(inicio, time.strftime("%H.npy", time.localtime(inicio)))
+
+    def _ruta_dia(self, inicio):
+        return self._ruta(inicio, "dia.npy")
+
+    @staticmethod
+    def _cargar(ruta, destino):
+        destino[:] = 0.0
+        try:
+            datos = np.load(ruta)
+            if datos.shape == destino.shape:
+                destino[:] = datos
+        except (OSError, ValueError):
+            pass
+
+    def _rollover(self, now):
+        if self.hour_start is not None and self.hour_start <= now < self.hour_end:
+            return
+        if self.dirty:
+            self.save()
+
+        self.hour_start = _inicio_hora(now)
+        self.hour_end = _inicio_hora(self.hour_start + 3600 + 60)
+        self._cargar(self._ruta_hora(self.hour_start), self.hour)
+
+        if self.day_start is None or not (self.day_start <= now < self.day_end):
+            self.day_start = _inicio_dia(now)
+            self.day_end = _inicio_dia(self.day_start + 86400 + 3600)
+            self._cargar(self._ruta_dia(self.day_start), self.day)
+        self.last_save = now
+
+    def add(self, centers, dwell, frame_size, now=None, previous=None):
+        """Suma las posiciones (N x 2, en píxeles) y la permanencia en segundos.
+
+        `dwell[i]` se acredita en `previous[i]` (la posición donde se pasó ese
+        tiempo); sin `previous`, en la misma posición.
+        """
+        if len(centers) == 0:
+            return
+        now = time.time() if now is None else now
+        self._rollover(now)
+
+        gy, gx = _celdas(centers, frame_size)
+        py, px = (gy, gx) if previous is None else _celdas(previous, frame_size)
+        dwell = np.asarray(dwell, dtype=np.float32)
+        dwell = np.where(dwell <= self.max_gap, dwell, 0.0)
+
+        for grilla in (self.hour, self.day):
+            np.add.at(grilla[OBSERVACIONES], (gy, gx), 1.0)
+            np.add.at(grilla[PERMANENCIA], (py, px), dwell)
+        self.dirty = True
+
+        if now - self.last_save >= self.save_every:
+            self.save()
+            self.last_save = now
+
+    def save(self):
+        if self.hour_start is None or not self.dirty:
+            return
+        for ruta, grilla in ((self._ruta_hora(self.hour_start), self.hour), (self._ruta_dia(self.day_start), self.day)):
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            tmp = ruta.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, grilla)
+            os.replace(tmp, ruta)
+        self.dirty = False
+
+
+
+def load_period(desde, hasta, directory=OCUPACION_POR_DEFECTO):
+    """Suma las grillas horarias guardadas entre `desde` y `hasta` (timestamps).
+
+    Devuelve un array 2 x GRID_H x GRID_W (observaciones, segundos).
+    """
+    directory = Path(directory)
+    total = np.zeros((2, GRID_H, GRID_W), dtype=np.float64)
+    inicio = _inicio_hora(desde)
+    while inicio < hasta:
+        local = time.localtime(inicio)
+        ruta = directory / time.strftime("%Y-%m-%d", local) / time.strftime("%H.npy", local)
+        if ruta.exists():
+            datos = np.load(ruta)
+            if datos.shape == total.shape:
+                total += datos
+        inicio = _inicio_hora(inicio + 3600 + 60)
+    return total
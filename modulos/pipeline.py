@@ -0,0 +1,414 @@
+import contextlib
+import importlib.util
+import time
+
+import numpy as np
+
+from modulos.action_state import ActionStateMachine
+from modulos.clip_recorder import relative_clip_path
+from modulos.detections import Detections, class_id, class_thresholds
+from modulos.hud import HudRenderer, dibujar_cajas
+from modulos.inference_backends import load_detector
+from modulos.inference_scheduler import InferenceScheduler
+from modulos.motion_roi import MotionRoiDetector
+from modulos.static_objects import StaticObjectCache
+from modulos.tracker import IouTracker
+from modulos.zones import action_from_labels, classify_in_boxes
+
+AREA_MINIMA = 1200
+AREA_MAXIMA = 85000
+CONF_NINFA = 0.20
+CONF_PLATOS = 0.35
+
+HOLD_ACCION_SEGUNDOS = 3.0
+MIN_DURACION_PARA_GUARDAR = 2.0
+
+# Cada cuánto se guarda una muestra de ánimo/actividad en la analítica local
+MUESTREO_ANALITICA = 60.0
+
+TRACKER_CONFIG = "botsort.yaml"
+# "auto": BoT-SORT si está `lap`, si no el tracker IoU propio
+TRACKERS = ("auto", "botsort", "iou")
+
+AUDIO_SIN_DATOS = {"status": "Silencio", "rms": 0.0, "freq": 0.0, "centroid": 0.0, "ts": None}
+
+
+def determinar_animo(audio_stats, move_status, health_alerts):
+    """Estado de ánimo combinando audio, movimiento y salud."""
+    mood = "Normal"
+    is_screaming = audio_stats["status"] == "Gritando"
+    is_high_activity = "Alta" in move_status or "Muy Activo" in move_status
+
+    # Prioridad de Estados
+    if len(health_alerts) > 0 and is_screaming:
+        mood = "Desesperado"
+        # Podríamos guardar log aquí si cambia el estado
+    elif is_screaming and is_high_activity:
+        mood = "Estresado"
+    elif move_status == "Tranquilo" and audio_stats["status"] in ["Sonidos", "Silencio"]:
+        mood = "Comodo"
+    return mood
+
+
+class MonitorPipeline:
+    """Las etapas por frame del monitor, independientes de la fuente de video.
+
+    `iniciar_monitoreo` y las herramientas offline (benchmark) usan las mismas
+    etapas: detect (planificador + YOLO), postprocess (filtros, platos, zonas,
+    movimiento), update_actions (estado de la acción, salud y BD), assess
+    (audio/movimiento/salud -> ánimo) y draw (cajas + HUD). `process` las
+    encadena para un frame.
+    """
+
+    def __init__(
+        self,
+        model,
+        backend="torch",
+        weights="best.pt",
+        audio_mon=None,
+        move_mon=None,
+        health_mon=None,
+        guardar=None,
+        zonas=None,
+        use_roi=False,
+        source_note="TapoMovil",
+        verbose=True,
+        metrics=None,
+        camera=None,
+        recorder=None,
+        tracker="auto",
+        analytics=None,
+    ):
+        self.model = model
+        self.model_det = model
+        self.backend = backend
+        self.weights = weights
+        self.audio_mon = audio_mon
+        self.move_mon = move_mon
+        self.health_mon = health_mon
+        self.guardar = guardar
+        self.zonas = zonas
+        self.verbose = verbose
+        # MetricsRegistry opcional: tiempos por etapa en `process`
+        self.metrics = metrics
+        # Nombre de la cámara en modo multi-cámara (etiqueta de métricas y logs)
+        self.camera = camera
+        # ClipRecorder opcional: clip de video de cada INICIO de acción y alerta de salud
+        self.recorder = recorder
+        # AnalyticsStore opcional: muestras de ánimo/actividad para los reportes
+        self.analytics = analytics
+        self.ultima_muestra = None
+
+        # Lookups por id de clase, calculados una vez para filtrar con máscaras
+        self.nombres_clase = model.names
+        self.umbral_clase = class_thresholds(self.nombres_clase, {"ninfa": CONF_NINFA}, CONF_PLATOS)
+        self.id_ninfa = class_id(self.nombres_clase, "ninfa")
+        self.id_comedero = class_id(self.nombres_clase, "comedero")
+        self.id_bebedero = class_id(self.nombres_clase, "bebedero")
+        self.colores_clase = {self.id_comedero: (0, 0, 255), self.id_bebedero: (255, 0, 0)}
+
+        # Comedero/bebedero casi no se mueven: se cachean y se re-validan cada
+        # minuto; entre validaciones el detector sólo busca ninfas. Con zonas
+        # configuradas las cajas de los platos no se usan y no se validan.
+        self.platos = StaticObjectCache([self.id_comedero, self.id_bebedero], revalidate_every=60.0)
+
+        # YOLO corre cuando hay movimiento (con refresco mínimo y máximo), no cada N frames
+        self.scheduler = InferenceScheduler()
+        self.acciones = ActionStateMachine(HOLD_ACCION_SEGUNDOS, MIN_DURACION_PARA_GUARDAR, source_note)
+
+        self.hud = HudRenderer()
+        self.cajas = Detections.empty()
+        self.ninfas_previas = Detections.empty()
+        self.revalidar_platos = False
+        self.estado = {
+            "audio": AUDIO_SIN_DATOS,
+            "move_status": "Sin datos",
+            "mood": "Normal",
+            "health_alerts": [],
+        }
+        self.alertas_activas = set()
+
+        # Modo opcional: inferir sólo sobre recortes con movimiento.
+        # Usa su propia instancia del modelo para no mezclar recortes con el tracker.
+        self.roi = None
+        self.model_recortes = None
+        if use_roi:
+            try:
+                self.model_recortes, _ = load_detector(weights, backend, warmup=False)
+                # Los modelos exportados tienen batch fijo: recorte por recorte
+                self.roi = MotionRoiDetector(batched=(backend == "torch"))
+                self._log("🔍 Inferencia por recortes de movimiento: ACTIVADA")
+            except Exception as e:
+                self._log(f"⚠️ No se pudo activar la inferencia por recortes: {e}")
+
+        # Tracking: BoT-SORT (ultralytics + `lap`) o el IouTracker propio. El
+        # propio también da IDs a lo que no pasa por BoT-SORT (recortes,
+        # lotes multi-cámara) y predice las cajas en los frames sin inferencia.
+        if tracker not in TRACKERS:
+            raise ValueError(f"tracker desconocido: {tracker} (opciones: {', '.join(TRACKERS)})")
+        self.tracker = IouTracker()
+        self.botsort = tracker == "botsort" or (tracker == "auto" and importlib.util.find_spec("lap") is not None)
+        if tracker == "botsort" and not self.botsort:
+            self._log("⚠️ BoT-SORT no disponible, usando el tracker IoU")
+        if self.botsort and self.roi is not None:
+            # BoT-SORT no ve los frames por recortes: un único tracker para que los IDs no se mezclen
+            self._log("ℹ️ Con inferencia por recortes se usa el tracker IoU en lugar de BoT-SORT")
+            self.botsort = False
+        # True si las detecciones de este frame ya traen IDs de BoT-SORT
+        self.ids_del_detector = False
+
+    @property
+    def accion_estable(self):
+        return self.acciones.accion_estable
+
+    def _etapa(self, nombre):
+        return self.metrics.time(nombre, self.camera) if self.metrics is not None else contextlib.nullcontext()
+
+    def _log(self, mensaje):
+        if self.verbose:
+            print(f"[{self.camera}] {mensaje}" if self.camera else mensaje)
+
+    # =========================================================
+    #  IA - Cuando el planificador lo pide
+    # =========================================================
+    def wants_inference(self, frame, now):
+        """Consulta al planificador sin consumir la inferencia (ver `begin_inference`)."""
+        return self.scheduler.should_infer(frame, now, active=bool(self.acciones.accion_estable), commit=False)
+
+    def begin_inference(self, now):
+        """Confirma la inferencia de este frame; devuelve las clases a buscar (None = todas)."""
+        self.scheduler.commit(now)
+        self.revalidar_platos = self.zonas is None and self.platos.needs_validation(now)
+        return None if (self.revalidar_platos or self.id_ninfa < 0) else [self.id_ninfa]
+
+    def detect(self, frame, now):
+        """Detecciones crudas del frame, o None si el planificador lo saltea."""
+        if not self.wants_inference(frame, now):
+            return None
+        clases = self.begin_inference(now)
+
+        recortes = None
+        if self.roi is not None and not self.revalidar_platos:
+            recortes = self.roi.plan(
+                frame.shape, self.scheduler.motion_mask, now, keep_boxes=self.ninfas_previas.xyxy
+            )
+
+        self.ids_del_detector = False
+        if recortes:
+            # Los IDs los pone el tracker IoU en `postprocess`
+            return self.roi.detect(
+                self.model_recortes, frame, recortes, verbose=False, conf=0.15, iou=0.5, classes=clases
+            )
+
+        return Detections.from_results(self._inferir_frame(frame, clases))
+
+    def _inferir_frame(self, frame, clases):
+        if not self.botsort:
+            return self.model_det(frame, verbose=False, conf=0.15, iou=0.5, classes=clases)
+
+        try:
+            results = self.model.track(
+                frame,
+                persist=True,
+                verbose=False,
+                conf=0.15,
+                iou=0.5,
+                tracker=TRACKER_CONFIG,
+                classes=clases,
+            )
+            self.ids_del_detector = True
+            return results
+        except Exception as e:
+            # Sin vuelta atrás: desde aquí los IDs los pone el tracker IoU
+            self._log(f"⚠️ Fallo en BoT-SORT, usando el tracker IoU: {e}")
+            self.botsort = False
+
+        # El modelo quedó con los callbacks del tracker registrados: una
+        # sola vez se carga una instancia limpia para predecir
+        try:
+            self.model.predictor = None
+        except Exception:
+            pass
+        try:
+            self.model_det, _ = load_detector(self.weights, self.backend, warmup=False)
+        except Exception:
+            self.model_det = self.model
+        return self.model_det(frame, verbose=False, conf=0.15, iou=0.5, classes=clases)
+
+    def from_batch(self, detecciones, clases):
+        """Adapta las detecciones de un lote compartido (sin BoT-SORT) a esta cámara.
+
+        El lote se infiere con todas las clases: aquí se dejan sólo las
+        pedidas; los IDs de las ninfas los pone el tracker IoU en `postprocess`.
+        """
+        self.ids_del_detector = False
+        if clases is not None:
+            detecciones = detecciones.select(np.isin(detecciones.cls, clases))
+        return detecciones
+
+    def postprocess(self, detecciones, frame, now):
+        """Filtra, actualiza platos y movimiento y asocia ninfas a zonas.
+
+        Devuelve (accion_detectada, max_conf_ninfa).
+        """
+        # Post-proceso vectorizado: ventana de área + umbral por clase
+        cajas = detecciones.filter(AREA_MINIMA, AREA_MAXIMA, self.umbral_clase)
+
+        es_ninfa = cajas.cls == self.id_ninfa
+        ninfas = cajas.select(es_ninfa)
+        if not self.ids_del_detector:
+            ninfas = self.tracker.update(ninfas, now)
+        self.ninfas_previas = ninfas
+
+        if self.revalidar_platos:
+            self.platos.update(cajas.select(~es_ninfa), now)
+        # Los platos salen siempre de la caché: un parpadeo del detector
+        # bajo CONF_PLATOS ya no corta la acción en curso
+        self.cajas = Detections.concat([ninfas, self.platos.as_detections()])
+        max_conf_frame = float(ninfas.conf.max()) if len(ninfas) else 0.0
+
+        # --- UPDATE MOVIMIENTO ---
+        if self.move_mon is not None:
+            con_id = ninfas.ids >= 0
+            alto_frame, ancho_frame = frame.shape[:2]
+            self.move_mon.update_batch(
+                ninfas.ids[con_id].tolist(), ninfas.centers[con_id], now, frame_size=(ancho_frame, alto_frame)
+            )
+        # -------------------------
+
+        # --- ASOCIACIÓN NINFA -> ZONA ---
+        if self.zonas is not None:
+            alto_frame, ancho_frame = frame.shape[:2]
+            etiquetas = self.zonas.classify(ninfas.centers, ancho_frame, alto_frame)
+        else:
+            etiquetas = classify_in_boxes(
+                ninfas.centers,
+                self.platos.get_boxes(self.id_comedero),
+                self.platos.get_boxes(self.id_bebedero),
+            )
+        return action_from_labels(etiquetas), max_conf_frame
+
+    def predict(self, now):
+        """Frame sin inferencia: las ninfas se mueven con la velocidad de su track.
+
+        Sólo actualiza las cajas dibujadas y las que usa el planificador de
+        recortes; movimiento y acciones siguen saliendo de detecciones reales.
+        """
+        ninfas = self.tracker.predict(now, max_age=HOLD_ACCION_SEGUNDOS)
+        self.ninfas_previas = ninfas
+        self.cajas = Detections.concat([ninfas, self.platos.as_detections()])
+
+    # =========================================================
+    #  LÓGICA DE ESTADO (Continuo)
+    # =========================================================
+    def _con_clip(self, registro, evento, now):
+        """Pide el clip del evento y agrega su ruta a las notas del registro."""
+        if self.recorder is None:
+            return registro
+        ruta = self.recorder.trigger(evento, now)
+        if ruta is None:
+            return registro
+        notas = registro[5]
+        clip = f"Clip={relative_clip_path(ruta)}"
+        return registro[:5] + (f"{notas} | {clip}" if notas else clip,)
+
+    def update_actions(self, accion, conf, now):
+        eventos = self.acciones.observe(accion, conf, now) + self.acciones.tick(now)
+        for tipo, accion_evento, registro in eventos:
+            if tipo in ("cambio", "fin") and self.health_mon is not None:
+                self.health_mon.register_end(accion_evento, registro[2], now)
+
+            if tipo == "cambio":
+                self._log(f"🔀 CAMBIO ACCIÓN: {accion_evento} -> {self.acciones.accion_estable}")
+            elif tipo == "fin":
+                self._log(f"⏹️ FIN ACCIÓN: {accion_evento} ({registro[2]:.1f}s)")
+            else:
+                self._log(f"▶️ INICIO ACCIÓN: {accion_evento}")
+                registro = self._con_clip(registro, accion_evento, now)
+                # --- Registrar Salud ---
+                if self.health_mon is not None:
+                    self.health_mon.register_action(accion_evento, now)
+
+            if self.guardar is not None:
+                self.guardar(*registro)
+        return eventos
+
+    # =========================================================
+    #  DETERMINAR ESTADOS (MOOD/HEALTH)
+    # =========================================================
+    def assess(self, stream_ts=None, now=None):
+        # Audio del mismo instante (reloj del stream) que el frame analizado
+        audio_stats = self.audio_mon.get_status(at=stream_ts) if self.audio_mon is not None else AUDIO_SIN_DATOS
+        move_status, move_val = "Sin datos", 0.0
+        if self.move_mon is not None:
+            move_status, move_val = self.move_mon.get_global_activity()
+        health_alerts = self.health_mon.check_health(now) if self.health_mon is not None else []
+        self._registrar_alertas(health_alerts, now)
+
+        self.estado = {
+            "audio": audio_stats,
+            "move_status": move_status,
+            "mood": determinar_animo(audio_stats, move_status, health_alerts),
+            "health_alerts": health_alerts,
+        }
+        if self.analytics is not None:
+            self._muestrear(now if now is not None else time.time(), move_val)
+        return self.estado
+
+    def _muestrear(self, now, move_val):
+        if self.ultima_muestra is None:
+            self.ultima_muestra = now
+            return
+        segundos = now - self.ultima_muestra
+        if segundos < MUESTREO_ANALITICA:
+            return
+        self.ultima_muestra = now
+        try:
+            self.analytics.add_sample(now, self.estado["mood"], float(move_val), segundos, camera=self.camera or "")
+        except Exception as e:
+            self._log(f"⚠️ Error guardando muestra de analítica: {e}")
+
+    def _registrar_alertas(self, health_alerts, now):
+        # Las alertas traen las horas en el texto ("SIN COMER: 4.1h"): se
+        # identifican por lo que va antes de ":" y se registran al aparecer
+        activas = {alerta.split(":")[0]: alerta for alerta in health_alerts}
+        for clave, alerta in activas.items():
+            if clave in self.alertas_activas:
+                continue
+            evento = clave.replace("⚠️", "").strip()
+            self._log(f"🚨 ALERTA DE SALUD: {alerta}")
+            registro = self._con_clip(("Salud", evento, 1.0, "Alerta", 1.0, alerta), evento, now)
+            if self.guardar is not None:
+                self.guardar(*registro)
+        self.alertas_activas = set(activas)
+
+    # =========================================================
+    #  DIBUJO
+    # =========================================================
+    def draw(self, frame, fps):
+        dibujar_cajas(frame, self.cajas, self.nombres_clase, self.colores_clase)
+        e = self.estado
+        self.hud.draw(frame, self.acciones.accion_estable, fps, e["audio"], e["move_status"], e["mood"], e["health_alerts"])
+
+    def process(self, frame, now, stream_ts=None, fps=0.0, draw=True):
+        """Corre todas las etapas sobre un frame (dibuja sobre él si `draw`)."""
+        with self._etapa("inferencia"):
+            detecciones = self.detect(frame, now)
+        return self.finish(frame, detecciones, now, stream_ts, fps, draw)
+
+    def finish(self, frame, detecciones, now, stream_ts=None, fps=0.0, draw=True):
+        """Etapas posteriores a la inferencia (`detecciones` None = frame salteado)."""
+        accion, conf = "", 0.0
+        if detecciones is not None:
+            with self._etapa("postproceso"):
+                accion, conf = self.postprocess(detecciones, frame, now)
+        elif not self.botsort:
+            self.predict(now)
+        with self._etapa("estado"):
+            self.update_actions(accion, conf, now)
+        with self._etapa("animo"):
+            self.assess(stream_ts, now)
+        if draw:
+            with self._etapa("hud"):
+                self.draw(frame, fps)
+        return self.estado
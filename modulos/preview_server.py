@@ -0,0 +1,134 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+BOUNDARY = "frame"
+
+PAGINA = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Monitor Ninfas</title></head>
+<body style="margin:0;background:#111"><img src="/stream" style="width:100%"></body></html>
+"""
+
+
+class PreviewServer:
+    """Vista previa MJPEG por HTTP local para el modo sin ventana.
+
+    El bucle principal pregunta `wants_frame(now)`: sólo hay que dibujar el
+    HUD cuando hay alguien mirando y pasó el intervalo de la vista previa
+    (`max_fps`, independiente del ritmo de análisis). Cada frame publicado se
+    codifica a JPEG una única vez y los mismos bytes se envían a todos los
+    clientes conectados.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8090, max_fps=5.0, quality=70):
+        self.host = host
+        self.port = port
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.quality = int(quality)
+
+        self.cond = threading.Condition()
+        self.jpeg = None
+        self.seq = 0
+        self.viewers = 0
+        self.last_publish = float("-inf")
+        self.encoded = 0
+        self.running = False
+
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def has_viewers(self):
+        return self.viewers > 0
+
+    def wants_frame(self, now=None):
+        if self.viewers <= 0:
+            return False
+        now = time.time() if now is None else now
+        return (now - self.last_publish) >= self.min_interval
+
+    def publish(self, frame, now=None):
+        """Codifica el frame anotado y despierta a todos los clientes."""
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+        with self.cond:
+            self.jpeg = buf.tobytes()
+            self.seq += 1
+            self.encoded += 1
+            self.last_publish = time.time() if now is None else now
+            self.cond.notify_all()
+
+    def get_stats(self):
+        return {"viewers": self.viewers, "encoded": self.encoded}
+
+    def _wait_frame(self, last_seq, timeout=1.0):
+        with self.cond:
+            if self.seq == last_seq and self.running:
+                self.cond.wait(timeout)
+            return self.seq, self.jpeg
+
+    def start(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                ruta = self.path.split("?")[0]
+                if ruta == "/":
+                    cuerpo = PAGINA.encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(cuerpo)))
+                    self.end_headers()
+                    self.wfile.write(cuerpo)
+                elif ruta == "/stream":
+                    self._stream()
+                else:
+                    self.send_error(404)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.end_headers()
+
+                with server.cond:
+                    server.viewers += 1
+                ultimo = -1
+                try:
+                    while server.running:
+                        seq, jpeg = server._wait_frame(ultimo)
+                        if jpeg is None or seq == ultimo:
+                            continue
+                        ultimo = seq
+                        self.wfile.write(
+                            f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+                        )
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente cerró la pestaña
+                    pass
+                finally:
+                    with server.cond:
+                        server.viewers -= 1
+
+            def log_message(self, *_args):
+                pass
+
+        self.running = True
+        self.httpd = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
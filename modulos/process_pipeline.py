@@ -0,0 +1,495 @@
+import math
+import multiprocessing as mp
+import os
+import queue
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import av
+import numpy as np
+
+from modulos.audio_analysis import SAMPLE_RATE, AudioMonitor
+from modulos.detections import Detections
+from modulos.shm_ring import SharedFrameRing
+from modulos.stream_session import StreamSession
+
+# Igual que en modulos.pipeline, que no se importa aquí porque carga ultralytics
+AUDIO_SIN_DATOS = {"status": "Silencio", "rms": 0.0, "freq": 0.0, "centroid": 0.0, "ts": None}
+
+
+# =========================================================
+#  PROCESO DE CAPTURA (demux + decode -> anillo compartido)
+# =========================================================
+class _AudioForwarder:
+    """Reemplaza al AudioMonitor en la sesión: remuestrea y manda las muestras al proceso de audio."""
+
+    def __init__(self, audio_q):
+        self.audio_q = audio_q
+        self.resampler = None
+
+    def _enviar(self, item):
+        try:
+            self.audio_q.put_nowait(item)
+        except queue.Full:
+            pass
+
+    def reset_stream(self):
+        self.resampler = None
+        self._enviar(("reset", None, None))
+
+    def feed(self, frame):
+        if self.resampler is None:
+            self.resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+        ts = frame.time
+        for out_frame in self.resampler.resample(frame):
+            self._enviar(("muestras", out_frame.to_ndarray().reshape(-1), ts))
+            ts = None
+
+
+def _proceso_captura(url, ring_spec, frames_q, audio_q, stop_event):
+    ring = SharedFrameRing.attach(ring_spec)
+    session = StreamSession(url, audio_monitor=_AudioForwarder(audio_q) if audio_q is not None else None)
+    session.start()
+    aviso_tamano = False
+    try:
+        while not stop_event.is_set():
+            ret, frame = session.read(timeout=0.5)
+            if not ret:
+                continue
+            desc = ring.write(frame, time.time(), session.last_stream_ts)
+            if desc is None:
+                if not aviso_tamano:
+                    print(f"⚠️ Frame {frame.shape[1]}x{frame.shape[0]} más grande que el anillo compartido")
+                    aviso_tamano = True
+                continue
+            try:
+                frames_q.put_nowait(desc)
+            except queue.Full:
+                # El proceso principal va atrasado: ese frame se pierde
+                pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        session.stop()
+        ring.close()
+
+
+# =========================================================
+#  PROCESO DE AUDIO
+# =========================================================
+def _proceso_audio(audio_q, out_q, source_note):
+    mon = AudioMonitor(guardar=lambda *registro: out_q.put(("registro", registro)), source_note=source_note)
+    enviado = None
+    try:
+        while True:
+            item = audio_q.get()
+            if item is None:
+                break
+            tipo, muestras, ts = item
+            if tipo == "reset":
+                mon.reset_stream()
+                enviado = None
+                continue
+
+            antes = mon.chunks_analyzed
+            mon.feed_samples(muestras, ts)
+            if mon.chunks_analyzed == antes:
+                continue
+            with mon.lock:
+                nuevos = [h for h in mon.history if enviado is None or h[0] > enviado]
+            if nuevos:
+                enviado = nuevos[-1][0]
+            out_q.put(("estado", nuevos, mon.get_status(), mon.get_stats()))
+    except KeyboardInterrupt:
+        pass
+
+
+class RemoteAudioStatus:
+    """`get_status`/`get_stats` de un AudioMonitor que corre en el proceso de audio."""
+
+    def __init__(self, history_seconds=5.0):
+        self.history_seconds = history_seconds
+        self.history = deque()
+        self.latest = dict(AUDIO_SIN_DATOS)
+        self.stats = {}
+
+    def apply(self, nuevos, latest, stats):
+        self.history.extend(nuevos)
+        while self.history and self.history[-1][0] - self.history[0][0] > self.history_seconds:
+            self.history.popleft()
+        self.latest = latest
+        self.stats = stats
+
+    def get_status(self, at=None):
+        if at is not None and self.history:
+            for ts, status, rms, freq, centroid in reversed(self.history):
+                if ts <= at:
+                    return {"status": status, "rms": rms, "freq": freq, "centroid": centroid, "ts": ts}
+        return self.latest
+
+    def get_stats(self):
+        return self.stats
+
+    def stop(self):
+        pass
+
+
+# =========================================================
+#  WORKERS DE INFERENCIA
+# =========================================================
+def _proceso_inferencia(weights, backend, ring_spec, in_q, out_q, threads):
+    if threads:
+        try:
+            import torch
+
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    from modulos.inference_backends import load_detector
+
+    try:
+        model, backend = load_detector(weights, backend)
+    except Exception as e:
+        out_q.put(("error", os.getpid(), str(e)))
+        return
+    out_q.put(("listo", os.getpid(), (dict(model.names) if isinstance(model.names, dict) else list(model.names))))
+
+    ring = SharedFrameRing.attach(ring_spec)
+    avisado = False
+    try:
+        while True:
+            item = in_q.get()
+            if item is None:
+                break
+            desc, clases = item
+            datos = None
+            try:
+                if ring.is_valid(desc):
+                    results = model(ring.view(desc), verbose=False, conf=0.15, iou=0.5, classes=clases)
+                    dets = Detections.from_results(results)
+                    # Si el productor pisó el slot durante la inferencia, el resultado no sirve
+                    if ring.is_valid(desc):
+                        datos = (dets.xyxy, dets.conf, dets.cls)
+            except Exception as e:
+                if not avisado:
+                    print(f"⚠️ Error en la inferencia (worker {os.getpid()}): {e}")
+                    avisado = True
+            # Siempre se responde: el principal no debe esperar este seq para siempre
+            out_q.put(("detecciones", desc[0], datos))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+class ProcessPipeline:
+    """Captura, inferencia y audio en procesos separados (modo opcional).
+
+    - Un proceso de captura demultiplexa el RTSP, decodifica el video y
+      escribe cada frame una vez en un SharedFrameRing; el audio remuestreado
+      va por una cola al proceso de audio.
+    - `workers` procesos de inferencia, cada uno con su copia del detector,
+      leen el frame del anillo sin copiarlo.
+    - Este proceso (el principal) hace el planificador, el estado de acciones,
+      movimiento, salud y BD con el mismo MonitorPipeline de siempre.
+
+    Por las colas sólo pasan descriptores y arrays de cajas, nunca frames. Las
+    detecciones no pasan por BoT-SORT (cada worker tendría su propio estado):
+    los IDs los pone el tracker IoU del pipeline, como en el modo multi-cámara.
+
+    Un worker que muere se relanza (hasta `MAX_REINICIOS` veces) y una
+    inferencia sin respuesta en `inference_timeout` segundos se da por perdida.
+
+    El anillo tiene que guardar cada frame mientras se infiere: sin `slots`
+    se dimensiona con los frames que llegan durante `expected_latency`
+    segundos a `fps`, más uno por worker y los de la cola. Cada slot ocupa
+    ancho x alto x 3 bytes (unos 6 MB a 1080p).
+    """
+
+    MAX_REINICIOS = 3
+
+    def __init__(
+        self,
+        url,
+        weights,
+        backend="auto",
+        workers=2,
+        slots=None,
+        fps=15.0,
+        expected_latency=1.0,
+        max_size=(1920, 1080),
+        audio=True,
+        source_note="TapoMovil",
+        inference_timeout=10.0,
+    ):
+        self.url = url
+        self.weights = weights
+        self.backend = backend
+        self.workers = max(1, workers)
+        # Frames en tránsito: los de la latencia, uno por worker, la cola y el que se está mostrando
+        self.slots = slots or math.ceil(fps * expected_latency) + self.workers + 3
+        self.max_size = max_size
+        self.audio = audio
+        self.source_note = source_note
+        self.inference_timeout = inference_timeout
+
+        self.pipeline = None
+        self.audio_status = RemoteAudioStatus() if audio else None
+        self.guardar = None
+
+        self.ring = None
+        self.procesos = []
+        self.trabajadores = []
+        self.reinicios = []
+        self.en_vuelo = {}
+        self.ultimo_aplicado = 0
+        # pids de los workers con el modelo cargado
+        self.listos = set()
+        self.ultima_revision = 0.0
+        self.frames = 0
+        self.descartados = 0
+        self.pisados = 0
+        self.perdidos = 0
+        self.atrasados = 0
+        self.vencidos = 0
+        self.relanzados = 0
+        self.sin_workers_avisado = False
+
+    def _lanzar_worker(self):
+        return self.ctx.Process(
+            target=_proceso_inferencia,
+            args=(self.weights, self.backend, self.spec, self.infer_q, self.results_q, self.hilos),
+            name="inferencia",
+            daemon=True,
+        )
+
+    def start(self, timeout_modelo=120.0):
+        """Lanza los procesos y espera a que todos los workers carguen el modelo.
+
+        Devuelve `model.names` (para armar el MonitorPipeline en este proceso).
+        Lanza RuntimeError si ningún worker pudo cargarlo.
+        """
+        self.ctx = ctx = mp.get_context("spawn")
+        ancho, alto = self.max_size
+        self.ring = SharedFrameRing(self.slots, ancho, alto)
+        self.spec = spec = self.ring.spec()
+
+        self.stop_event = ctx.Event()
+        self.frames_q = ctx.Queue(maxsize=2)
+        self.infer_q = ctx.Queue(maxsize=self.workers * 2)
+        self.results_q = ctx.Queue()
+        self.audio_q = ctx.Queue(maxsize=500) if self.audio else None
+        self.audio_out_q = ctx.Queue() if self.audio else None
+
+        # Los hilos de cómputo se reparten entre los workers
+        self.hilos = max(1, (os.cpu_count() or 2) // (self.workers + 1))
+        self.trabajadores = [self._lanzar_worker() for _ in range(self.workers)]
+        self.reinicios = [0] * self.workers
+        for p in self.trabajadores:
+            p.start()
+
+        if self.audio:
+            self.procesos.append(
+                ctx.Process(
+                    target=_proceso_audio,
+                    args=(self.audio_q, self.audio_out_q, self.source_note),
+                    name="audio",
+                    daemon=True,
+                )
+            )
+        self.procesos.append(
+            ctx.Process(
+                target=_proceso_captura,
+                args=(self.url, spec, self.frames_q, self.audio_q, self.stop_event),
+                name="captura",
+                daemon=True,
+            )
+        )
+        for p in self.procesos:
+            p.start()
+
+        names, errores = self._esperar_workers(timeout_modelo)
+        if not self.listos:
+            self.stop()
+            raise RuntimeError(f"Ningún worker de inferencia cargó el modelo: {'; '.join(errores) or 'timeout'}")
+        if len(self.listos) < self.workers:
+            print(f"⚠️ Sólo {len(self.listos)}/{self.workers} workers de inferencia listos: {'; '.join(errores)}")
+            # Los que fallaron al cargar no se relanzan (volverían a fallar)
+            self.trabajadores = [p for p in self.trabajadores if p.pid in self.listos]
+            self.reinicios = [0] * len(self.trabajadores)
+        return names
+
+    def _esperar_workers(self, timeout):
+        names = None
+        errores = {}
+        limite = time.monotonic() + timeout
+        pids = {p.pid for p in self.trabajadores}
+        while len(self.listos) + len(errores) < len(pids) and time.monotonic() < limite:
+            try:
+                tipo, pid, dato = self.results_q.get(timeout=1.0)
+            except queue.Empty:
+                # Un worker que murió sin avisar (p. ej. sin memoria al cargar)
+                for p in self.trabajadores:
+                    if not p.is_alive() and p.pid not in self.listos:
+                        errores.setdefault(p.pid, f"terminó con código {p.exitcode}")
+                continue
+            if tipo == "listo":
+                self.listos.add(pid)
+                names = dato
+            elif tipo == "error":
+                errores[pid] = dato
+        return names, list(errores.values())
+
+    @staticmethod
+    def model_stub(names):
+        """Objeto con `names` para MonitorPipeline (el modelo vive en los workers)."""
+        return SimpleNamespace(names=names)
+
+    def stop(self):
+        if self.ring is None:
+            return
+        self.stop_event.set()
+        for _ in range(self.workers):
+            try:
+                self.infer_q.put(None, timeout=1.0)
+            except queue.Full:
+                pass
+        if self.audio_q is not None:
+            try:
+                self.audio_q.put(None, timeout=1.0)
+            except queue.Full:
+                pass
+        for p in self.trabajadores + self.procesos:
+            p.join(timeout=3.0)
+            if p.is_alive():
+                p.terminate()
+        self.ring.close()
+        self.ring = None
+
+    def get_stats(self):
+        return {
+            "frames": self.frames,
+            "dropped": self.descartados,
+            "overwritten": self.pisados,
+            "in_flight": len(self.en_vuelo),
+            "lost": self.perdidos,
+            "stale": self.atrasados,
+            "timed_out": self.vencidos,
+            "workers_ready": len(self.listos),
+            "respawned": self.relanzados,
+            "alive": sum(p.is_alive() for p in self.trabajadores + self.procesos),
+        }
+
+    def _drenar_audio(self):
+        if self.audio_out_q is None:
+            return
+        while True:
+            try:
+                msg = self.audio_out_q.get_nowait()
+            except queue.Empty:
+                return
+            if msg[0] == "estado":
+                self.audio_status.apply(*msg[1:])
+            elif msg[0] == "registro" and self.guardar is not None:
+                self.guardar(*msg[1])
+
+    def _drenar_resultados(self):
+        while True:
+            try:
+                tipo, seq, datos = self.results_q.get_nowait()
+            except queue.Empty:
+                return
+            if tipo == "listo":
+                self.listos.add(seq)
+                continue
+            if tipo == "error":
+                print(f"⚠️ Un worker de inferencia no pudo cargar el modelo: {datos}")
+                continue
+
+            entrada = self.en_vuelo.pop(seq, None)
+            if entrada is None:
+                continue
+            desc, clases, _t = entrada
+            if datos is None:
+                # El anillo dio la vuelta antes de inferir: se pierde esa inferencia
+                self.perdidos += 1
+                continue
+            if seq < self.ultimo_aplicado:
+                # Llegó después de uno más nuevo (otro worker fue más rápido)
+                self.atrasados += 1
+                continue
+            self.ultimo_aplicado = seq
+
+            xyxy, conf, cls = datos
+            dets = self.pipeline.from_batch(Detections(xyxy, conf, cls, np.full(len(conf), -1)), clases)
+            # postprocess sólo necesita las dimensiones del frame. Se aplica
+            # "ahora" (el estado no puede ir hacia atrás en el tiempo); el
+            # stream_ts del frame sirve para buscar el audio de ese momento
+            forma = np.broadcast_to(np.uint8(0), (desc[2], desc[3], 3))
+            self.pipeline.finish(forma, dets, time.time(), stream_ts=desc[5], draw=False)
+
+    def _vigilar_workers(self, ahora):
+        # Inferencias sin respuesta (el worker murió o se colgó con ese frame)
+        for seq, (_desc, _clases, t) in list(self.en_vuelo.items()):
+            if ahora - t > self.inference_timeout:
+                del self.en_vuelo[seq]
+                self.vencidos += 1
+
+        for i, p in enumerate(self.trabajadores):
+            if p.is_alive():
+                continue
+            self.listos.discard(p.pid)
+            if self.reinicios[i] >= self.MAX_REINICIOS:
+                continue
+            self.reinicios[i] += 1
+            self.relanzados += 1
+            print(f"⚠️ Worker de inferencia {p.pid} terminó (código {p.exitcode}), relanzando")
+            self.trabajadores[i] = self._lanzar_worker()
+            self.trabajadores[i].start()
+
+        if not self.sin_workers_avisado and not any(p.is_alive() for p in self.trabajadores):
+            print("❌ No quedan workers de inferencia: el monitoreo sigue sin detecciones")
+            self.sin_workers_avisado = True
+
+    def step(self, timeout=0.5):
+        """Atiende un frame nuevo; devuelve (descriptor, frame) o None.
+
+        El frame es una copia propia (se puede dibujar encima).
+        """
+        self._drenar_audio()
+        self._drenar_resultados()
+        ahora = time.time()
+        if ahora - self.ultima_revision >= 1.0:
+            self.ultima_revision = ahora
+            self._vigilar_workers(ahora)
+
+        try:
+            desc = self.frames_q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        # Política de "último frame": si hay más en la cola, los anteriores se saltean
+        while True:
+            try:
+                desc = self.frames_q.get_nowait()
+                self.descartados += 1
+            except queue.Empty:
+                break
+
+        # Una sola copia por frame; si el productor pisó el slot mientras se
+        # copiaba, el frame puede estar mezclado y se descarta (como en los workers)
+        frame = self.ring.view(desc).copy()
+        if not self.ring.is_valid(desc):
+            self.pisados += 1
+            return None
+
+        self.frames += 1
+        ahora = time.time()
+        if len(self.en_vuelo) < len(self.listos) and self.pipeline.wants_inference(frame, ahora):
+            clases = self.pipeline.begin_inference(ahora)
+            self.en_vuelo[desc[0]] = (desc, clases, ahora)
+            self.infer_q.put((desc, clases))
+        else:
+            self.pipeline.finish(frame, None, ahora, stream_ts=desc[5], draw=False)
+        return desc, frame
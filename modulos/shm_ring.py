@@ -0,0 +1,86 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Slot en escritura: quien lo lea en ese momento descarta el frame
+ESCRIBIENDO = -1
+
+
+class SharedFrameRing:
+    """Buffer circular de frames en `multiprocessing.shared_memory`.
+
+    El proceso de captura escribe cada frame una vez en el slot `seq % slots`
+    y por las colas viaja sólo un descriptor chico `(seq, slot, alto, ancho,
+    ts, stream_ts)`. Los lectores (inferencia, proceso principal) obtienen una
+    vista NumPy del slot sin copiar ni serializar. Cada slot guarda en una
+    cabecera compartida el `seq` que contiene; `is_valid(desc)` dice si el
+    frame sigue ahí o el productor ya dio la vuelta al anillo.
+    """
+
+    def __init__(self, slots=8, max_width=1920, max_height=1080, name=None, create=True):
+        self.slots = slots
+        self.max_width = max_width
+        self.max_height = max_height
+        self.slot_bytes = max_width * max_height * 3
+        self.header_bytes = slots * 8
+        self.owner = create
+
+        tamano = self.header_bytes + slots * self.slot_bytes
+        # Los procesos hijos (spawn) comparten el resource_tracker del
+        # principal, que es el único que hace unlink
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=tamano if create else 0)
+
+        self.header = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf)
+        if create:
+            self.header[:] = ESCRIBIENDO
+        self.seq = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def spec(self):
+        """Argumentos para abrir el mismo anillo desde otro proceso (`attach`)."""
+        return {"slots": self.slots, "max_width": self.max_width, "max_height": self.max_height, "name": self.name}
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(create=False, **spec)
+
+    def _slot_array(self, slot, alto, ancho):
+        inicio = self.header_bytes + slot * self.slot_bytes
+        return np.ndarray((alto, ancho, 3), dtype=np.uint8, buffer=self.shm.buf, offset=inicio)
+
+    def write(self, frame, ts=0.0, stream_ts=None):
+        """Copia el frame al próximo slot y devuelve su descriptor (o None si no entra)."""
+        alto, ancho = frame.shape[:2]
+        if ancho > self.max_width or alto > self.max_height or frame.ndim != 3:
+            return None
+
+        self.seq += 1
+        slot = self.seq % self.slots
+        self.header[slot] = ESCRIBIENDO
+        np.copyto(self._slot_array(slot, alto, ancho), frame)
+        self.header[slot] = self.seq
+        return (self.seq, slot, alto, ancho, ts, stream_ts)
+
+    def view(self, desc):
+        """Vista (sin copia) del frame del descriptor; válida mientras `is_valid(desc)`."""
+        seq, slot, alto, ancho = desc[:4]
+        return self._slot_array(slot, alto, ancho)
+
+    def is_valid(self, desc):
+        return int(self.header[desc[1]]) == desc[0]
+
+    def close(self):
+        # Las vistas deben soltarse antes de cerrar el bloque
+        self.header = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
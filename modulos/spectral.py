@@ -0,0 +1,118 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Bandas (Hz) para las energías por banda: graves/ruido, voz, chillidos, agudos
+BANDAS_POR_DEFECTO = ((0, 500), (500, 1500), (1500, 4000), (4000, 8000))
+
+
+class SpectralFeatures:
+    """Descriptores de los hops analizados en un `push` (un elemento por hop)."""
+
+    __slots__ = ("ts", "rms", "peak_freq", "centroid", "bands")
+
+    def __init__(self, ts, rms, peak_freq, centroid, bands):
+        self.ts = ts
+        self.rms = rms
+        self.peak_freq = peak_freq
+        self.centroid = centroid
+        self.bands = bands
+
+    def __len__(self):
+        return len(self.rms)
+
+
+class SpectralAnalyzer:
+    """Análisis espectral en streaming con ventanas solapadas de tamaño fijo.
+
+    Las muestras se acumulan en un buffer preasignado; cada `hop` muestras se
+    analiza una ventana de `frame_size` (ventana Hann cacheada + rfft), sin
+    importar de qué tamaño llegan los paquetes del decoder. Todos los hops
+    disponibles se procesan juntos como una matriz (hops x frame_size).
+    """
+
+    def __init__(self, sample_rate=16000, frame_size=1024, hop=512, bands=BANDAS_POR_DEFECTO, max_batch=32):
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.hop = hop
+        self.max_batch = max_batch
+
+        self.window = np.hanning(frame_size).astype(np.float32)
+        self.freqs = np.fft.rfftfreq(frame_size, d=1.0 / sample_rate).astype(np.float32)
+        # Matriz bins -> bandas: la energía por banda es un único producto
+        self.band_matrix = np.zeros((len(self.freqs), len(bands)), dtype=np.float32)
+        for j, (lo, hi) in enumerate(bands):
+            self.band_matrix[(self.freqs >= lo) & (self.freqs < hi), j] = 1.0
+        self.bands = tuple(bands)
+
+        self.capacity = frame_size + (max_batch - 1) * hop
+        self.buffer = np.zeros(self.capacity, dtype=np.float32)
+        self.work = np.empty((max_batch, frame_size), dtype=np.float32)
+        self.fill = 0
+
+        # Reloj del stream: ts de la muestra `anchor_sample` (contada desde el inicio)
+        self.samples_seen = 0
+        self.anchor_sample = 0
+        self.anchor_ts = None
+
+    def reset(self):
+        self.fill = 0
+        self.samples_seen = 0
+        self.anchor_sample = 0
+        self.anchor_ts = None
+
+    def push(self, samples, ts=None):
+        """Agrega muestras mono float32; devuelve los SpectralFeatures de los hops completos."""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        if ts is not None:
+            self.anchor_sample = self.samples_seen
+            self.anchor_ts = ts
+
+        resultados = []
+        pos = 0
+        while pos < len(samples):
+            n = min(len(samples) - pos, self.capacity - self.fill)
+            self.buffer[self.fill : self.fill + n] = samples[pos : pos + n]
+            self.fill += n
+            self.samples_seen += n
+            pos += n
+            if self.fill >= self.frame_size:
+                resultados.append(self._analyze())
+
+        if not resultados:
+            return None
+        if len(resultados) == 1:
+            return resultados[0]
+        campos = SpectralFeatures.__slots__
+        return SpectralFeatures(*(np.concatenate([getattr(r, c) for r in resultados]) for c in campos))
+
+    def _analyze(self):
+        n_hops = 1 + (self.fill - self.frame_size) // self.hop
+        frames = sliding_window_view(self.buffer[: self.fill], self.frame_size)[:: self.hop][:n_hops]
+
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+
+        ventanas = self.work[:n_hops]
+        np.multiply(frames, self.window, out=ventanas)
+        potencia = np.square(np.abs(np.fft.rfft(ventanas, axis=1)))
+
+        total = potencia.sum(axis=1)
+        centroid = np.divide(potencia @ self.freqs, total, out=np.zeros_like(total), where=total > 0)
+        peak = self.freqs[np.argmax(potencia, axis=1)]
+        # Sin señal útil la frecuencia dominante no significa nada
+        peak = np.where(rms > 0.001, peak, 0.0)
+        bandas = potencia @ self.band_matrix
+
+        # Timestamp de cada hop: el final de su ventana en el reloj del stream
+        if self.anchor_ts is not None:
+            fin = self.samples_seen - self.fill + self.frame_size + self.hop * np.arange(n_hops)
+            ts = self.anchor_ts + (fin - self.anchor_sample) / float(self.sample_rate)
+        else:
+            ts = np.full(n_hops, np.nan)
+
+        # Se conservan las muestras que solapan con la próxima ventana
+        consumido = n_hops * self.hop
+        resto = self.fill - consumido
+        self.buffer[:resto] = self.buffer[consumido : self.fill]
+        self.fill = resto
+
+        return SpectralFeatures(ts, rms, peak, centroid, bandas)
@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+
+from modulos.detections import Detections, box_iou
+
+
+class StaticObjectCache:
+    """Ubicaciones cacheadas de objetos fijos (comedero, bebedero).
+
+    Los platos casi nunca se mueven: en lugar de exigir que el detector los
+    encuentre en cada frame, se guardan sus cajas suavizadas (EMA) y se
+    re-validan cada `revalidate_every` segundos. Entre validaciones el pipeline
+    usa las cajas cacheadas y la inferencia puede limitarse a las ninfas.
+
+    Una clase vista pero todavía sin confirmar (recién aparecida o que volvió
+    tras perderse) se sigue buscando en cada inferencia, como mucho durante
+    `revalidate_every` segundos; una clase que no aparece (plato fuera de
+    cuadro o retirado) sólo se busca en las validaciones periódicas.
+    """
+
+    def __init__(
+        self,
+        class_ids,
+        revalidate_every=60.0,
+        alpha=0.2,
+        iou_match=0.3,
+        min_hits=3,
+        max_misses=5,
+    ):
+        self.class_ids = [c for c in class_ids if c >= 0]
+        self.revalidate_every = revalidate_every
+        self.alpha = alpha
+        self.iou_match = iou_match
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.last_validation = 0.0
+        self.validations = 0
+        # Por clase: desde cuándo se busca confirmarla (None = no se busca)
+        self.buscando_desde = {c: None for c in self.class_ids}
+
+        # Por clase: cajas (K x 4, float), hits y validaciones seguidas sin verla
+        self.boxes = {c: np.empty((0, 4), dtype=np.float32) for c in self.class_ids}
+        self.hits = {c: np.empty(0, dtype=np.int32) for c in self.class_ids}
+        self.misses = {c: np.empty(0, dtype=np.int32) for c in self.class_ids}
+
+    def needs_validation(self, now=None):
+        """True si toca correr el detector completo para re-validar los platos."""
+        now = now if now is not None else time.time()
+        if now - self.last_validation >= self.revalidate_every:
+            return True
+        return any(
+            desde is not None and now - desde < self.revalidate_every for desde in self.buscando_desde.values()
+        )
+
+    def update(self, detections, now=None):
+        """Incorpora las detecciones de un frame con todas las clases."""
+        self.last_validation = now if now is not None else time.time()
+        self.validations += 1
+
+        for c in self.class_ids:
+            nuevas = detections.xyxy[detections.cls == c].astype(np.float32)
+            cajas, hits, misses = self.boxes[c], self.hits[c], self.misses[c]
+
+            vistas = np.zeros(len(cajas), dtype=bool)
+            sin_match = np.ones(len(nuevas), dtype=bool)
+            if len(cajas) and len(nuevas):
+                iou = box_iou(nuevas, cajas)
+                # Cada detección se asocia a la caja cacheada con mayor IoU
+                mejor = iou.argmax(axis=1)
+                ok = iou[np.arange(len(nuevas)), mejor] >= self.iou_match
+                for i in np.flatnonzero(ok):
+                    j = mejor[i]
+                    if vistas[j]:
+                        continue
+                    cajas[j] = (1 - self.alpha) * cajas[j] + self.alpha * nuevas[i]
+                    vistas[j] = True
+                    sin_match[i] = False
+
+            hits = hits + vistas
+            misses = np.where(vistas, 0, misses + 1)
+
+            if np.any(sin_match):
+                cajas = np.concatenate([cajas, nuevas[sin_match]])
+                hits = np.concatenate([hits, np.ones(int(sin_match.sum()), dtype=np.int32)])
+                misses = np.concatenate([misses, np.zeros(int(sin_match.sum()), dtype=np.int32)])
+
+            # Se olvidan las cajas que dejaron de aparecer en varias validaciones
+            vivas = misses <= self.max_misses
+            self.boxes[c] = cajas[vivas]
+            self.hits[c] = hits[vivas].astype(np.int32)
+            self.misses[c] = misses[vivas].astype(np.int32)
+
+            # Vista pero sin caja confirmada: se busca hasta confirmarla o agotar la ventana
+            pendiente = len(self.boxes[c]) > 0 and not np.any(self.hits[c] >= self.min_hits)
+            if not pendiente:
+                self.buscando_desde[c] = None
+            elif self.buscando_desde[c] is None:
+                self.buscando_desde[c] = self.last_validation
+
+    def get_boxes(self, cls_id):
+        """Cajas confirmadas de una clase (K x 4, int32)."""
+        if cls_id not in self.boxes:
+            return np.empty((0, 4), dtype=np.int32)
+        confirmadas = self.hits[cls_id] >= self.min_hits
+        return self.boxes[cls_id][confirmadas].astype(np.int32)
+
+    def as_detections(self):
+        """Cajas confirmadas de todas las clases, para dibujar junto al resto."""
+        partes = []
+        for c in self.class_ids:
+            cajas = self.get_boxes(c)
+            n = len(cajas)
+            partes.append(Detections(cajas, np.ones(n), np.full(n, c), np.full(n, -1)))
+        return Detections.concat(partes)
+
+    def get_stats(self):
+        return {
+            "validations": self.validations,
+            "confirmed": {c: int(np.sum(self.hits[c] >= self.min_hits)) for c in self.class_ids},
+            "searching": [c for c, desde in self.buscando_desde.items() if desde is not None],
+            "last_validation": self.last_validation,
+        }
@@ -0,0 +1,98 @@
+import time
+
+import av
+
+from modulos.frame_capture import FrameGrabber
+
+
+class StreamSession(FrameGrabber):
+    """Una sola conexión RTSP que reparte video y audio.
+
+    Las cámaras Tapo limitan las sesiones simultáneas, así que en lugar de abrir
+    un `cv2.VideoCapture` y otro `av.open` sobre la misma URL, se demultiplexa
+    una única vez: los paquetes de video alimentan al detector (con la misma
+    política de "último frame" de FrameGrabber) y los de audio al AudioMonitor.
+    Ambos llevan el timestamp del stream (`frame.time`), que es un reloj común.
+    Con `recorder` (un ClipRecorder) los paquetes comprimidos también alimentan
+    el buffer de pre-grabación de los clips de eventos.
+    """
+
+    def __init__(self, url, audio_monitor=None, reconnect_delay=2.0, recorder=None):
+        super().__init__(url, reconnect_delay=reconnect_delay)
+        self.audio_monitor = audio_monitor
+        self.recorder = recorder
+        self.audio_error_reported = False
+
+    def _convert(self, frame):
+        # Los frames quedan como av.VideoFrame hasta que alguien los consume:
+        # los que se descartan nunca pagan la conversión a BGR.
+        return frame.to_ndarray(format="bgr24")
+
+    def _capture_loop(self):
+        while self.running:
+            container = None
+            try:
+                # Opciones para reducir latencia en la conexión
+                options = {"rtsp_transport": "tcp", "stimeout": "5000000"}
+                container = av.open(self.source, options=options)
+
+                if not container.streams.video:
+                    raise RuntimeError("el stream no tiene video")
+
+                video = container.streams.video[0]
+                video.thread_type = "AUTO"
+                streams = [video]
+
+                audio = None
+                if self.audio_monitor is not None or self.recorder is not None:
+                    if container.streams.audio:
+                        audio = container.streams.audio[0]
+                        streams.append(audio)
+                        if self.audio_monitor is not None:
+                            self.audio_monitor.reset_stream()
+                    elif self.audio_monitor is not None:
+                        print("⚠️ No se encontró stream de audio.")
+
+                if self.recorder is not None:
+                    self.recorder.open_stream(video, audio)
+
+                for packet in container.demux(*streams):
+                    if not self.running:
+                        break
+
+                    if packet.stream is video:
+                        for frame in packet.decode():
+                            self._publish(frame, stream_ts=frame.time)
+                    elif packet.stream is audio and self.audio_monitor is not None:
+                        self._feed_audio(packet)
+
+                    if self.recorder is not None:
+                        self.recorder.add_packet(packet)
+
+            except Exception as e:
+                if self.running:
+                    print(f"⚠️ Señal perdida ({e}). Reconectando...")
+            finally:
+                # El clip en curso se cierra mientras sus streams de entrada siguen vivos
+                if self.recorder is not None:
+                    self.recorder.close_stream()
+                if container:
+                    try:
+                        container.close()
+                    except Exception:
+                        pass
+
+            if self.running:
+                with self.lock:
+                    self.reconnects += 1
+                time.sleep(self.reconnect_delay)
+
+    def _feed_audio(self, packet):
+        # Un fallo en el análisis de audio no debe cortar el video
+        try:
+            for frame in packet.decode():
+                self.audio_monitor.feed(frame)
+        except Exception as e:
+            if not self.audio_error_reported:
+                print(f"⚠️ Error en audio, se sigue sólo con video: {e}")
+                self.audio_error_reported = True
@@ -0,0 +1,156 @@
+import numpy as np
+
+from modulos.detections import Detections, box_iou
+
+try:
+    from scipy.optimize import linear_sum_assignment  # type: ignore
+except ImportError:
+    # Sin SciPy se asigna con el greedy vectorizado (para pocas ninfas es igual de bueno)
+    linear_sum_assignment = None
+
+# Costo de los pares que no pueden asociarse
+SIN_ASOCIACION = 1e6
+
+
+def greedy_assignment(cost, max_cost):
+    """Asigna filas a columnas por costo creciente, sin repetir ninguna.
+
+    Devuelve (filas, columnas) de los pares con costo <= `max_cost`.
+    """
+    if cost.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    orden = np.argsort(cost, axis=None, kind="stable")
+    orden = orden[cost.ravel()[orden] <= max_cost]
+    filas, columnas = np.unravel_index(orden, cost.shape)
+
+    usadas_f = np.zeros(cost.shape[0], dtype=bool)
+    usadas_c = np.zeros(cost.shape[1], dtype=bool)
+    elegidos = []
+    for k, (f, c) in enumerate(zip(filas.tolist(), columnas.tolist())):
+        if usadas_f[f] or usadas_c[c]:
+            continue
+        usadas_f[f] = usadas_c[c] = True
+        elegidos.append(k)
+    return filas[elegidos], columnas[elegidos]
+
+
+class IouTracker:
+    """Tracker IoU/centroide liviano, alternativa a BoT-SORT sin `lap`.
+
+    Los tracks viven en arrays NumPy (cajas, velocidad, clase, última vez
+    visto). En cada inferencia se predice dónde está cada track (velocidad
+    constante), se arma la matriz de costo contra las detecciones de una vez
+    (1 - IoU, más la distancia entre centros normalizada por el tamaño de la
+    caja para no perder a un pájaro que saltó) y se asigna con el algoritmo
+    húngaro de SciPy o, sin SciPy, con un greedy vectorizado. Lo que no se
+    asocia abre un track nuevo; un track sin detecciones durante `max_age`
+    segundos se descarta.
+
+    En los frames sin inferencia `predict(now)` extrapola las cajas, así que
+    correr en cada frame cuesta unos pocos microsegundos.
+    """
+
+    def __init__(self, iou_min=0.2, max_distance=1.0, max_age=3.0, max_predict=1.0, smoothing=0.5):
+        self.iou_min = iou_min
+        # Distancia entre centros / diagonal de la caja previa
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.max_predict = max_predict
+        self.smoothing = smoothing
+
+        self.ids = np.empty(0, dtype=np.int64)
+        self.xyxy = np.empty((0, 4), dtype=np.float32)
+        self.vel = np.empty((0, 4), dtype=np.float32)
+        self.cls = np.empty(0, dtype=np.int32)
+        self.conf = np.empty(0, dtype=np.float32)
+        self.last_ts = np.empty(0, dtype=np.float64)
+
+        self.next_id = 1
+        self.created = 0
+        self.matched = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _predicho(self, now):
+        dt = np.clip(now - self.last_ts, 0.0, self.max_predict).astype(np.float32)
+        return self.xyxy + self.vel * dt[:, None]
+
+    def _costo(self, predichas, detecciones):
+        iou = box_iou(detecciones.xyxy, predichas)
+
+        centros_t = (predichas[:, :2] + predichas[:, 2:]) / 2
+        centros_d = detecciones.centers.astype(np.float32)
+        diagonal = np.hypot(predichas[:, 2] - predichas[:, 0], predichas[:, 3] - predichas[:, 1])
+        distancia = np.linalg.norm(centros_d[:, None, :] - centros_t[None, :, :], axis=2)
+        distancia /= np.maximum(diagonal, 1.0)[None, :]
+
+        costo = (1.0 - iou) + 0.5 * distancia
+        valido = (iou >= self.iou_min) | (distancia <= self.max_distance)
+        valido &= detecciones.cls[:, None] == self.cls[None, :]
+        return np.where(valido, costo, SIN_ASOCIACION)
+
+    def update(self, detecciones, now):
+        """Asocia las detecciones a los tracks y devuelve una copia con sus IDs."""
+        self._expirar(now)
+        n = len(detecciones)
+        ids = np.full(n, -1, dtype=np.int64)
+
+        filas = columnas = np.empty(0, dtype=np.intp)
+        if n and len(self):
+            costo = self._costo(self._predicho(now), detecciones)
+            if linear_sum_assignment is not None:
+                filas, columnas = linear_sum_assignment(costo)
+                ok = costo[filas, columnas] < SIN_ASOCIACION
+                filas, columnas = filas[ok], columnas[ok]
+            else:
+                filas, columnas = greedy_assignment(costo, SIN_ASOCIACION - 1)
+
+        if len(filas):
+            nuevas = detecciones.xyxy[filas].astype(np.float32)
+            dt = np.maximum(now - self.last_ts[columnas], 1e-3).astype(np.float32)
+            medida = (nuevas - self.xyxy[columnas]) / dt[:, None]
+            a = self.smoothing
+            self.vel[columnas] = a * medida + (1 - a) * self.vel[columnas]
+            self.xyxy[columnas] = nuevas
+            self.conf[columnas] = detecciones.conf[filas]
+            self.last_ts[columnas] = now
+            ids[filas] = self.ids[columnas]
+            self.matched += len(filas)
+
+        libres = ids < 0
+        k = int(libres.sum())
+        if k:
+            nuevos_ids = np.arange(self.next_id, self.next_id + k, dtype=np.int64)
+            self.next_id += k
+            self.created += k
+            ids[libres] = nuevos_ids
+            self.ids = np.concatenate([self.ids, nuevos_ids])
+            self.xyxy = np.concatenate([self.xyxy, detecciones.xyxy[libres].astype(np.float32)])
+            self.vel = np.concatenate([self.vel, np.zeros((k, 4), dtype=np.float32)])
+            self.cls = np.concatenate([self.cls, detecciones.cls[libres]])
+            self.conf = np.concatenate([self.conf, detecciones.conf[libres]])
+            self.last_ts = np.concatenate([self.last_ts, np.full(k, now)])
+
+        return Detections(detecciones.xyxy, detecciones.conf, detecciones.cls, ids)
+
+    def predict(self, now, max_age=None):
+        """Cajas extrapoladas de los tracks vistos en los últimos `max_age` segundos."""
+        vivos = (now - self.last_ts) <= (self.max_age if max_age is None else max_age)
+        if not vivos.any():
+            return Detections.empty()
+        cajas = self._predicho(now)[vivos]
+        return Detections(cajas, self.conf[vivos], self.cls[vivos], self.ids[vivos])
+
+    def _expirar(self, now):
+        vivos = (now - self.last_ts) <= self.max_age
+        if vivos.all():
+            return
+        for nombre in ("ids", "xyxy", "vel", "cls", "conf", "last_ts"):
+            setattr(self, nombre, getattr(self, nombre)[vivos])
+
+    def reset(self):
+        self._expirar(float("inf"))
+
+    def get_stats(self):
+        return {"tracks": len(self), "created": self.created, "matched": self.matched}
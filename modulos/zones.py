@@ -0,0 +1,120 @@
+import json
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Etiqueta de cada zona en la máscara (0 = fuera de toda zona). Se rasteriza
+# en este orden, así que si dos zonas se pisan gana la última (bebedero),
+# igual que en la lógica original por cajas.
+ZONE_LABELS = {"comedero": 1, "bebedero": 2}
+ACTION_BY_LABEL = {1: "Alimentacion", 2: "Hidratacion"}
+
+ZONAS_POR_DEFECTO = Path(__file__).resolve().parent.parent / "config" / "zonas.json"
+
+
+class ZoneMap:
+    """Zonas de comedero/bebedero como polígonos rasterizados a una máscara.
+
+    Cada polígono se dibuja una sola vez (por resolución) en una máscara de
+    etiquetas `uint8`; clasificar los centroides de todas las ninfas es luego
+    un único acceso indexado `mask[cy, cx]`, O(aves) por frame.
+    """
+
+    def __init__(self, zones, frame_size=None):
+        # zones: nombre -> lista de polígonos [[x, y], ...]
+        # frame_size: (ancho, alto) del frame donde se marcaron los puntos
+        self.zones = zones
+        self.frame_size = tuple(frame_size) if frame_size else None
+        self._masks = {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("zonas", {}), data.get("frame_size"))
+
+    def save(self, path):
+        data = {"frame_size": list(self.frame_size) if self.frame_size else None, "zonas": self.zones}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    def mask_for(self, width, height):
+        """Máscara de etiquetas para un frame de `width` x `height` (cacheada)."""
+        key = (width, height)
+        mask = self._masks.get(key)
+        if mask is not None:
+            return mask
+
+        mask = np.zeros((height, width), dtype=np.uint8)
+        sx = sy = 1.0
+        if self.frame_size:
+            # Los polígonos se escalan si la cámara entrega otra resolución
+            sx = width / self.frame_size[0]
+            sy = height / self.frame_size[1]
+
+        for nombre, label in ZONE_LABELS.items():
+            polys = [
+                np.round(np.asarray(p, dtype=np.float64) * (sx, sy)).astype(np.int32)
+                for p in self.zones.get(nombre, [])
+                if len(p) >= 3
+            ]
+            if polys:
+                cv2.fillPoly(mask, polys, label)
+
+        self._masks[key] = mask
+        return mask
+
+    def classify(self, centers, width, height):
+        """Etiqueta de zona para cada centroide (array N x 2 de x, y)."""
+        if len(centers) == 0:
+            return np.zeros(0, dtype=np.uint8)
+        mask = self.mask_for(width, height)
+        xs = np.clip(centers[:, 0], 0, width - 1)
+        ys = np.clip(centers[:, 1], 0, height - 1)
+        return mask[ys, xs]
+
+
+def load_configured_zones(path=None):
+    """ZoneMap de `path` (o ZONAS_CONFIG / config/zonas.json), o None si no hay.
+
+    Sin zonas configuradas el monitor usa las cajas de platos cacheadas.
+    """
+    path = Path(path or os.getenv("ZONAS_CONFIG", str(ZONAS_POR_DEFECTO)))
+    if not path.exists():
+        return None
+    try:
+        zonas = ZoneMap.load(path)
+        print(f"🗺️ Zonas cargadas desde {path}")
+        return zonas
+    except Exception as e:
+        print(f"⚠️ No se pudieron cargar las zonas ({e}), se usan las cajas detectadas")
+        return None
+
+
+def classify_in_boxes(centers, food_boxes, water_boxes):
+    """Etiqueta de zona usando cajas de platos detectadas (sin zonas configuradas).
+
+    Versión vectorizada de la prueba original `x1 < cx < x2 and y1 < cy < y2`.
+    """
+    labels = np.zeros(len(centers), dtype=np.uint8)
+    if len(centers) == 0:
+        return labels
+
+    for boxes, label in ((food_boxes, ZONE_LABELS["comedero"]), (water_boxes, ZONE_LABELS["bebedero"])):
+        if len(boxes) == 0:
+            continue
+        cx = centers[:, 0:1]
+        cy = centers[:, 1:2]
+        dentro = (boxes[:, 0] < cx) & (cx < boxes[:, 2]) & (boxes[:, 1] < cy) & (cy < boxes[:, 3])
+        labels[dentro.any(axis=1)] = label
+    return labels
+
+
+def action_from_labels(labels):
+    """Acción del frame: la de la última ninfa que está en alguna zona."""
+    en_zona = np.flatnonzero(labels)
+    if len(en_zona) == 0:
+        return ""
+    return ACTION_BY_LABEL[int(labels[en_zona[-1]])]
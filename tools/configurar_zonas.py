@@ -1,44 +1,96 @@
+import os
+import sys
+
 import cv2
 import numpy as np
 
-# Variable para guardar los puntos que clickeas
-puntos_comedero = []
+# Permite importar 'modulos' al ejecutar desde la carpeta tools/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modulos.zones import ZoneMap  # noqa: E402
+
+RUTA_ZONAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "zonas.json")
+COLORES = {"comedero": (0, 0, 255), "bebedero": (255, 0, 0)}
+
+# Polígonos terminados por zona y puntos del polígono en curso
+zonas = {"comedero": [], "bebedero": []}
+zona_actual = "comedero"
+puntos_actuales = []
+
+
+def redibujar():
+    vista = img.copy()
+    for nombre, poligonos in zonas.items():
+        for poligono in poligonos:
+            cv2.polylines(vista, [np.array(poligono, np.int32)], True, COLORES[nombre], 2)
+    for x, y in puntos_actuales:
+        cv2.circle(vista, (x, y), 5, COLORES[zona_actual], -1)
+    cv2.putText(vista, f"Zona: {zona_actual.upper()}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, COLORES[zona_actual], 2)
+    cv2.imshow("Configurador de Zonas", vista)
+
 
 def click_event(event, x, y, flags, param):
     if event == cv2.EVENT_LBUTTONDOWN:
         print(f"📍 Punto capturado: {x}, {y}")
-        puntos_comedero.append([x, y])
-        
-        # Dibujar un círculo donde hiciste clic
-        cv2.circle(img, (x, y), 5, (0, 0, 255), -1)
-        cv2.imshow("Configurador de Zonas", img)
+        puntos_actuales.append([x, y])
+        redibujar()
+
+
+def cerrar_poligono():
+    if len(puntos_actuales) >= 3:
+        zonas[zona_actual].append(list(puntos_actuales))
+        print(f"✅ Polígono de {zona_actual} guardado ({len(puntos_actuales)} puntos)")
+    elif puntos_actuales:
+        print("⚠️ Un polígono necesita al menos 3 puntos, se descarta.")
+    puntos_actuales.clear()
+
 
 print("-------------------------------------------------")
 print("🛠️ HERRAMIENTA DE CONFIGURACIÓN DE ZONAS")
-print("1. Se abrirá la cámara.")
-print("2. Haz CLIC en las 4 esquinas del COMEDERO.")
-print("3. Cuando tengas los 4 puntos rojos, presiona 'q'.")
+print("1. Se abrirá la cámara (o la fuente pasada como argumento).")
+print("2. Haz CLIC en las esquinas de la zona (polígono, 3 o más puntos).")
+print("3. 'c' = marcar COMEDERO, 'b' = marcar BEBEDERO, 'n' = cerrar polígono.")
+print("4. 's' = guardar y salir, 'q' = salir sin guardar.")
 print("-------------------------------------------------")
 
-cap = cv2.VideoCapture(0) # Usa 0 por ahora (Webcam)
+fuente = sys.argv[1] if len(sys.argv) > 1 else 0  # 0 = Webcam
+cap = cv2.VideoCapture(fuente)
 
 ret, img = cap.read()
+cap.release()
 if not ret:
     print("❌ Error al leer cámara")
     exit()
 
 cv2.imshow("Configurador de Zonas", img)
 cv2.setMouseCallback("Configurador de Zonas", click_event)
+redibujar()
 
-# Esperar hasta que presiones 'q'
+guardar = False
 while True:
-    cv2.imshow("Configurador de Zonas", img)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    tecla = cv2.waitKey(20) & 0xFF
+    if tecla == ord("c") or tecla == ord("b"):
+        cerrar_poligono()
+        zona_actual = "comedero" if tecla == ord("c") else "bebedero"
+        redibujar()
+    elif tecla == ord("n"):
+        cerrar_poligono()
+        redibujar()
+    elif tecla == ord("s"):
+        cerrar_poligono()
+        guardar = True
+        break
+    elif tecla == ord("q"):
         break
 
-cap.release()
 cv2.destroyAllWindows()
 
-print("\n\n✅ ¡LISTO! COPIA ESTOS NÚMEROS EN TU CÓDIGO:")
-print(f"zona_comedero = np.array({puntos_comedero}, np.int32)")
-print("-------------------------------------------------")
\ No newline at end of file
+if guardar:
+    alto, ancho = img.shape[:2]
+    os.makedirs(os.path.dirname(RUTA_ZONAS), exist_ok=True)
+    ZoneMap(zonas, frame_size=(ancho, alto)).save(RUTA_ZONAS)
+    print(f"\n\n✅ ¡LISTO! Zonas guardadas en {RUTA_ZONAS}")
+    print("   main.py las carga al arrancar (o define ZONAS_CONFIG con otra ruta).")
+else:
+    print("\n\nℹ️ Saliste sin guardar.")
+print("-------------------------------------------------")
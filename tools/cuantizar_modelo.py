@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import yaml
+from ultralytics import YOLO  # type: ignore
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modulos.inference_backends import int8_artifact  # noqa: E402
+
+DATASET = RAIZ / "entrenamiento"
+CLASES_CLAVE = ("bebedero", "comedero", "ninfa")
+
+
+def _yaml_temporal(carpeta, nombres, val, test=None):
+    """data.yaml con rutas absolutas (el de Roboflow usa rutas relativas)."""
+    data = {"train": str(DATASET / "train" / "images"), "val": str(val), "nc": len(nombres), "names": nombres}
+    if test is not None:
+        data["test"] = str(test)
+    ruta = Path(carpeta) / f"data_{Path(val).parent.name}.yaml"
+    with open(ruta, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f)
+    return ruta
+
+
+def evaluar(modelo, data_yaml, split, imgsz):
+    """mAP y recall por clase de un modelo sobre un split."""
+    metrics = YOLO(str(modelo), task="detect").val(
+        data=str(data_yaml), split=split, imgsz=imgsz, batch=1, device="cpu", plots=False, verbose=False
+    )
+    box = metrics.box
+    nombres = metrics.names
+    recall = {nombres[int(c)]: float(box.r[i]) for i, c in enumerate(box.ap_class_index)}
+    return {"map50": float(box.map50), "map50_95": float(box.map), "recall": recall}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cuantiza best.pt a INT8 (OpenVINO) con control de precisión.")
+    parser.add_argument("--pesos", default=str(RAIZ / "best.pt"))
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--split", default="val", choices=["val", "test"], help="split de evaluación")
+    parser.add_argument(
+        "--tolerancia", type=float, default=0.02, help="caída máxima aceptada en el recall de 'ninfa' (absoluta)"
+    )
+    args = parser.parse_args()
+
+    pesos = Path(args.pesos)
+    if not pesos.exists():
+        print(f"❌ No se encuentra {pesos}")
+        sys.exit(1)
+
+    with open(DATASET / "data.yaml", "r", encoding="utf-8") as f:
+        nombres = yaml.safe_load(f)["names"]
+
+    print("-------------------------------------------------")
+    print("🧮 CUANTIZACIÓN INT8 CON CONTROL DE PRECISIÓN")
+    print(f"   Pesos: {pesos}")
+    print(f"   Calibración: {DATASET / 'train'}")
+    print(f"   Evaluación: {DATASET / ('valid' if args.split == 'val' else 'test')}")
+    print("-------------------------------------------------")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Ultralytics calibra con el split 'val' del yaml: lo apuntamos a train
+        # para no calibrar sobre las mismas imágenes con las que se evalúa.
+        yaml_calibracion = _yaml_temporal(tmp, nombres, DATASET / "train" / "images")
+        yaml_eval = _yaml_temporal(tmp, nombres, DATASET / "valid" / "images", DATASET / "test" / "images")
+
+        # Se exporta sobre una copia para no pisar el artefacto FP32 cacheado
+        pesos_tmp = Path(tmp) / pesos.name
+        shutil.copy2(pesos, pesos_tmp)
+        print("📦 Exportando a OpenVINO INT8 (calibración NNCF)...")
+        exportado = Path(
+            YOLO(str(pesos_tmp)).export(format="openvino", int8=True, data=str(yaml_calibracion), imgsz=args.imgsz)
+        )
+
+        print("📏 Evaluando FP32...")
+        fp32 = evaluar(pesos, yaml_eval, args.split, args.imgsz)
+        print("📏 Evaluando INT8...")
+        int8 = evaluar(exportado, yaml_eval, args.split, args.imgsz)
+
+        print("\n  Métrica            FP32     INT8     Δ")
+        print(f"  mAP50           {fp32['map50']:.3f}    {int8['map50']:.3f}   {int8['map50'] - fp32['map50']:+.3f}")
+        print(
+            f"  mAP50-95        {fp32['map50_95']:.3f}    {int8['map50_95']:.3f}   "
+            f"{int8['map50_95'] - fp32['map50_95']:+.3f}"
+        )
+        for clase in CLASES_CLAVE:
+            r32 = fp32["recall"].get(clase, 0.0)
+            r8 = int8["recall"].get(clase, 0.0)
+            print(f"  recall {clase:<9} {r32:.3f}    {r8:.3f}   {r8 - r32:+.3f}")
+
+        caida_ninfa = fp32["recall"].get("ninfa", 0.0) - int8["recall"].get("ninfa", 0.0)
+        aprobado = caida_ninfa <= args.tolerancia
+
+        destino = int8_artifact(pesos)
+        reporte = {
+            "pesos": str(pesos),
+            "split": args.split,
+            "tolerancia_recall_ninfa": args.tolerancia,
+            "caida_recall_ninfa": caida_ninfa,
+            "fp32": fp32,
+            "int8": int8,
+            "publicado": aprobado,
+        }
+        ruta_reporte = pesos.with_name(f"{pesos.stem}_int8_reporte.json")
+        with open(ruta_reporte, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2)
+
+        print("-------------------------------------------------")
+        if not aprobado:
+            print(
+                f"❌ RECHAZADO: el recall de 'ninfa' cae {caida_ninfa:.3f} "
+                f"(tolerancia {args.tolerancia:.3f}). No se publica el modelo INT8."
+            )
+            print(f"   Reporte: {ruta_reporte}")
+            sys.exit(2)
+
+        if destino.exists():
+            shutil.rmtree(destino)
+        shutil.copytree(exportado, destino)
+        print(f"✅ PUBLICADO: {destino}")
+        print("   main.py lo usa con MONITOR_BACKEND=auto u openvino_int8.")
+        print(f"   Reporte: {ruta_reporte}")
+
+
+if __name__ == "__main__":
+    os.chdir(RAIZ)
+    main()
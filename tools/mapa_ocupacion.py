@@ -0,0 +1,91 @@
+import argparse
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modulos.occupancy import (  # noqa: E402
+    GRID_H,
+    GRID_W,
+    OBSERVACIONES,
+    OCUPACION_POR_DEFECTO,
+    PERMANENCIA,
+    load_period,
+)
+
+
+def celdas_principales(capa, n):
+    """Las `n` celdas con más valor: lista de (fila, columna, valor)."""
+    plano = capa.ravel()
+    orden = np.argsort(plano)[::-1][:n]
+    return [(int(i // GRID_W), int(i % GRID_W), float(plano[i])) for i in orden if plano[i] > 0]
+
+
+def renderizar(capa, fondo=None, ancho=1280, alto=720):
+    """Mapa de calor de la capa (sobre la imagen `fondo` si se da)."""
+    if fondo is not None:
+        alto, ancho = fondo.shape[:2]
+    maximo = float(capa.max())
+    normalizada = (capa / maximo * 255).astype(np.uint8) if maximo > 0 else np.zeros(capa.shape, np.uint8)
+    ampliada = cv2.resize(normalizada, (ancho, alto), interpolation=cv2.INTER_NEAREST)
+    calor = cv2.applyColorMap(ampliada, cv2.COLORMAP_JET)
+    if fondo is None:
+        return calor
+    return cv2.addWeighted(fondo, 0.5, calor, 0.5, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mapa de ocupación/permanencia de las ninfas en un período.")
+    parser.add_argument("--dir", default=str(OCUPACION_POR_DEFECTO), help="carpeta de grillas de ocupación")
+    parser.add_argument("--dias", type=int, default=1, help="últimos N días (si no se da --desde)")
+    parser.add_argument("--desde", help="AAAA-MM-DD")
+    parser.add_argument("--hasta", help="AAAA-MM-DD, inclusivo (por defecto, hoy)")
+    parser.add_argument("--observaciones", action="store_true", help="mapa de observaciones en lugar de segundos")
+    parser.add_argument("--fondo", help="imagen de la jaula para superponer el mapa")
+    parser.add_argument("--salida", help="PNG de salida (sin esto sólo se imprime el resumen)")
+    parser.add_argument("--top", type=int, default=5, help="celdas a listar")
+    args = parser.parse_args()
+
+    if not Path(args.dir).is_dir():
+        print(f"❌ No existe la carpeta de ocupación '{args.dir}'")
+        sys.exit(1)
+
+    hasta = date.fromisoformat(args.hasta) if args.hasta else date.today()
+    desde = date.fromisoformat(args.desde) if args.desde else hasta - timedelta(days=max(args.dias, 1) - 1)
+    ts_desde = time.mktime(datetime.combine(desde, datetime.min.time()).timetuple())
+    ts_hasta = time.mktime(datetime.combine(hasta + timedelta(days=1), datetime.min.time()).timetuple())
+
+    total = load_period(ts_desde, ts_hasta, args.dir)
+    capa = total[OBSERVACIONES if args.observaciones else PERMANENCIA]
+    print(f"🗺️ Ocupación {desde} → {hasta} ({GRID_W}x{GRID_H} celdas)")
+    if not total.any():
+        print("📭 No hay datos en ese rango")
+        return
+
+    print(f"   👀 Observaciones: {total[OBSERVACIONES].sum():.0f}")
+    print(f"   ⏱️ Permanencia: {total[PERMANENCIA].sum() / 3600:.1f} h")
+    unidad = "obs" if args.observaciones else "s"
+    for fila, columna, valor in celdas_principales(capa, args.top):
+        # Centro de la celda en fracción del frame, para ubicarla en la imagen
+        x = (columna + 0.5) / GRID_W
+        y = (fila + 0.5) / GRID_H
+        print(f"   📍 celda ({columna}, {fila}) ≈ ({x:.0%}, {y:.0%}): {valor:.0f} {unidad}")
+
+    if args.salida:
+        fondo = None
+        if args.fondo:
+            fondo = cv2.imread(args.fondo)
+            if fondo is None:
+                print(f"⚠️ No se pudo leer la imagen de fondo '{args.fondo}'")
+        cv2.imwrite(args.salida, renderizar(capa, fondo))
+        print(f"💾 Mapa guardado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modulos.base_datos import EscritorBitacora  # noqa: E402
+from modulos.event_spool import EventSpool  # noqa: E402
+from modulos.health_monitor import HealthMonitor  # noqa: E402
+from modulos.inference_backends import load_detector  # noqa: E402
+from modulos.movement_analysis import MovementMonitor  # noqa: E402
+from modulos.pipeline import MonitorPipeline  # noqa: E402
+from modulos.zones import load_configured_zones  # noqa: E402
+
+EXTENSIONES_IMAGEN = {".jpg", ".jpeg", ".png", ".bmp"}
+ETAPAS = ("decode", "inferencia", "postproceso", "estado", "bd", "animo", "hud", "total")
+
+
+def leer_frames(fuente):
+    """Genera (frame, segundos_decodificando) desde un video o carpeta de imágenes."""
+    fuente = Path(fuente)
+    if fuente.is_dir():
+        imagenes = sorted(p for p in fuente.iterdir() if p.suffix.lower() in EXTENSIONES_IMAGEN)
+        for ruta in imagenes:
+            t0 = time.perf_counter()
+            frame = cv2.imread(str(ruta))
+            dt = time.perf_counter() - t0
+            if frame is not None:
+                yield frame, dt
+        return
+
+    cap = cv2.VideoCapture(str(fuente))
+    try:
+        while True:
+            t0 = time.perf_counter()
+            ret, frame = cap.read()
+            dt = time.perf_counter() - t0
+            if not ret:
+                break
+            yield frame, dt
+    finally:
+        cap.release()
+
+
+def fps_fuente(fuente, por_defecto):
+    if Path(fuente).is_dir():
+        return por_defecto
+    cap = cv2.VideoCapture(str(fuente))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return fps if fps and fps > 0 else por_defecto
+
+
+def resumen(muestras):
+    if not muestras:
+        return {"n": 0}
+    ms = np.asarray(muestras) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "n": int(len(ms)),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+def rss_pico_mb():
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS bytes
+    return round(maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline del pipeline de monitoreo (sin cámara ni ventana).")
+    parser.add_argument("--fuente", default=str(RAIZ / "dataset" / "images"), help="video o carpeta de imágenes")
+    parser.add_argument("--pesos", default=str(RAIZ / "best.pt"))
+    parser.add_argument("--backend", default="auto")
+    parser.add_argument("--roi", action="store_true", help="inferencia por recortes de movimiento")
+    parser.add_argument("--tracker", default="auto", choices=("auto", "botsort", "iou"))
+    parser.add_argument("--sin-hud", action="store_true", help="no medir el dibujo del HUD")
+    parser.add_argument("--max-frames", type=int, default=0)
+    parser.add_argument("--fps", type=float, default=25.0, help="reloj simulado para carpetas de imágenes")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, stdout)")
+    args = parser.parse_args()
+
+    model, backend = load_detector(args.pesos, args.backend)
+    fps = fps_fuente(args.fuente, args.fps)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # La etapa de BD se mide hasta el encolado + respaldo local, sin Azure
+        escritor = EscritorBitacora(conectar=lambda: None, spool=EventSpool(os.path.join(tmp, "spool.db")))
+        escritor.start()
+
+        tiempos = {etapa: [] for etapa in ETAPAS}
+
+        def guardar(*registro):
+            t0 = time.perf_counter()
+            escritor.encolar(*registro)
+            tiempos["bd"].append(time.perf_counter() - t0)
+
+        pipeline = MonitorPipeline(
+            model,
+            backend=backend,
+            weights=args.pesos,
+            move_mon=MovementMonitor(),
+            health_mon=HealthMonitor(),
+            guardar=guardar,
+            zonas=load_configured_zones(),
+            use_roi=args.roi,
+            verbose=False,
+            tracker=args.tracker,
+        )
+
+        frames = 0
+        eventos = 0
+        # Reloj simulado: el planificador y el estado de acciones ven el ritmo
+        # real de la fuente aunque el benchmark corra a máxima velocidad
+        reloj_inicio = time.time()
+        t_inicio = time.perf_counter()
+        for frame, t_decode in leer_frames(args.fuente):
+            ahora = reloj_inicio + frames / fps
+            t0 = time.perf_counter()
+
+            detecciones = pipeline.detect(frame, ahora)
+            t1 = time.perf_counter()
+
+            accion, conf = "", 0.0
+            if detecciones is not None:
+                accion, conf = pipeline.postprocess(detecciones, frame, ahora)
+            elif not pipeline.botsort:
+                pipeline.predict(ahora)
+            t2 = time.perf_counter()
+
+            eventos += len(pipeline.update_actions(accion, conf, ahora))
+            t3 = time.perf_counter()
+
+            pipeline.assess(now=ahora)
+            t4 = time.perf_counter()
+
+            if not args.sin_hud:
+                pipeline.draw(frame, fps)
+            t5 = time.perf_counter()
+
+            tiempos["decode"].append(t_decode)
+            if detecciones is not None:
+                tiempos["inferencia"].append(t1 - t0)
+                tiempos["postproceso"].append(t2 - t1)
+            tiempos["estado"].append(t3 - t2)
+            tiempos["animo"].append(t4 - t3)
+            if not args.sin_hud:
+                tiempos["hud"].append(t5 - t4)
+            tiempos["total"].append(t_decode + (t5 - t0))
+
+            frames += 1
+            if args.max_frames and frames >= args.max_frames:
+                break
+
+        duracion = time.perf_counter() - t_inicio
+        escritor.stop(timeout=1.0)
+
+    resultado = {
+        "fuente": str(args.fuente),
+        "backend": backend,
+        "roi": args.roi,
+        "tracker": "botsort" if pipeline.botsort else "iou",
+        "tracks_creados": pipeline.tracker.created,
+        "frames": frames,
+        "inferencias": pipeline.scheduler.inferences,
+        "eventos": eventos,
+        "duracion_s": round(duracion, 3),
+        "fps": round(frames / duracion, 2) if duracion > 0 else 0.0,
+        "rss_pico_mb": rss_pico_mb(),
+        "etapas": {etapa: resumen(tiempos[etapa]) for etapa in ETAPAS},
+    }
+
+    texto = json.dumps(resultado, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+        print(f"✅ Resultados guardados en {args.salida}", file=sys.stderr)
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
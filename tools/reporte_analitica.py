@@ -0,0 +1,90 @@
+import argparse
+import json
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modulos.analytics_store import ANALITICA_POR_DEFECTO, AnalyticsStore  # noqa: E402
+
+ICONOS_ACCION = {"Alimentacion": "🍽️", "Hidratacion": "💧"}
+
+
+def minutos(segundos):
+    return f"{segundos / 60:.1f} min"
+
+
+def imprimir(reporte):
+    if not reporte:
+        print("📭 No hay datos en ese rango")
+        return
+
+    for periodo, datos in reporte.items():
+        print(f"📅 {periodo}")
+        for accion, a in sorted(datos["acciones"].items()):
+            icono = ICONOS_ACCION.get(accion, "▶️")
+            print(
+                f"   {icono} {accion}: {a['sesiones']} sesiones, {minutos(a['segundos'])} "
+                f"(máx {minutos(a['max_segundos'])})"
+            )
+
+        total_animo = sum(datos["animo"].values())
+        if total_animo > 0:
+            partes = sorted(datos["animo"].items(), key=lambda x: -x[1])
+            print("   😊 Ánimo: " + " | ".join(f"{animo} {seg / total_animo:.0%}" for animo, seg in partes))
+
+        if datos["actividad"] is not None:
+            act = datos["actividad"]
+            print(f"   🐾 Actividad: media {act['media']:.0f} px, máx {act['max']:.0f} px")
+
+        if datos["audio"]:
+            print("   🔊 Audio: " + ", ".join(f"{evento} {n}" for evento, n in sorted(datos["audio"].items())))
+        if datos["salud"]:
+            print("   🚨 Salud: " + ", ".join(f"{alerta} {n}" for alerta, n in sorted(datos["salud"].items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reportes diarios/semanales desde la analítica local (sin Azure).")
+    parser.add_argument("--db", default=str(ANALITICA_POR_DEFECTO), help="base de analítica local")
+    parser.add_argument("--dias", type=int, default=7, help="últimos N días (si no se da --desde)")
+    parser.add_argument("--desde", help="AAAA-MM-DD")
+    parser.add_argument("--hasta", help="AAAA-MM-DD (por defecto, hoy)")
+    parser.add_argument("--semanal", action="store_true", help="agrupar por semana")
+    parser.add_argument("--camara", help="sólo esta cámara (por defecto, todas sumadas)")
+    parser.add_argument("--json", action="store_true", help="salida JSON")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ No existe la base de analítica '{args.db}'")
+        sys.exit(1)
+
+    hasta = args.hasta or date.today().isoformat()
+    desde = args.desde or (date.fromisoformat(hasta) - timedelta(days=max(args.dias, 1) - 1)).isoformat()
+
+    t0 = time.perf_counter()
+    store = AnalyticsStore(args.db)
+    try:
+        reporte = (store.weekly if args.semanal else store.daily)(desde, hasta, camera=args.camara)
+        camaras = store.cameras()
+    finally:
+        store.close()
+    ms = (time.perf_counter() - t0) * 1000
+
+    if args.json:
+        print(json.dumps(reporte, indent=2, ensure_ascii=False))
+        return
+
+    print(f"📊 Reporte {'semanal' if args.semanal else 'diario'} {desde} → {hasta}")
+    if args.camara is not None:
+        print(f"🎥 Cámara: {args.camara}")
+    elif len(camaras) > 1:
+        print("🎥 Cámaras: " + ", ".join(c or "(principal)" for c in camaras))
+    imprimir(reporte)
+    print(f"⏱️ {ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()